@@ -0,0 +1,228 @@
+"""Benchmarks of reducto over the standard library and synthetic packages.
+
+Every case runs in a new interpreter, so the peak memory of each one is
+measured independently. The synthetic packages are generated before the
+cases are timed.
+
+Just run from root level:
+
+$ python benchmarks/bench.py -o benchmarks/baseline.json
+
+And compare a later run with the baseline:
+
+$ python benchmarks/bench.py --compare benchmarks/baseline.json
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import argparse
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import time
+
+HERE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+
+import synthetic  # noqa: E402
+import reducto as rd  # noqa: E402
+import reducto.analyzer as an  # noqa: E402
+import reducto.exclude as ex  # noqa: E402
+import reducto.package as pkg  # noqa: E402
+import reducto.src as src  # noqa: E402
+import reducto.walker as wk  # noqa: E402
+
+# Parts of the standard library left out of the corpus: test suites
+# (containing files with invalid syntax on purpose) and installed packages.
+STDLIB_EXCLUDE = ex.Exclude(
+    ["test", "tests", "idle_test", "lib2to3", "site-packages", "dist-packages"]
+)
+
+# Default sizes of the synthetic packages, multiplied by --scale.
+SIZES: Dict[str, int] = {
+    "large_file": 100_000,
+    "tiny_files": 20_000,
+    "many_functions": 5_000,
+    "comment_heavy": 50_000,
+}
+
+
+def stdlib_path() -> pathlib.Path:
+    """Directory of the standard library of the running interpreter."""
+    return pathlib.Path(sysconfig.get_paths()["stdlib"])
+
+
+def stdlib_packages(stdlib: pathlib.Path) -> Iterator[pathlib.Path]:
+    """Yields the packages at the top level of the standard library."""
+    for path in sorted(stdlib.iterdir()):
+        if STDLIB_EXCLUDE.match_path(path.name):
+            continue
+        if pkg.is_package(path):
+            yield path
+
+
+def source_files(paths: List[str]) -> Tuple[int, int]:
+    """Computes the metrics of each file with SourceFile.
+
+    Files which can't be parsed by the running interpreter are skipped.
+    """
+    files: int = 0
+    lines: int = 0
+    for path in paths:
+        try:
+            metrics = src.SourceFile(pathlib.Path(path), lean=True).metrics
+        except (SyntaxError, UnicodeDecodeError, ValueError):
+            continue
+        files += 1
+        lines += metrics.lines
+    return files, lines
+
+
+def packages(paths: List[pathlib.Path], jobs: int) -> Tuple[int, int]:
+    """Generates the report of each package, sharing the pool of processes."""
+    files: int = 0
+    lines: int = 0
+    with an.Analyzer(workers=jobs) as analyzer:
+        for path in paths:
+            package = pkg.Package(path, analyzer=analyzer)
+            package.report().report(grouped=False)
+            files += package.totals.source_files
+            lines += package.totals.lines
+    return files, lines
+
+
+def case_stdlib_source_files(workdir: pathlib.Path, jobs: int) -> Tuple[int, int]:
+    return source_files(list(wk.walk(stdlib_path(), exclude=STDLIB_EXCLUDE)))
+
+
+def case_stdlib_packages(workdir: pathlib.Path, jobs: int) -> Tuple[int, int]:
+    return packages(list(stdlib_packages(stdlib_path())), jobs)
+
+
+def synthetic_file(name: str) -> Callable[[pathlib.Path, int], Tuple[int, int]]:
+    """Case analyzing the single module of a synthetic package."""
+
+    def case(workdir: pathlib.Path, jobs: int) -> Tuple[int, int]:
+        paths = [p for p in wk.walk(workdir / name) if not p.endswith("__init__.py")]
+        source_file = src.SourceFile(pathlib.Path(paths[0]), lean=True)
+        source_file.report().report()
+        return 1, len(source_file)
+
+    return case
+
+
+def case_tiny_files(workdir: pathlib.Path, jobs: int) -> Tuple[int, int]:
+    return packages([workdir / "tiny_files"], jobs)
+
+
+CASES: Dict[str, Callable[[pathlib.Path, int], Tuple[int, int]]] = {
+    "stdlib_source_files": case_stdlib_source_files,
+    "stdlib_packages": case_stdlib_packages,
+    "large_file": synthetic_file("large_file"),
+    "many_functions": synthetic_file("many_functions"),
+    "comment_heavy": synthetic_file("comment_heavy"),
+    "tiny_files": case_tiny_files,
+}
+
+
+def peak_rss_kb(who: int) -> int:
+    """Peak resident set size in KiB, of the process or its children."""
+    import resource
+
+    maxrss: int = resource.getrusage(who).ru_maxrss
+    # Reported in bytes on macOS, KiB elsewhere.
+    return maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+
+def run_case(name: str, workdir: pathlib.Path, jobs: int) -> Dict[str, Any]:
+    """Runs a case on the current process and returns its measures."""
+    import resource
+
+    start: float = time.perf_counter()
+    files, lines = CASES[name](workdir, jobs)
+    seconds: float = time.perf_counter() - start
+    return {
+        "files": files,
+        "lines": lines,
+        "seconds": round(seconds, 4),
+        "files_per_s": round(files / seconds, 1),
+        "lines_per_s": round(lines / seconds, 1),
+        "peak_rss_kb": peak_rss_kb(resource.RUSAGE_SELF),
+        "peak_rss_workers_kb": peak_rss_kb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def run_isolated(name: str, workdir: pathlib.Path, jobs: int) -> Dict[str, Any]:
+    """Runs a case on a new interpreter."""
+    args = [sys.executable, __file__, "--case", name, "--workdir", str(workdir)]
+    output = subprocess.check_output(args + ["--jobs", str(jobs)])
+    return json.loads(output)
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> str:
+    """Formats the ratio of each measure against a baseline."""
+    lines: List[str] = []
+    header = f"{'case':<22}{'files/s':>12}{'lines/s':>14}{'peak rss':>12}"
+    lines.append(header)
+    for name, result in results["cases"].items():
+        base: Optional[Dict[str, Any]] = baseline["cases"].get(name)
+        cells = []
+        for key in ("files_per_s", "lines_per_s", "peak_rss_kb"):
+            if base is None or not base[key]:
+                cells.append("-")
+            else:
+                cells.append(f"{result[key] / base[key]:.2f}x")
+        lines.append(f"{name:<22}{cells[0]:>12}{cells[1]:>14}{cells[2]:>12}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", nargs="*", choices=list(CASES), default=list(CASES))
+    parser.add_argument("-j", "--jobs", type=int, default=an.usable_cpus())
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="Factor applied to the synthetic sizes."
+    )
+    parser.add_argument("--workdir", type=pathlib.Path, default=None)
+    parser.add_argument("-o", "--output", type=pathlib.Path, default=None)
+    parser.add_argument("--compare", type=pathlib.Path, default=None)
+    parser.add_argument("--case", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case is not None:
+        print(json.dumps(run_case(args.case, args.workdir, args.jobs)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir: pathlib.Path = args.workdir or pathlib.Path(tmp)
+        for name, generator in synthetic.GENERATORS.items():
+            if name in args.cases and not (workdir / name).exists():
+                generator(workdir, max(1, int(SIZES[name] * args.scale)))
+
+        results: Dict[str, Any] = {
+            "reducto": rd.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "jobs": args.jobs,
+            "scale": args.scale,
+            "cases": {},
+        }
+        for name in args.cases:
+            results["cases"][name] = run_isolated(name, workdir, args.jobs)
+            print(name, json.dumps(results["cases"][name]), file=sys.stderr)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline generated: {args.output}")
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            print(compare(results, json.load(f)))
+
+
+if __name__ == "__main__":
+    main()
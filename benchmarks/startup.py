@@ -0,0 +1,192 @@
+"""Benchmarks of the startup of the command line interface.
+
+Each case runs ``reducto`` on a new interpreter with ``-X importtime``,
+recording the wall time of the whole run, the time spent importing modules
+and the modules which dominate it. The modules only needed by other formats
+or modes (tabulate, asyncio, the pool of processes...) must not be imported.
+
+Just run from root level:
+
+$ python benchmarks/startup.py -o benchmarks/startup_baseline.json
+
+And compare a later run with the baseline:
+
+$ python benchmarks/startup.py --compare benchmarks/startup_baseline.json
+"""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+import argparse
+import json
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = pathlib.Path(__file__).resolve().parent
+ROOT = HERE.parent
+
+# Source file analyzed by the single file cases.
+SAMPLE = '''\
+"""Small module."""
+
+import os
+
+
+def foo(path):
+    """Docstring."""
+    # Comment.
+    return os.path.exists(path)
+
+
+class Bar:
+    def baz(self):
+        return foo(".")
+'''
+
+# Arguments of each case, {sample} is replaced by the path of the sample.
+CASES: Dict[str, List[str]] = {
+    "version": ["--version"],
+    "single_file": ["{sample}", "--format", "json"],
+}
+
+# Modules which must not be imported by any case (lzma is left out, argparse
+# imports it through shutil).
+UNEXPECTED = (
+    "tabulate",
+    "asyncio",
+    "concurrent.futures",
+    "multiprocessing",
+    "socket",
+    "ctypes",
+    "gzip",
+    "tempfile",
+)
+
+# Code run by each case, like the console script.
+RUNNER = "import sys; import reducto; reducto.main(sys.argv[1:])"
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int]]:
+    """Reads the output of -X importtime.
+
+    Returns the name and self time (in microseconds) of each module imported.
+    """
+    modules: List[Tuple[str, int]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us)))
+    return modules
+
+
+def import_modules(code: str, args: List[str]) -> Tuple[float, List[Tuple[str, int]]]:
+    """Runs code on a new interpreter, returning its wall time and imports."""
+    command = [sys.executable, "-X", "importtime", "-c", code] + args
+    start: float = time.perf_counter()
+    result = subprocess.run(
+        command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    seconds: float = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr}")
+    return seconds, parse_importtime(result.stderr)
+
+
+def run_once(args: List[str], startup: Set[str]) -> Dict[str, Any]:
+    """Runs reducto once, leaving out the modules of the interpreter startup."""
+    seconds, modules = import_modules(RUNNER, args)
+    return {"seconds": seconds, "modules": [m for m in modules if m[0] not in startup]}
+
+
+def run_case(
+    args: List[str], startup: Set[str], repeat: int, top: int
+) -> Dict[str, Any]:
+    """Runs a case repeat times, reporting the medians."""
+    runs = [run_once(args, startup) for _ in range(repeat)]
+    modules = runs[-1]["modules"]
+    names = {name for name, _ in modules}
+    slowest = sorted(modules, key=lambda m: m[1], reverse=True)[:top]
+    return {
+        "seconds": round(statistics.median(r["seconds"] for r in runs), 4),
+        "import_us": statistics.median(
+            sum(m[1] for m in r["modules"]) for r in runs
+        ),
+        "modules": len(modules),
+        "slowest": dict(slowest),
+        "unexpected": [name for name in UNEXPECTED if name in names],
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> str:
+    """Formats the ratio of each measure against a baseline."""
+    lines: List[str] = []
+    lines.append(f"{'case':<16}{'seconds':>12}{'import':>12}{'modules':>12}")
+    for name, result in results["cases"].items():
+        base: Optional[Dict[str, Any]] = baseline["cases"].get(name)
+        cells = []
+        for key in ("seconds", "import_us", "modules"):
+            if base is None or not base[key]:
+                cells.append("-")
+            else:
+                cells.append(f"{result[key] / base[key]:.2f}x")
+        lines.append(f"{name:<16}{cells[0]:>12}{cells[1]:>12}{cells[2]:>12}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", nargs="*", choices=list(CASES), default=list(CASES))
+    parser.add_argument("-n", "--repeat", type=int, default=10)
+    parser.add_argument(
+        "--top", type=int, default=5, help="Number of slowest imports reported."
+    )
+    parser.add_argument("-o", "--output", type=pathlib.Path, default=None)
+    parser.add_argument("--compare", type=pathlib.Path, default=None)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, str(ROOT))
+    import reducto as rd
+
+    results: Dict[str, Any] = {
+        "reducto": rd.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "cases": {},
+    }
+    # Modules imported by any interpreter, before running reducto.
+    startup: Set[str] = {name for name, _ in import_modules("pass", [])[1]}
+    with tempfile.TemporaryDirectory() as tmp:
+        sample = pathlib.Path(tmp) / "sample.py"
+        sample.write_text(SAMPLE)
+        for name in args.cases:
+            case_args = [arg.format(sample=sample) for arg in CASES[name]]
+            results["cases"][name] = run_case(
+                case_args, startup, args.repeat, args.top
+            )
+            print(name, json.dumps(results["cases"][name]), file=sys.stderr)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline generated: {args.output}")
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            print(compare(results, json.load(f)))
+
+    unexpected = {
+        name: case["unexpected"]
+        for name, case in results["cases"].items()
+        if case["unexpected"]
+    }
+    if unexpected:
+        sys.exit(f"Unexpected modules imported: {unexpected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Generators of synthetic source code for the benchmarks.
+
+Each generator writes a python package exercising a worst case for reducto:
+very long files, a huge number of tiny files, files with thousands of
+functions and files made mostly of comments.
+"""
+
+from typing import Callable, Dict
+import pathlib
+
+# Block of code repeated to build the long files, with every kind of line.
+BLOCK: str = '''
+
+class Model{i}:
+    """Docstring of the class.
+
+    Spanning multiple lines.
+    """
+
+    def __init__(self, value: int) -> None:
+        # Store the value.
+        self.value = value
+
+    def compute(self, other: int) -> int:
+        """Docstring of the method."""
+        if other > self.value:  # Inline comment, counted as source.
+            return other - self.value
+
+        return self.value * other
+
+
+def function_{i}(items):
+    """Docstring of the function."""
+    total = 0
+    for item in items:
+        total += item
+    return total
+'''
+
+
+def _package(root: pathlib.Path, name: str) -> pathlib.Path:
+    path = root / name
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "__init__.py").write_text('"""Synthetic package."""\n')
+    return path
+
+
+def large_file(root: pathlib.Path, lines: int = 100_000) -> pathlib.Path:
+    """Package with a single file of (at least) the given number of lines."""
+    path = _package(root, "large_file")
+    block_lines: int = BLOCK.count("\n")
+    content = "".join(BLOCK.format(i=i) for i in range(lines // block_lines + 1))
+    (path / "large.py").write_text('"""Module docstring."""\n' + content)
+    return path
+
+
+def tiny_files(root: pathlib.Path, files: int = 20_000) -> pathlib.Path:
+    """Package with a huge number of tiny files, 1000 per subpackage."""
+    path = _package(root, "tiny_files")
+    for i in range(files):
+        subpackage = path / f"sub{i // 1000}"
+        if i % 1000 == 0:
+            _package(path, subpackage.name)
+        (subpackage / f"mod{i}.py").write_text(
+            f'"""Module {i}."""\n\n\ndef f{i}():\n    return {i}\n'
+        )
+    return path
+
+
+def many_functions(root: pathlib.Path, functions: int = 5_000) -> pathlib.Path:
+    """Package with a file containing thousands of functions."""
+    path = _package(root, "many_functions")
+    content = "".join(
+        f"def func_{i}(x):\n    # Comment {i}\n\n    return x + {i}\n\n\n"
+        for i in range(functions)
+    )
+    (path / "functions.py").write_text(content)
+    return path
+
+
+def comment_heavy(root: pathlib.Path, lines: int = 50_000) -> pathlib.Path:
+    """Package with a file made mostly of comments and blank lines."""
+    path = _package(root, "comment_heavy")
+    chunks = []
+    for i in range(lines // 10):
+        chunks.append(f"def func_{i}():\n")
+        chunks.extend(f"    # Comment line {j} of {i}.\n" for j in range(6))
+        chunks.append("\n")
+        chunks.append(f"    return {i}\n")
+        chunks.append("# Module level comment.\n")
+    (path / "comments.py").write_text("".join(chunks))
+    return path
+
+
+# Generators by name, called with the directory where the package is created.
+GENERATORS: Dict[str, Callable[..., pathlib.Path]] = {
+    "large_file": large_file,
+    "tiny_files": tiny_files,
+    "many_functions": many_functions,
+    "comment_heavy": comment_heavy,
+}
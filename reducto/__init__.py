@@ -1,5 +1,21 @@
-"""Python source code stats in a command. """
+"""Python source code stats in a command."""
 
-from reducto.cli import main
+from typing import Any
 
 __version__ = "1.0.3"
+
+# Attributes imported on first access, so running the command line (or
+# reading the version) doesn't import the whole package.
+_LAZY_ATTRIBUTES = {
+    "main": "reducto.cli",
+    "analyze_async": "reducto.aio",
+    "iter_analyze_async": "reducto.aio",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    return getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
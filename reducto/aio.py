@@ -0,0 +1,182 @@
+"""Module containing the asyncio interface of the analysis.
+
+Meant to embed reducto in asyncio applications: the package is walked
+and its source files are read and parsed on executors, so the event loop
+isn't blocked during the analysis.
+
+The metrics of the files are yielded in the same order as a serial run,
+with at most a given number of files being analyzed at once by each call.
+Cancelling the task consuming the results cancels the files not yet started.
+"""
+
+from typing import AsyncIterator, Deque, List, Optional, Union
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+import asyncio
+import pathlib
+
+import reducto.analyzer as an
+import reducto.exclude as ex
+import reducto.metrics as mt
+import reducto.package as pkg
+import reducto.src as src
+
+
+def source_paths(
+    path: Union[str, pathlib.Path], exclude: Optional[ex.Exclude] = None
+) -> List[str]:
+    """Paths of the source files to analyze.
+
+    Parameters
+    ----------
+    path : Union[str, pathlib.Path]
+        Python package or source file.
+    exclude : Optional[ex.Exclude]
+        Paths (relative to the package) to exclude. Defaults to None.
+
+    Returns
+    -------
+    paths : List[str]
+
+    Raises
+    ------
+    pkg.PackageError
+        When a directory is not a python package.
+    src.SourceFileError
+        When a file is not a python source file.
+    """
+    path = pathlib.Path(path)
+    if path.is_dir():
+        return pkg.Package(path, exclude=exclude).paths
+    src.SourceFile.validate(path)
+    return [str(path)]
+
+
+async def iter_analyze_async(
+    path: Union[str, pathlib.Path],
+    workers: int = 1,
+    concurrency: Optional[int] = None,
+    exclude: Optional[ex.Exclude] = None,
+    executor: Optional[Executor] = None,
+) -> AsyncIterator[mt.FileMetrics]:
+    """Yields the metrics of the source files as soon as they are computed.
+
+    Parameters
+    ----------
+    path : Union[str, pathlib.Path]
+        Python package or source file.
+    workers : int
+        Number of processes used to analyze the files, unused when an
+        executor is given. When 1, the files are analyzed on the default
+        executor of the event loop (a pool of threads). Defaults to 1.
+    concurrency : Optional[int]
+        Maximum number of files being analyzed at once. Defaults to twice
+        the number of workers.
+    exclude : Optional[ex.Exclude]
+        Paths (relative to the package) and functions to exclude.
+        Defaults to None.
+    executor : Optional[Executor]
+        Executor shared with other scans, it isn't shut down.
+        Defaults to None.
+
+    Yields
+    ------
+    metrics : mt.FileMetrics
+        Metrics of each file, in the same order as a serial run.
+
+    Raises
+    ------
+    ValueError
+        If the number of workers or the concurrency is lower than 1.
+
+    Examples
+    --------
+    >>> async for metrics in iter_analyze_async(path, workers=4):
+    ...     print(metrics.path, metrics.lines)
+    """
+    if workers < 1:
+        raise ValueError(f"workers must be a positive number, got: {workers}.")
+    if concurrency is None:
+        concurrency = 2 * workers
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be a positive number, got: {concurrency}.")
+
+    loop = asyncio.get_running_loop()
+    paths: List[str] = await loop.run_in_executor(None, source_paths, path, exclude)
+
+    owned: Optional[Executor] = None
+    if executor is None and workers > 1 and len(paths) > 1:
+        executor = owned = ProcessPoolExecutor(max_workers=workers)
+
+    pending: Deque["asyncio.Future[mt.FileMetrics]"] = deque()
+    try:
+        for file_path in paths:
+            pending.append(loop.run_in_executor(executor, an.analyze_file, file_path))
+            if len(pending) >= concurrency:
+                yield _filter(await pending.popleft(), exclude)
+        while pending:
+            yield _filter(await pending.popleft(), exclude)
+    finally:
+        # Reached when cancelled or when the consumer stops early,
+        # the files not yet started are never analyzed.
+        for future in pending:
+            future.cancel()
+        if owned is not None:
+            owned.shutdown(wait=False)
+
+
+async def analyze_async(
+    path: Union[str, pathlib.Path],
+    workers: int = 1,
+    concurrency: Optional[int] = None,
+    exclude: Optional[ex.Exclude] = None,
+    executor: Optional[Executor] = None,
+) -> mt.MetricsStore:
+    """Computes the metrics of a package (or source file) without blocking.
+
+    Parameters
+    ----------
+    path : Union[str, pathlib.Path]
+        Python package or source file.
+    workers : int
+        Number of processes used to analyze the files. Defaults to 1.
+    concurrency : Optional[int]
+        Maximum number of files being analyzed at once. Defaults to twice
+        the number of workers.
+    exclude : Optional[ex.Exclude]
+        Paths (relative to the package) and functions to exclude.
+        Defaults to None.
+    executor : Optional[Executor]
+        Executor shared with other scans. Defaults to None.
+
+    Returns
+    -------
+    store : mt.MetricsStore
+        Metrics of each file, the totals are obtained from store.totals().
+
+    See Also
+    --------
+    iter_analyze_async
+
+    Examples
+    --------
+    >>> store = await analyze_async(path, workers=4)
+    >>> store.totals().lines
+    """
+    store = mt.MetricsStore()
+    async for metrics in iter_analyze_async(
+        path,
+        workers=workers,
+        concurrency=concurrency,
+        exclude=exclude,
+        executor=executor,
+    ):
+        store.append(metrics)
+    return store
+
+
+def _filter(metrics: mt.FileMetrics, exclude: Optional[ex.Exclude]) -> mt.FileMetrics:
+    """Removes the excluded functions, if any."""
+    if exclude is None:
+        return metrics
+    return exclude.filter(metrics)
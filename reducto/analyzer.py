@@ -0,0 +1,536 @@
+"""Module containing the analysis of multiple source files.
+
+The source files can be analyzed serially, or spread over a pool of
+processes. In the latter case, only the computed metrics are sent back
+to the main process.
+
+Identical source files (like vendored modules or empty __init__.py files)
+are analyzed once per run: the files whose size matches another file are
+hashed, and the metrics of each content are copied to every path sharing it.
+"""
+
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from collections import Counter
+import mmap
+import os
+import pathlib
+
+import reducto.src as src
+import reducto.metrics as mt
+import reducto.cache as ch
+import reducto.profile as pf
+
+if TYPE_CHECKING:
+    # Imported when the first pool is created, as it imports multiprocessing.
+    from concurrent.futures import ProcessPoolExecutor  # pragma: no cover
+
+
+def usable_cpus() -> int:
+    """Number of CPUs the current process is allowed to use.
+
+    Returns
+    -------
+    cpus : int
+        Uses the affinity of the process when available, the total number
+        of CPUs otherwise.
+    """
+    try:
+        return len(os.sched_getaffinity(0))  # type: ignore[attr-defined,unused-ignore]
+    except AttributeError:  # pragma: no cover, not available on every platform
+        return os.cpu_count() or 1
+
+
+def analyze_file(path: str) -> mt.FileMetrics:
+    """Computes the metrics of a single source file.
+
+    Entry point for the worker processes, defined at the module level
+    so it can be pickled.
+    The file is analyzed in lean mode, only the metrics are kept.
+
+    Parameters
+    ----------
+    path : str
+        Full path of the source file.
+
+    Returns
+    -------
+    metrics : mt.FileMetrics
+    """
+    return src.SourceFile(pathlib.Path(path), lean=True).metrics
+
+
+def analyze_source(source: src.Buffer, path: str) -> mt.FileMetrics:
+    """Computes the metrics of the content of a source file.
+
+    Entry point for the worker processes when the content doesn't come
+    from the file system (like a blob read from git).
+
+    Parameters
+    ----------
+    source : src.Buffer
+        Raw content of the file.
+    path : str
+        Name reported for the file.
+
+    Returns
+    -------
+    metrics : mt.FileMetrics
+    """
+    return src.SourceFile.from_source(source, name=path, lean=True).metrics
+
+
+def profile_file(path: str) -> Tuple[mt.FileMetrics, pf.Timings]:
+    """Computes the metrics of a single source file, timing each phase.
+
+    Parameters
+    ----------
+    path : str
+        Full path of the source file.
+
+    Returns
+    -------
+    result : Tuple[mt.FileMetrics, pf.Timings]
+        Metrics of the file and time spent on each phase.
+    """
+    profile = pf.Profile()
+    metrics = src.SourceFile(pathlib.Path(path), lean=True, profile=profile).metrics
+    return metrics, profile.files.get(path, {})
+
+
+class Analyzer:
+    """Computes the metrics of a set of source files.
+
+    Controls the pool of processes used to analyze the files. The pool
+    is created the first time it is needed and reused until the analyzer
+    is closed, so an Analyzer can be shared by different packages.
+    When a cache is given, only the files without a valid entry are analyzed.
+
+    The files with the same content are analyzed once: only the files whose
+    size matches the size of another file seen by the analyzer are hashed,
+    and the metrics of each content hashed are kept until the analyzer is
+    discarded. The number of files whose metrics were copied from another
+    file are counted in stats (dedup_hits).
+
+    Examples
+    --------
+    >>> with Analyzer(workers=4) as analyzer:
+    ...     metrics = analyzer.analyze(paths)
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        cache: Optional[ch.Cache] = None,
+        profile: Optional[pf.Profile] = None,
+        dedup: bool = True,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        workers : int
+            Number of processes to spread the analysis. When 1, the files
+            are analyzed on the current process. Defaults to 1.
+        cache : Optional[ch.Cache]
+            Cache to reuse the metrics of the files already analyzed.
+            Defaults to None, every file is analyzed.
+        profile : Optional[pf.Profile]
+            Records the time spent on each phase of the analysis of the
+            files, including those analyzed by the pool. Defaults to None.
+        dedup : bool
+            Analyze the files with the same content once. Defaults to True.
+
+        Raises
+        ------
+        ValueError
+            If the number of workers is lower than 1.
+        """
+        if workers < 1:
+            raise ValueError(f"workers must be a positive number, got: {workers}.")
+
+        self._workers: int = workers
+        self._cache: Optional[ch.Cache] = cache
+        self._profile: Optional[pf.Profile] = profile
+        self._executor: Optional["ProcessPoolExecutor"] = None
+        self._dedup: bool = dedup
+        # Sizes of the files seen, and metrics of the contents hashed.
+        self._sizes: Set[int] = set()
+        self._contents: Dict[str, mt.FileMetrics] = {}
+        self.stats: "Counter[str]" = Counter()
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"(workers={self.workers})"
+
+    def __enter__(self) -> "Analyzer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @property
+    def workers(self) -> int:
+        """Number of processes used to analyze the files.
+
+        Returns
+        -------
+        workers : int
+        """
+        return self._workers
+
+    @property
+    def cache(self) -> Optional[ch.Cache]:
+        """Cache of metrics used by the analyzer, if any.
+
+        Returns
+        -------
+        cache : Optional[ch.Cache]
+        """
+        return self._cache
+
+    @property
+    def profile(self) -> Optional[pf.Profile]:
+        """Profile of the analysis, if any.
+
+        Returns
+        -------
+        profile : Optional[pf.Profile]
+        """
+        return self._profile
+
+    def _get_executor(self) -> "ProcessPoolExecutor":
+        """Returns the pool of processes, creating it on the first call."""
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def analyze(
+        self,
+        paths: Iterable[Union[str, pathlib.Path]],
+        cache: Optional[ch.Cache] = None,
+    ) -> List[mt.FileMetrics]:
+        """Computes the metrics of the source files.
+
+        The number of files seen, analyzed, found in the cache and copied
+        from a file with the same content are accumulated in stats.
+
+        Parameters
+        ----------
+        paths : Iterable[Union[str, pathlib.Path]]
+            Paths of the source files.
+        cache : Optional[ch.Cache]
+            Cache used instead of the one of the analyzer. Defaults to None.
+
+        Returns
+        -------
+        metrics : List[mt.FileMetrics]
+            Metrics of each file, in the same order as the paths given.
+
+        See Also
+        --------
+        iter_analyze
+        """
+        return list(self.iter_analyze(paths, cache=cache))
+
+    def iter_analyze(
+        self,
+        paths: Iterable[Union[str, pathlib.Path]],
+        cache: Optional[ch.Cache] = None,
+    ) -> Iterator[mt.FileMetrics]:
+        """Yields the metrics of the source files as soon as they are computed.
+
+        Parameters
+        ----------
+        paths : Iterable[Union[str, pathlib.Path]]
+            Paths of the source files.
+        cache : Optional[ch.Cache]
+            Cache used instead of the one of the analyzer, like the
+            state of a package. Defaults to None.
+
+        Yields
+        ------
+        metrics : mt.FileMetrics
+            Metrics of each file, in the same order as the paths given.
+        """
+        paths_: List[str] = [str(path) for path in paths]
+        self.stats["files"] += len(paths_)
+
+        if cache is None:
+            cache = self.cache
+        if cache is None:
+            yield from self._iter_analyze(paths_)
+            return
+
+        keys: List[ch.FileKey] = [ch.file_key(path) for path in paths_]
+        cached: List[Optional[mt.FileMetrics]] = [cache.get(key) for key in keys]
+        missing: List[str] = [
+            path for path, metrics in zip(paths_, cached) if metrics is None
+        ]
+        self.stats["cache_hits"] += len(paths_) - len(missing)
+
+        # The sizes of the keys spare the dedup another stat.
+        sizes: List[int] = [
+            key.size for key, metrics in zip(keys, cached) if metrics is None
+        ]
+        computed: Iterator[mt.FileMetrics] = self._iter_analyze(missing, sizes)
+        for key, metrics in zip(keys, cached):
+            if metrics is None:
+                metrics = next(computed)
+                cache.put(key, metrics)
+            yield metrics
+
+    def analyze_sources(
+        self,
+        sources: Iterable[Tuple[str, Union[str, src.Buffer]]],
+        cache: Optional[ch.Cache] = None,
+    ) -> List[mt.FileMetrics]:
+        """Computes the metrics of contents held in memory.
+
+        Parameters
+        ----------
+        sources : Iterable[Tuple[str, Union[str, src.Buffer]]]
+            Name and content (decoded or raw) of each source file.
+        cache : Optional[ch.Cache]
+            Cache used instead of the one of the analyzer. Defaults to None.
+
+        Returns
+        -------
+        metrics : List[mt.FileMetrics]
+            Metrics of each source, in the same order as given.
+
+        See Also
+        --------
+        iter_analyze_sources
+        """
+        return list(self.iter_analyze_sources(sources, cache=cache))
+
+    def iter_analyze_sources(
+        self,
+        sources: Iterable[Tuple[str, Union[str, src.Buffer]]],
+        cache: Optional[ch.Cache] = None,
+    ) -> Iterator[mt.FileMetrics]:
+        """Yields the metrics of contents held in memory, like editor buffers.
+
+        Nothing is read from the file system. The contents are hashed,
+        so those already analyzed (or stored in the cache by their hash)
+        are not analyzed again.
+
+        Parameters
+        ----------
+        sources : Iterable[Tuple[str, Union[str, src.Buffer]]]
+            Name and content of each source file. The names must end
+            with .py, the decoded contents are encoded with
+            src.encode_source.
+        cache : Optional[ch.Cache]
+            Cache used instead of the one of the analyzer, the entries
+            are stored by the hash of the content. Defaults to None.
+
+        Yields
+        ------
+        metrics : mt.FileMetrics
+            Metrics of each source, in the same order as given.
+        """
+        names: List[str] = []
+        contents: List[src.Buffer] = []
+        for name, source in sources:
+            names.append(name)
+            contents.append(
+                src.encode_source(source) if isinstance(source, str) else source
+            )
+        self.stats["files"] += len(names)
+
+        if cache is None:
+            cache = self.cache
+        digests: List[Optional[str]] = [
+            ch.content_digest(content) if self._dedup or cache is not None else None
+            for content in contents
+        ]
+        # Metrics found in the cache by position, and positions to analyze.
+        cached: Dict[int, mt.FileMetrics] = {}
+        unique: List[int] = []
+        scheduled: Set[str] = set()
+        for i, digest in enumerate(digests):
+            if digest is None:
+                unique.append(i)
+                continue
+            if self._dedup and (digest in self._contents or digest in scheduled):
+                continue
+            metrics: Optional[mt.FileMetrics] = (
+                cache.get_content(digest) if cache is not None else None
+            )
+            if metrics is None:
+                unique.append(i)
+                if self._dedup:
+                    scheduled.add(digest)
+            else:
+                cached[i] = metrics
+                if self._dedup:
+                    self._contents[digest] = metrics
+        self.stats["cache_hits"] += len(cached)
+
+        computed: Iterator[mt.FileMetrics] = self._iter_compute_sources(
+            [contents[i] for i in unique], [names[i] for i in unique]
+        )
+        analyzed: Set[int] = set(unique)
+        for i, (name, digest) in enumerate(zip(names, digests)):
+            if i in cached:
+                metrics = cached[i]._replace(path=name)
+            elif i in analyzed:
+                metrics = next(computed)
+                if digest is not None and self._dedup:
+                    self._contents[digest] = metrics
+                if digest is not None and cache is not None:
+                    cache.put_content(digest, metrics)
+            else:
+                self.stats["dedup_hits"] += 1
+                metrics = self._contents[digest]._replace(  # type: ignore[index]
+                    path=name
+                )
+            yield metrics
+
+    def _iter_analyze(
+        self, paths: List[str], sizes: Optional[List[int]] = None
+    ) -> Iterator[mt.FileMetrics]:
+        """Computes the metrics of the files, each content once.
+
+        The sizes of the files are obtained from their stat unless given.
+        """
+        if not self._dedup or len(paths) == 0:
+            return self._iter_compute(paths)
+        if sizes is None:
+            sizes = [os.stat(path).st_size for path in paths]
+        return self._iter_dedup(paths, sizes)
+
+    def _iter_dedup(
+        self, paths: List[str], sizes: List[int]
+    ) -> Iterator[mt.FileMetrics]:
+        """Computes the metrics of the first file of each content.
+
+        A file can only share its content with the files of the same size,
+        so the files with a size not seen before are never hashed.
+        """
+        counts: "Counter[int]" = Counter(sizes)
+        hashed: List[bool] = [counts[size] > 1 or size in self._sizes for size in sizes]
+        self._sizes.update(sizes)
+        if self.workers == 1 and self.profile is None:
+            return self._iter_dedup_serial(paths, hashed)
+        return self._iter_dedup_pool(paths, hashed)
+
+    def _iter_dedup_serial(
+        self, paths: List[str], hashed: List[bool]
+    ) -> Iterator[mt.FileMetrics]:
+        """Same as _iter_dedup on the current process.
+
+        The files hashed are read once, the metrics are computed
+        from the same content.
+        """
+        for path, hash_ in zip(paths, hashed):
+            if not hash_:
+                yield from self._iter_compute([path])
+                continue
+            source: src.Buffer = src.read_source(pathlib.Path(path))
+            try:
+                digest: str = ch.content_digest(source)
+                metrics: Optional[mt.FileMetrics] = self._contents.get(digest)
+                if metrics is not None:
+                    self.stats["dedup_hits"] += 1
+                    metrics = metrics._replace(path=path)
+                else:
+                    self.stats["analyzed"] += 1
+                    metrics = self._contents[digest] = analyze_source(source, path)
+            finally:
+                if isinstance(source, mmap.mmap):
+                    source.close()
+            yield metrics
+
+    def _iter_dedup_pool(
+        self, paths: List[str], hashed: List[bool]
+    ) -> Iterator[mt.FileMetrics]:
+        """Same as _iter_dedup, the first file of each content sent to the pool."""
+        digests: List[Optional[str]] = [
+            ch.file_digest(path) if hash_ else None
+            for path, hash_ in zip(paths, hashed)
+        ]
+        unique: List[str] = []
+        scheduled: Set[str] = set()
+        for path, digest in zip(paths, digests):
+            if digest is None:
+                unique.append(path)
+            elif digest not in self._contents and digest not in scheduled:
+                scheduled.add(digest)
+                unique.append(path)
+
+        computed: Iterator[mt.FileMetrics] = self._iter_compute(unique)
+        for path, digest in zip(paths, digests):
+            if digest is None:
+                yield next(computed)
+                continue
+            metrics: Optional[mt.FileMetrics] = self._contents.get(digest)
+            if metrics is None:
+                metrics = self._contents[digest] = next(computed)
+                yield metrics
+            else:
+                self.stats["dedup_hits"] += 1
+                yield metrics._replace(path=path)
+
+    def _iter_compute(self, paths: List[str]) -> Iterator[mt.FileMetrics]:
+        """Computes the metrics of the files, serially or in the pool."""
+        self.stats["analyzed"] += len(paths)
+
+        if self.profile is not None:
+            return self._iter_profile(paths, self.profile)
+
+        if self.workers == 1 or len(paths) < 2:
+            return (analyze_file(path) for path in paths)
+
+        # Send the files in chunks to reduce the communication overhead,
+        # while keeping enough chunks to balance the load between workers.
+        chunksize: int = max(1, len(paths) // (self.workers * 4))
+        executor = self._get_executor()
+        # map returns the results in the order of the inputs.
+        return executor.map(analyze_file, paths, chunksize=chunksize)
+
+    def _iter_compute_sources(
+        self, contents: List[src.Buffer], names: List[str]
+    ) -> Iterator[mt.FileMetrics]:
+        """Same as _iter_compute, for the contents held in memory."""
+        self.stats["analyzed"] += len(names)
+
+        if self.workers == 1 or len(names) < 2:
+            return map(analyze_source, contents, names)
+
+        chunksize: int = max(1, len(names) // (self.workers * 4))
+        return self._get_executor().map(
+            analyze_source, contents, names, chunksize=chunksize
+        )
+
+    def _iter_profile(
+        self, paths: List[str], profile: pf.Profile
+    ) -> Iterator[mt.FileMetrics]:
+        """Same as _iter_analyze, recording the timings of the files."""
+        results: Iterable[Tuple[mt.FileMetrics, pf.Timings]]
+        if self.workers == 1 or len(paths) < 2:
+            results = map(profile_file, paths)
+        else:
+            chunksize: int = max(1, len(paths) // (self.workers * 4))
+            results = self._get_executor().map(profile_file, paths, chunksize=chunksize)
+        for path, (metrics, timings) in zip(paths, results):
+            profile.update(path, timings)
+            yield metrics
+
+    def close(self) -> None:
+        """Shuts down the pool of processes, if any was created."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
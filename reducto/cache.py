@@ -0,0 +1,303 @@
+"""Module containing the caches of the metrics computed per file.
+
+The metrics of each source file are stored along the identity of the file.
+An entry is valid while the path, size and modification time of the file
+are the same, or when only the modification time changed but the content
+hash is the same.
+The persistent cache stores every entry as a json file in the cache directory.
+Every version of reducto (and of the metric definitions) uses its own
+directory, so the entries are invalidated when any of them changes.
+"""
+
+from typing import Any, BinaryIO, Dict, NamedTuple, Optional, Union
+import hashlib
+import json
+import mmap
+import os
+import pathlib
+
+import reducto.metrics as mt
+import reducto as rd
+
+# Size of the blocks read to compute the hash of a file.
+CHUNK_SIZE: int = 1 << 16
+# Prefix of the entries stored by the hash of a content instead of a path.
+CONTENT_PREFIX: str = "content:"
+
+
+class FileKey(NamedTuple):
+    """Identity of a file at the moment of being analyzed."""
+
+    path: str
+    size: int
+    mtime_ns: int
+
+
+def file_key(path: Union[str, pathlib.Path]) -> FileKey:
+    """Obtain the identity of a file from its stat.
+
+    Parameters
+    ----------
+    path : Union[str, pathlib.Path]
+
+    Returns
+    -------
+    key : FileKey
+    """
+    stat = os.stat(path)
+    return FileKey(str(path), stat.st_size, stat.st_mtime_ns)
+
+
+def file_digest(path: Union[str, pathlib.Path]) -> str:
+    """Computes the hash of the content of a file.
+
+    Parameters
+    ----------
+    path : Union[str, pathlib.Path]
+
+    Returns
+    -------
+    digest : str
+        Hexadecimal blake2b digest of the file.
+    """
+    with open(path, "rb") as f:
+        return _read_digest(f)
+
+
+def _read_digest(f: BinaryIO) -> str:
+    """Hash of the remaining content of a file opened in binary mode."""
+    hasher = hashlib.blake2b(digest_size=20)
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def content_digest(content: Union[bytes, memoryview, mmap.mmap]) -> str:
+    """Computes the hash of a content already read, same as file_digest.
+
+    Parameters
+    ----------
+    content : Union[bytes, memoryview, mmap.mmap]
+
+    Returns
+    -------
+    digest : str
+        Hexadecimal blake2b digest of the content.
+    """
+    return hashlib.blake2b(content, digest_size=20).hexdigest()
+
+
+class Cache:
+    """Base class for the caches of FileMetrics.
+
+    Each entry contains the identity of the file (path, size, modification
+    time and content hash) along with its metrics. Subclasses define where
+    the entries are stored.
+    """
+
+    def _load(self, path: str) -> Optional[Dict[str, Any]]:  # pragma: no cover
+        """Reads the entry of a file, None if there is no entry."""
+        raise NotImplementedError
+
+    def _dump(self, entry: Dict[str, Any]) -> None:  # pragma: no cover
+        """Stores an entry, replacing the previous entry of the file."""
+        raise NotImplementedError
+
+    def get(self, key: FileKey) -> Optional[mt.FileMetrics]:
+        """Obtain the metrics stored for a file.
+
+        Parameters
+        ----------
+        key : FileKey
+            Current identity of the file.
+
+        Returns
+        -------
+        metrics : Optional[mt.FileMetrics]
+            None when there is no valid entry for the file.
+        """
+        entry = self._load(key.path)
+        if entry is None or entry["size"] != key.size:
+            return None
+
+        if entry["mtime_ns"] != key.mtime_ns:
+            # The file was touched, check if the content really changed.
+            if entry["digest"] != file_digest(key.path):
+                return None
+            entry["mtime_ns"] = key.mtime_ns
+            self._dump(entry)
+
+        metrics: mt.FileMetrics = entry["metrics"]
+        return metrics
+
+    def put(self, key: FileKey, metrics: mt.FileMetrics) -> None:
+        """Stores the metrics of a file.
+
+        The entry is not stored if the file changed since the key was
+        obtained, as the metrics may not correspond to its content. The
+        identity is checked on the file opened to compute its hash.
+
+        Parameters
+        ----------
+        key : FileKey
+            Identity of the file when it was analyzed.
+        metrics : mt.FileMetrics
+        """
+        with open(key.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if (stat.st_size, stat.st_mtime_ns) != (key.size, key.mtime_ns):
+                return
+            digest: str = _read_digest(f)
+        entry: Dict[str, Any] = {
+            "path": key.path,
+            "size": key.size,
+            "mtime_ns": key.mtime_ns,
+            "digest": digest,
+            "metrics": metrics,
+        }
+        self._dump(entry)
+
+    def get_content(self, digest: str) -> Optional[mt.FileMetrics]:
+        """Obtain the metrics stored for a content, by its hash.
+
+        The content never changes for a given hash (like a git blob),
+        so the entry is always valid.
+
+        Parameters
+        ----------
+        digest : str
+            Hash of the content.
+
+        Returns
+        -------
+        metrics : Optional[mt.FileMetrics]
+            None when there is no entry for the content.
+        """
+        entry = self._load(CONTENT_PREFIX + digest)
+        if entry is None:
+            return None
+        metrics: mt.FileMetrics = entry["metrics"]
+        return metrics
+
+    def put_content(self, digest: str, metrics: mt.FileMetrics) -> None:
+        """Stores the metrics of a content, by its hash.
+
+        Parameters
+        ----------
+        digest : str
+            Hash of the content.
+        metrics : mt.FileMetrics
+        """
+        self._dump({"path": CONTENT_PREFIX + digest, "metrics": metrics})
+
+
+class MetricsCache(Cache):
+    """Persistent cache of FileMetrics.
+
+    Every entry is stored as a json file in the cache directory.
+
+    Examples
+    --------
+    >>> cache = MetricsCache(pathlib.Path(".reducto_cache"))
+    >>> key = file_key(path)
+    >>> metrics = cache.get(key)
+    >>> if metrics is None:
+    ...     metrics = analyze_file(path)
+    ...     cache.put(key, metrics)
+    """
+
+    def __init__(self, directory: pathlib.Path) -> None:
+        """
+        Parameters
+        ----------
+        directory : pathlib.Path
+            Directory where the entries are stored, created if it doesn't exist.
+        """
+        namespace: str = f"{rd.__version__}-{mt.METRICS_VERSION}"
+        self._directory: pathlib.Path = pathlib.Path(directory) / namespace
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self.directory})"
+
+    @property
+    def directory(self) -> pathlib.Path:
+        """Directory containing the entries of the current version.
+
+        Returns
+        -------
+        directory : pathlib.Path
+        """
+        return self._directory
+
+    def _entry_path(self, path: str) -> pathlib.Path:
+        """Location of the entry of a file, spread in subdirectories."""
+        name: str = hashlib.blake2b(path.encode(), digest_size=16).hexdigest()
+        return self.directory / name[:2] / (name[2:] + ".json")
+
+    def _load(self, path: str) -> Optional[Dict[str, Any]]:
+        """Reads the entry of a file, None if missing or unreadable."""
+        try:
+            with open(self._entry_path(path)) as f:
+                entry: Dict[str, Any] = json.load(f)
+            # Two paths could share the name of the entry.
+            if entry["path"] != path:
+                return None
+            entry["metrics"] = mt.FileMetrics.from_list(entry["metrics"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return entry
+
+    def _dump(self, entry: Dict[str, Any]) -> None:
+        """Writes an entry atomically, so readers never see it partially."""
+        entry_path = self._entry_path(entry["path"])
+        entry_path.parent.mkdir(exist_ok=True)
+        # Imported here, the runs without a persistent cache don't need it.
+        import tempfile
+
+        fd, tmp = tempfile.mkstemp(dir=entry_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp, entry_path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+class MemoryCache(Cache):
+    """Cache of FileMetrics kept in memory.
+
+    The entries can be obtained to be stored elsewhere, like
+    in the state of a report.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        """
+        Parameters
+        ----------
+        entries : Optional[Dict[str, Dict[str, Any]]]
+            Initial entries, by path of the file. Defaults to None.
+        """
+        self._entries: Dict[str, Dict[str, Any]] = (
+            entries if entries is not None else {}
+        )
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({len(self.entries)} entries)"
+
+    @property
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        """Entries stored, by path of the file.
+
+        Returns
+        -------
+        entries : Dict[str, Dict[str, Any]]
+        """
+        return self._entries
+
+    def _load(self, path: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(path)
+
+    def _dump(self, entry: Dict[str, Any]) -> None:
+        self._entries[entry["path"]] = entry
@@ -1,10 +1,10 @@
-"""Call the Command Line Interface here. """
+"""Call the Command Line Interface here."""
 
 import sys
 from typing import List
 from typing import Optional
 
-from reducto import reducto
+import reducto as rd
 
 
 def main(argv: Optional[List[str]] = None) -> None:  # pragma: no cover, proxy
@@ -16,5 +16,12 @@ def main(argv: Optional[List[str]] = None) -> None:  # pragma: no cover, proxy
     if argv is None:
         argv = sys.argv[1:]
 
+    if argv in (["--version"], ["-v"]):
+        # Answered without building the application.
+        print(f"reducto {rd.__version__}")
+        return
+
+    from reducto import reducto
+
     app = reducto.Reducto()
     app.run(argv)
@@ -0,0 +1,395 @@
+"""Module containing the daemon keeping the metrics warm between runs.
+
+``reducto serve`` listens on a Unix socket, and keeps the metrics of every
+file analyzed in memory. An entry is valid while the size and modification
+time of the file are the same (or its content when only the modification
+time changed), so only the files changed since the previous query are
+analyzed again.
+
+Each request is a json object written in a single line, answered by
+a json object in a single line:
+
+    {"query": "file", "path": "/repo/package/module.py"}
+    {"ok": true, "result": {"lines": 120, "number_of_functions": 4, ...}}
+
+The queries are:
+
+- ping: version of reducto and stats of the daemon.
+- file: metrics of a source file (path).
+- function: metrics of the functions of a source file (path), optionally
+  only those with a given (qualified) name.
+- package: totals and metrics of each file of a package (path).
+- report: report of a command line (argv, run from cwd), used by
+  ``reducto --daemon``.
+- shutdown: stops the daemon.
+
+The file, function and package queries accept the exclusion rules
+(exclude, exclude_private and exclude_dunder). A request which fails
+is answered with ok false and the error.
+"""
+
+from typing import Any, Callable, Dict, List, NoReturn, Optional, Union
+from collections import Counter
+import json
+import os
+import pathlib
+import socket
+import socketserver
+import tempfile
+import threading
+
+import reducto.analyzer as an
+import reducto.cache as ch
+import reducto.exclude as ex
+import reducto.metrics as mt
+import reducto.package as pkg
+import reducto.reports as rp
+import reducto.src as src
+import reducto as rd
+
+# Environment variable with the path of the socket.
+SOCKET_ENV: str = "REDUCTO_SOCKET"
+# Seconds a client waits for the answer of the daemon.
+TIMEOUT: float = 60.0
+# Seconds a connection is kept open without receiving a request.
+IDLE_TIMEOUT: float = 300.0
+
+
+class DaemonError(Exception):
+    """Error raised when the daemon can't be reached or a query fails."""
+
+    pass
+
+
+def socket_path() -> pathlib.Path:
+    """Default path of the socket of the daemon.
+
+    Given by the REDUCTO_SOCKET environment variable, otherwise placed
+    in the runtime directory of the user (or the temporary directory).
+
+    Returns
+    -------
+    path : pathlib.Path
+    """
+    path: Optional[str] = os.environ.get(SOCKET_ENV)
+    if path:
+        return pathlib.Path(path)
+    runtime_dir: Optional[str] = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return pathlib.Path(runtime_dir) / "reducto.sock"
+    user: str = str(os.getuid()) if hasattr(os, "getuid") else "user"
+    return pathlib.Path(tempfile.gettempdir()) / f"reducto-{user}.sock"
+
+
+class Daemon:
+    """Answers the queries of the clients, keeping the metrics warm.
+
+    The queries are answered one at a time by handle, serve listens
+    on the socket until a shutdown query is received. Each connection
+    is served on its own thread, so an idle client doesn't block the others.
+
+    Examples
+    --------
+    >>> daemon = Daemon(workers=4)
+    >>> daemon.handle({"query": "file", "path": "/repo/package/module.py"})
+    {'ok': True, 'result': {'lines': 120, ...}}
+    """
+
+    def __init__(self, workers: int = 1) -> None:
+        """
+        Parameters
+        ----------
+        workers : int
+            Number of processes used to analyze the files. Defaults to 1.
+        """
+        self._cache: ch.MemoryCache = ch.MemoryCache()
+        self._analyzer: an.Analyzer = an.Analyzer(workers=workers, cache=self._cache)
+        self._closed: bool = False
+        self.stats: "Counter[str]" = Counter()
+        self._queries: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "ping": self._ping,
+            "file": self._file,
+            "function": self._function,
+            "package": self._package,
+            "report": self._report,
+            "shutdown": self._shutdown,
+        }
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({len(self._cache.entries)} files)"
+
+    @property
+    def analyzer(self) -> an.Analyzer:
+        """Analyzer shared by every query, with the metrics kept in memory.
+
+        Returns
+        -------
+        analyzer : an.Analyzer
+        """
+        return self._analyzer
+
+    @property
+    def closed(self) -> bool:
+        """Whether a shutdown query was received.
+
+        Returns
+        -------
+        closed : bool
+        """
+        return self._closed
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answers a query.
+
+        Parameters
+        ----------
+        request : Dict[str, Any]
+            Contains the query and its arguments.
+
+        Returns
+        -------
+        response : Dict[str, Any]
+            With ok true and the result, or ok false and the error.
+        """
+        query: Optional[Callable[[Dict[str, Any]], Any]] = self._queries.get(
+            request.get("query", "")
+        )
+        if query is None:
+            return {"ok": False, "error": f"Unknown query: {request.get('query')}."}
+        self.stats[request["query"]] += 1
+        try:
+            return {"ok": True, "result": query(request)}
+        # The daemon must keep running, even if a query tries to exit.
+        except (Exception, SystemExit) as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    def serve(self, path: Optional[pathlib.Path] = None) -> None:
+        """Listens on the socket until a shutdown query is received.
+
+        Parameters
+        ----------
+        path : Optional[pathlib.Path]
+            Path of the socket. Defaults to socket_path().
+
+        Raises
+        ------
+        DaemonError
+            If a daemon is already listening on the socket.
+        """
+        path = path if path is not None else socket_path()
+        if path.exists():
+            if is_running(path):
+                raise DaemonError(f"A daemon is already running on {path}.")
+            path.unlink()  # Left by a daemon which didn't stop cleanly.
+
+        daemon = self
+        # The queries are answered one at a time, the analyzer isn't shared
+        # between threads.
+        lock = threading.Lock()
+
+        class Handler(socketserver.StreamRequestHandler):
+            timeout = IDLE_TIMEOUT
+
+            def handle(self) -> None:
+                try:
+                    for line in self.rfile:
+                        try:
+                            request: Any = json.loads(line)
+                        except ValueError:
+                            request = {}
+                        if not isinstance(request, dict):
+                            request = {}
+                        with lock:
+                            response = daemon.handle(request)
+                        self.wfile.write(json.dumps(response).encode() + b"\n")
+                        self.wfile.flush()
+                        if daemon.closed:
+                            # Stops serve_forever, running on another thread.
+                            self.server.shutdown()
+                            return
+                except OSError:  # Idle for too long, or closed by the client.
+                    return
+
+        class Server(socketserver.ThreadingUnixStreamServer):
+            daemon_threads = True
+
+        with Server(str(path), Handler) as server:
+            os.chmod(path, 0o600)
+            try:
+                server.serve_forever()
+            finally:
+                path.unlink()
+                self._analyzer.close()
+
+    def _ping(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "version": rd.__version__,
+            "pid": os.getpid(),
+            "files": len(self._cache.entries),
+            "queries": dict(self.stats),
+            "analyzer": dict(self._analyzer.stats),
+        }
+
+    def _metrics(self, request: Dict[str, Any]) -> mt.FileMetrics:
+        """Metrics of the source file of a request, excluded functions removed."""
+        path = pathlib.Path(request["path"])
+        src.SourceFile.validate(path)
+        metrics: mt.FileMetrics = self._analyzer.analyze([path])[0]
+        return _exclude(request).filter(metrics)
+
+    def _file(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return rp.metrics_as_dict(
+            self._metrics(request), percentage=request.get("percentage", False)
+        )
+
+    def _function(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        name: Optional[str] = request.get("name")
+        return [
+            func._asdict()
+            for func in self._metrics(request).functions
+            if name is None or name in (func.name, func.name.rpartition(".")[2])
+        ]
+
+    def _package(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        package = pkg.Package(
+            pathlib.Path(request["path"]),
+            exclude=_exclude(request),
+            analyzer=self._analyzer,
+        )
+        percentage: bool = request.get("percentage", False)
+        return {
+            "name": package.name,
+            "totals": rp.totals_as_dict(package.totals, percentage=percentage),
+            "files": {
+                package.relname(metrics.path): rp.metrics_as_dict(
+                    metrics, percentage=percentage
+                )
+                for metrics in package.store
+            },
+        }
+
+    def _report(self, request: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
+        import reducto.reducto as app
+
+        def error(message: str) -> NoReturn:
+            # The parser would exit the daemon on invalid arguments.
+            raise ValueError(message)
+
+        reducto = app.Reducto(analyzer=self._analyzer)
+        reducto.parser.error = error  # type: ignore[method-assign]
+        return reducto.daemon_report(request["argv"], pathlib.Path(request["cwd"]))
+
+    def _shutdown(self, request: Dict[str, Any]) -> None:
+        self._closed = True
+
+
+def _exclude(request: Dict[str, Any]) -> ex.Exclude:
+    """Rules to exclude paths and functions given in a request."""
+    return ex.Exclude(
+        request.get("exclude", []),
+        private=request.get("exclude_private", False),
+        dunder=request.get("exclude_dunder", False),
+    )
+
+
+class Client:
+    """Sends queries to the daemon.
+
+    Examples
+    --------
+    >>> with Client() as client:
+    ...     client.query("file", path="/repo/package/module.py")
+    {'lines': 120, ...}
+    """
+
+    def __init__(self, path: Optional[pathlib.Path] = None, timeout: float = TIMEOUT):
+        """
+        Parameters
+        ----------
+        path : Optional[pathlib.Path]
+            Path of the socket. Defaults to socket_path().
+        timeout : float
+            Seconds to wait for each answer. Defaults to TIMEOUT.
+
+        Raises
+        ------
+        DaemonError
+            When the daemon isn't running.
+        """
+        self._path: pathlib.Path = path if path is not None else socket_path()
+        self._socket: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        try:
+            self._socket.connect(str(self._path))
+        except OSError as e:
+            self._socket.close()
+            raise DaemonError(f"The daemon isn't running on {self._path}.") from e
+        self._file = self._socket.makefile("rwb")
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self._path})"
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def query(self, query: str, **kwargs: Any) -> Any:
+        """Sends a query and waits for its result.
+
+        Parameters
+        ----------
+        query : str
+            One of ping, file, function, package, report or shutdown.
+        kwargs : Any
+            Arguments of the query.
+
+        Returns
+        -------
+        result : Any
+
+        Raises
+        ------
+        DaemonError
+            When the query fails or the connection is lost.
+        """
+        request: Dict[str, Any] = {"query": query}
+        request.update(kwargs)
+        try:
+            self._file.write(json.dumps(request).encode() + b"\n")
+            self._file.flush()
+            line: bytes = self._file.readline()
+        except OSError as e:
+            raise DaemonError(f"Connection lost: {e}") from e
+        if not line:
+            raise DaemonError("Connection closed by the daemon.")
+        response: Dict[str, Any] = json.loads(line)
+        if not response["ok"]:
+            raise DaemonError(response["error"])
+        return response.get("result")
+
+    def close(self) -> None:
+        """Closes the connection."""
+        self._file.close()
+        self._socket.close()
+
+
+def is_running(path: Optional[pathlib.Path] = None) -> bool:
+    """Checks whether a daemon is listening on the socket.
+
+    Parameters
+    ----------
+    path : Optional[pathlib.Path]
+        Path of the socket. Defaults to socket_path().
+
+    Returns
+    -------
+    running : bool
+    """
+    try:
+        with Client(path, timeout=1.0) as client:
+            client.query("ping")
+    except (DaemonError, OSError, ValueError):
+        return False
+    return True
@@ -0,0 +1,222 @@
+"""Module containing the rules to exclude paths and functions from the reports.
+
+The glob patterns of the paths are compiled once into a single regular
+expression. A pattern without a / matches the name of a file or directory
+at any depth, otherwise it matches the path relative to the package.
+Excluded directories are not traversed.
+
+Private functions (_name) and dunder methods (__name__) can be excluded
+from the function metrics (number of functions and average length).
+Their lines are still counted in the lines of the file.
+"""
+
+from typing import Iterable, Optional, Pattern
+import fnmatch
+import re
+
+import reducto.metrics as mt
+
+
+def compile_patterns(patterns: Iterable[str]) -> Optional[Pattern[str]]:
+    """Compiles a set of glob patterns into a single regular expression.
+
+    Parameters
+    ----------
+    patterns : Iterable[str]
+        Glob patterns, see fnmatch.
+
+    Returns
+    -------
+    regex : Optional[Pattern[str]]
+        Matches a relative path (with / as separator) if any of the
+        patterns matches it. None when there are no patterns.
+
+    Examples
+    --------
+    >>> regex = compile_patterns(["migrations", "*_pb2.py"])
+    >>> bool(regex.match("app/migrations"))
+    True
+    """
+    parts = []
+    for pattern in patterns:
+        pattern = pattern.strip("/")
+        if not pattern:
+            continue
+        translated: str = fnmatch.translate(pattern)
+        if "/" not in pattern:
+            translated = "(?:.*/)?" + translated
+        parts.append(f"(?:{translated})")
+    if len(parts) == 0:
+        return None
+    return re.compile("|".join(parts))
+
+
+def is_dunder(name: str) -> bool:
+    """Checks whether a function name is a dunder (magic) method.
+
+    Parameters
+    ----------
+    name : str
+
+    Returns
+    -------
+    check : bool
+    """
+    return len(name) > 4 and name.startswith("__") and name.endswith("__")
+
+
+def is_private(name: str) -> bool:
+    """Checks whether a function name is private (but not a dunder).
+
+    Parameters
+    ----------
+    name : str
+
+    Returns
+    -------
+    check : bool
+    """
+    return name.startswith("_") and not is_dunder(name)
+
+
+class Exclude:
+    """Rules to exclude paths and functions.
+
+    Examples
+    --------
+    >>> exclude = Exclude(["tests", "*_pb2.py"], private=True)
+    >>> exclude.match_path("tests/test_foo.py")
+    True
+    >>> exclude.match_function("_helper")
+    True
+    """
+
+    def __init__(
+        self, patterns: Iterable[str] = (), private: bool = False, dunder: bool = False
+    ) -> None:
+        """
+        Parameters
+        ----------
+        patterns : Iterable[str]
+            Glob patterns of the paths to exclude. Defaults to none.
+        private : bool
+            Exclude the private functions. Defaults to False.
+        dunder : bool
+            Exclude the dunder methods. Defaults to False.
+        """
+        self._patterns = tuple(patterns)
+        self._regex: Optional[Pattern[str]] = compile_patterns(self._patterns)
+        self._private: bool = private
+        self._dunder: bool = dunder
+
+    def __repr__(self) -> str:
+        return (
+            type(self).__name__
+            + f"({list(self.patterns)}, private={self.private}, dunder={self.dunder})"
+        )
+
+    def __bool__(self) -> bool:
+        """False when nothing is excluded."""
+        return self._regex is not None or self.excludes_functions
+
+    @property
+    def patterns(self) -> Iterable[str]:
+        """Glob patterns of the paths excluded.
+
+        Returns
+        -------
+        patterns : Iterable[str]
+        """
+        return self._patterns
+
+    @property
+    def private(self) -> bool:
+        """Whether the private functions are excluded.
+
+        Returns
+        -------
+        private : bool
+        """
+        return self._private
+
+    @property
+    def dunder(self) -> bool:
+        """Whether the dunder methods are excluded.
+
+        Returns
+        -------
+        dunder : bool
+        """
+        return self._dunder
+
+    @property
+    def excludes_paths(self) -> bool:
+        """Whether any path pattern was given.
+
+        Returns
+        -------
+        check : bool
+        """
+        return self._regex is not None
+
+    @property
+    def excludes_functions(self) -> bool:
+        """Whether any function is excluded.
+
+        Returns
+        -------
+        check : bool
+        """
+        return self.private or self.dunder
+
+    def match_path(self, relpath: str) -> bool:
+        """Checks whether a path is excluded.
+
+        Parameters
+        ----------
+        relpath : str
+            Path relative to the package, with / as separator.
+
+        Returns
+        -------
+        check : bool
+        """
+        return self._regex is not None and self._regex.match(relpath) is not None
+
+    def match_function(self, name: str) -> bool:
+        """Checks whether a function is excluded.
+
+        Parameters
+        ----------
+        name : str
+            Name of the function, may be qualified (Class.method).
+
+        Returns
+        -------
+        check : bool
+        """
+        name = name.rpartition(".")[2]
+        if self.dunder and is_dunder(name):
+            return True
+        return self.private and is_private(name)
+
+    def filter(self, metrics: mt.FileMetrics) -> mt.FileMetrics:
+        """Removes the excluded functions from the metrics of a file.
+
+        Parameters
+        ----------
+        metrics : mt.FileMetrics
+
+        Returns
+        -------
+        metrics : mt.FileMetrics
+            The same metrics if no function is excluded.
+        """
+        if not self.excludes_functions:
+            return metrics
+        functions = tuple(
+            func for func in metrics.functions if not self.match_function(func.name)
+        )
+        if len(functions) == len(metrics.functions):
+            return metrics
+        return metrics._replace(functions=functions)
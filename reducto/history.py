@@ -0,0 +1,573 @@
+"""Module containing the analysis of a package along the history of a git repository.
+
+The trees and blobs of each commit are read straight from the object store
+of the repository (through a single git cat-file process), no commit is
+checked out. Every blob is analyzed once, keyed by its hash, and the totals
+of every tree are computed once, so the directories unchanged between
+commits are never traversed again.
+
+Blobs which can't be parsed by the running interpreter (like python 2 code
+in old commits) are skipped.
+"""
+
+from typing import (
+    IO,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import pathlib
+import subprocess
+import tokenize
+
+import reducto.analyzer as an
+import reducto.cache as ch
+import reducto.exclude as ex
+import reducto.metrics as mt
+import reducto.reports as rp
+import reducto.walker as wk
+
+# Modes of the entries of a git tree.
+TREE_MODE: bytes = b"40000"
+FILE_MODES: Tuple[bytes, ...] = (b"100644", b"100755")
+# Number of blobs read and sent at once to the pool of processes.
+BATCH_SIZE: int = 256
+
+
+class GitError(Exception):
+    """Error raised when a git command fails."""
+
+    pass
+
+
+class Commit(NamedTuple):
+    """Commit of the history, with its committer date (ISO 8601)."""
+
+    sha: str
+    date: str
+    subject: str
+
+
+class TreeEntry(NamedTuple):
+    """Entry of a git tree: a blob or another tree."""
+
+    mode: bytes
+    name: str
+    sha: str
+
+
+def git(repository: pathlib.Path, *args: str) -> str:
+    """Runs a git command on a repository.
+
+    Parameters
+    ----------
+    repository : pathlib.Path
+        Directory inside the repository.
+    args : str
+        Arguments of the git command.
+
+    Returns
+    -------
+    output : str
+        Standard output of the command.
+
+    Raises
+    ------
+    GitError
+        When git isn't installed or the command fails.
+    """
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(repository), *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+    except FileNotFoundError as e:
+        raise GitError("git is not installed.") from e
+    except subprocess.CalledProcessError as e:
+        raise GitError(e.stderr.decode(errors="replace").strip()) from e
+    return result.stdout.decode()
+
+
+def locate(path: Union[str, pathlib.Path]) -> Tuple[pathlib.Path, str]:
+    """Finds the repository containing a directory.
+
+    Parameters
+    ----------
+    path : Union[str, pathlib.Path]
+
+    Returns
+    -------
+    location : Tuple[pathlib.Path, str]
+        Root of the repository and the path relative to it
+        (with / as separator, empty for the root).
+    """
+    path = pathlib.Path(path).resolve()
+    root = pathlib.Path(git(path, "rev-parse", "--show-toplevel").strip()).resolve()
+    relpath: str = path.relative_to(root).as_posix()
+    return root, "" if relpath == "." else relpath
+
+
+def list_commits(
+    repository: pathlib.Path,
+    since: str,
+    rev: str = "HEAD",
+    first_parent: bool = False,
+) -> List[Commit]:
+    """Commits reachable from rev but not from since, oldest first.
+
+    Parameters
+    ----------
+    repository : pathlib.Path
+    since : str
+        Revision where the history starts (excluded).
+    rev : str
+        Revision where the history ends. Defaults to HEAD.
+    first_parent : bool
+        Follow only the first parent of the merge commits. Defaults to False.
+
+    Returns
+    -------
+    commits : List[Commit]
+    """
+    args: List[str] = ["log", "--reverse", "--format=%H%x00%cI%x00%s"]
+    if first_parent:
+        args.append("--first-parent")
+    args.append(f"{since}..{rev}")
+    return [
+        Commit(*line.split("\0", 2))
+        for line in git(repository, *args).splitlines()
+        if line
+    ]
+
+
+class ObjectStore:
+    """Reads the objects of a git repository.
+
+    Keeps a single git cat-file --batch process, which is sent the hash
+    of each object required.
+
+    Examples
+    --------
+    >>> with ObjectStore(repository) as store:
+    ...     entries = store.tree(store.commit_tree(sha))
+    """
+
+    def __init__(self, repository: pathlib.Path, hash_size: int = 20) -> None:
+        """
+        Parameters
+        ----------
+        repository : pathlib.Path
+        hash_size : int
+            Size in bytes of the object names, 20 for SHA-1 and
+            32 for SHA-256 repositories. Defaults to 20.
+        """
+        self._repository: pathlib.Path = repository
+        self._hash_size: int = hash_size
+        self._process: "subprocess.Popen[bytes]" = subprocess.Popen(
+            ["git", "-C", str(repository), "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        # Both are pipes, so never None.
+        self._stdin: IO[bytes] = cast(IO[bytes], self._process.stdin)
+        self._stdout: IO[bytes] = cast(IO[bytes], self._process.stdout)
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self._repository})"
+
+    def __enter__(self) -> "ObjectStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def read(self, name: str) -> Tuple[str, bytes]:
+        """Reads an object.
+
+        Parameters
+        ----------
+        name : str
+            Hash of the object.
+
+        Returns
+        -------
+        object : Tuple[str, bytes]
+            Type (blob, tree, commit or tag) and content of the object.
+
+        Raises
+        ------
+        GitError
+            When the object doesn't exist.
+        """
+        self._stdin.write(name.encode() + b"\n")
+        self._stdin.flush()
+        header: List[bytes] = self._stdout.readline().split()
+        if len(header) != 3:
+            raise GitError(f"object not found: {name}")
+        content: bytes = self._stdout.read(int(header[2]))
+        self._stdout.read(1)  # Line feed after the content.
+        return header[1].decode(), content
+
+    def commit_tree(self, sha: str) -> str:
+        """Hash of the root tree of a commit.
+
+        Parameters
+        ----------
+        sha : str
+
+        Returns
+        -------
+        tree : str
+        """
+        _, content = self.read(sha)
+        # The first line of a commit object is: tree <sha>
+        return content[5 : content.index(b"\n")].decode()
+
+    def tree(self, sha: str) -> List[TreeEntry]:
+        """Entries of a tree.
+
+        Parameters
+        ----------
+        sha : str
+
+        Returns
+        -------
+        entries : List[TreeEntry]
+        """
+        _, content = self.read(sha)
+        entries: List[TreeEntry] = []
+        position: int = 0
+        # Each entry is: <mode> <name>\0<binary hash>
+        while position < len(content):
+            space: int = content.index(b" ", position)
+            nul: int = content.index(b"\0", space)
+            end: int = nul + 1 + self._hash_size
+            entries.append(
+                TreeEntry(
+                    content[position:space],
+                    content[space + 1 : nul].decode(errors="surrogateescape"),
+                    content[nul + 1 : end].hex(),
+                )
+            )
+            position = end
+        return entries
+
+    def close(self) -> None:
+        """Terminates the git process."""
+        if self._process.poll() is None:
+            self._stdin.close()
+            self._process.wait()
+        self._stdout.close()
+
+
+def analyze_blob(source: bytes, path: str) -> Optional[mt.FileMetrics]:
+    """Computes the metrics of a blob, None if it can't be parsed.
+
+    Entry point for the worker processes.
+
+    Parameters
+    ----------
+    source : bytes
+        Content of the blob.
+    path : str
+        Path of the blob in the tree.
+
+    Returns
+    -------
+    metrics : Optional[mt.FileMetrics]
+    """
+    try:
+        return an.analyze_source(source, path)
+    except (SyntaxError, ValueError, UnicodeDecodeError, tokenize.TokenError):
+        return None
+
+
+class History:
+    """Summary of a package on every commit of a range of the history.
+
+    Examples
+    --------
+    >>> history = History(pathlib.Path("reducto"), since="HEAD~500")
+    >>> for commit, totals in history.summaries():
+    ...     print(commit.sha, totals.lines)
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        since: str,
+        rev: str = "HEAD",
+        first_parent: bool = False,
+        exclude: Optional[ex.Exclude] = None,
+        workers: int = 1,
+        cache: Optional[ch.Cache] = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        path : pathlib.Path
+            Directory of the package, inside a git repository.
+        since : str
+            Revision where the history starts (excluded).
+        rev : str
+            Revision where the history ends. Defaults to HEAD.
+        first_parent : bool
+            Follow only the first parent of the merge commits. Defaults to False.
+        exclude : Optional[ex.Exclude]
+            Paths (relative to the package) and functions to exclude.
+            Defaults to None.
+        workers : int
+            Number of processes used to analyze the blobs. Defaults to 1.
+        cache : Optional[ch.Cache]
+            Cache of the metrics by blob hash, shared between runs.
+            Defaults to None.
+
+        Raises
+        ------
+        GitError
+            When the path isn't inside a git repository.
+        """
+        self._name: str = path.resolve().name
+        self._root, self._prefix = locate(path)
+        self._since: str = since
+        self._rev: str = rev
+        self._first_parent: bool = first_parent
+        self._exclude: ex.Exclude = exclude if exclude is not None else ex.Exclude()
+        self._workers: int = workers
+        self._cache: Optional[ch.Cache] = cache
+        self._commits: Optional[List[Commit]] = None
+        # Metrics of every blob analyzed, None for those which can't be parsed.
+        self._blobs: Dict[str, Optional[mt.FileMetrics]] = {}
+        self._totals: Dict[Tuple[str, str], mt.PackageTotals] = {}
+        self._entries: Dict[str, List[TreeEntry]] = {}
+        self.stats: "Counter[str]" = Counter()
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self.name}, {self._since}..{self._rev})"
+
+    @property
+    def name(self) -> str:
+        """Name of the package.
+
+        Returns
+        -------
+        name : str
+        """
+        return self._name
+
+    @property
+    def commits(self) -> List[Commit]:
+        """Commits of the range, oldest first.
+
+        Returns
+        -------
+        commits : List[Commit]
+        """
+        if self._commits is None:
+            self._commits = list_commits(
+                self._root, self._since, rev=self._rev, first_parent=self._first_parent
+            )
+        return self._commits
+
+    def summaries(self) -> Iterator[Tuple[Commit, mt.PackageTotals]]:
+        """Yields the totals of the package on each commit, oldest first.
+
+        Only the blobs not seen on the previous commits are analyzed.
+
+        Yields
+        ------
+        summary : Tuple[Commit, mt.PackageTotals]
+        """
+        commits: List[Commit] = self.commits
+        if len(commits) == 0:
+            return
+        # The pool is shut down before closing the store, the workers
+        # inherit the pipes of the git process.
+        with ObjectStore(self._root, hash_size=len(commits[0].sha) // 2) as store:
+            executor: Optional[ProcessPoolExecutor] = None
+            if self._workers > 1:
+                executor = ProcessPoolExecutor(max_workers=self._workers)
+            try:
+                for commit in commits:
+                    self.stats["commits"] += 1
+                    tree: Optional[str] = self._package_tree(store, commit.sha)
+                    if tree is None:  # The package doesn't exist on the commit.
+                        yield commit, mt.PackageTotals()
+                        continue
+                    missing: Dict[str, str] = {}
+                    self._collect(store, tree, "", missing)
+                    self._analyze(store, missing, executor)
+                    yield commit, self._tree_totals(store, tree, "")
+                    # The listings are only needed until the totals are computed.
+                    self._entries.clear()
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+
+    def _tree(self, store: ObjectStore, sha: str) -> List[TreeEntry]:
+        """Entries of a tree, read once per commit."""
+        entries: Optional[List[TreeEntry]] = self._entries.get(sha)
+        if entries is None:
+            entries = self._entries[sha] = store.tree(sha)
+        return entries
+
+    def _package_tree(self, store: ObjectStore, commit: str) -> Optional[str]:
+        """Hash of the tree of the package on a commit, None if missing."""
+        tree: str = store.commit_tree(commit)
+        for part in filter(None, self._prefix.split("/")):
+            for entry in self._tree(store, tree):
+                if entry.name == part and entry.mode == TREE_MODE:
+                    tree = entry.sha
+                    break
+            else:
+                return None
+        return tree
+
+    def _children(
+        self, store: ObjectStore, tree: str, prefix: str
+    ) -> Iterator[Tuple[TreeEntry, str, bool]]:
+        """Yields the subtrees and source files of a tree, not excluded.
+
+        Yields
+        ------
+        child : Tuple[TreeEntry, str, bool]
+            Entry, its path relative to the package and whether it's a tree.
+        """
+        for entry in self._tree(store, tree):
+            relpath: str = prefix + entry.name
+            if entry.mode == TREE_MODE:
+                if not wk.is_pruned(entry.name) and not self._exclude.match_path(
+                    relpath
+                ):
+                    yield entry, relpath + "/", True
+            elif (
+                entry.mode in FILE_MODES
+                and entry.name.endswith(wk.SOURCE_SUFFIX)
+                and not self._exclude.match_path(relpath)
+            ):
+                yield entry, relpath, False
+
+    def _collect(
+        self, store: ObjectStore, tree: str, prefix: str, missing: Dict[str, str]
+    ) -> None:
+        """Finds the blobs not analyzed yet, skipping the trees already summed."""
+        if (tree, prefix) in self._totals:
+            return
+        for entry, relpath, is_tree in self._children(store, tree, prefix):
+            if is_tree:
+                self._collect(store, entry.sha, relpath, missing)
+            elif entry.sha not in self._blobs:
+                missing[entry.sha] = relpath
+
+    def _analyze(
+        self,
+        store: ObjectStore,
+        missing: Dict[str, str],
+        executor: Optional[ProcessPoolExecutor],
+    ) -> None:
+        """Analyzes the blobs, each one once, reading them from the cache if possible."""
+        pending: List[Tuple[str, str]] = []
+        for sha, path in missing.items():
+            cached = self._cache.get_content(sha) if self._cache is not None else None
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                self._blobs[sha] = cached
+            else:
+                pending.append((sha, path))
+
+        for start in range(0, len(pending), BATCH_SIZE):
+            batch: List[Tuple[str, str]] = pending[start : start + BATCH_SIZE]
+            sources: List[bytes] = [store.read(sha)[1] for sha, _ in batch]
+            paths: List[str] = [path for _, path in batch]
+            results: Iterator[Optional[mt.FileMetrics]]
+            if executor is None or len(batch) < 2:
+                results = map(analyze_blob, sources, paths)
+            else:
+                chunksize: int = max(1, len(batch) // (self._workers * 4))
+                results = executor.map(
+                    analyze_blob, sources, paths, chunksize=chunksize
+                )
+            for (sha, _), metrics in zip(batch, results):
+                self.stats["analyzed"] += 1
+                self._blobs[sha] = metrics
+                if metrics is None:
+                    self.stats["errors"] += 1
+                elif self._cache is not None:
+                    self._cache.put_content(sha, metrics)
+
+    def _tree_totals(
+        self, store: ObjectStore, tree: str, prefix: str
+    ) -> mt.PackageTotals:
+        """Totals of the source files of a tree, computed once per tree."""
+        key: Tuple[str, str] = (tree, prefix)
+        totals: Optional[mt.PackageTotals] = self._totals.get(key)
+        if totals is not None:
+            return totals
+        totals = mt.PackageTotals()
+        for entry, relpath, is_tree in self._children(store, tree, prefix):
+            if is_tree:
+                totals = totals.merge(self._tree_totals(store, entry.sha, relpath))
+                continue
+            metrics: Optional[mt.FileMetrics] = self._blobs[entry.sha]
+            if metrics is not None:
+                totals = totals.add(self._exclude.filter(metrics))
+        self._totals[key] = totals
+        return totals
+
+
+def commit_as_dict(
+    commit: Commit, totals: mt.PackageTotals, percentage: bool = False
+) -> Dict[str, Any]:
+    """Summary of a commit with a dict format.
+
+    Parameters
+    ----------
+    commit : Commit
+    totals : mt.PackageTotals
+    percentage : bool
+        Whether to report the lines as percentage or not. Defaults to False
+
+    Returns
+    -------
+    data : Dict[str, Any]
+        Date and subject of the commit, followed by the totals.
+    """
+    data: Dict[str, Any] = {"date": commit.date, "subject": commit.subject}
+    data.update(rp.totals_as_dict(totals, percentage=percentage))
+    return data
+
+
+def tabulate_history(commits: Dict[str, Dict[str, Any]], fmt: str = "grid") -> str:
+    """Generates a table with a row per commit using tabulate.
+
+    Parameters
+    ----------
+    commits : Dict[str, Dict[str, Any]]
+        Summary of each commit by hash, as obtained from commit_as_dict.
+    fmt : str
+        Format of the table. Passed to tabulate.
+
+    Returns
+    -------
+    table : str
+    """
+    from tabulate import tabulate
+
+    headers: List[str] = ["commit", "date"]
+    headers.extend(rp.column_split(rp.PACKAGE_COLUMNS, fmt=fmt))
+    table: List[List[Any]] = [
+        [sha[:12], summary["date"]] + [summary[col] for col in rp.PACKAGE_COLUMNS]
+        for sha, summary in commits.items()
+    ]
+    rendered: str = tabulate(table, headers=headers, tablefmt=fmt)
+    return rendered
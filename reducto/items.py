@@ -1,7 +1,13 @@
-"""Contains the elements to be extracted from a source file. """
+"""Contains the elements to be extracted from a source file."""
 
-from typing import Optional, Union
+from typing import Dict, Iterable, List, Optional, Union
 import ast
+from bisect import bisect_left, bisect_right
+
+import reducto.metrics as mt
+
+# Name given to the bucket of lines at the module level.
+MODULE_NAME: str = "<module>"
 
 
 class Item:
@@ -15,7 +21,14 @@ class Item:
     to simplify the unit tests.
     """
 
-    def __init__(self, name: str, start: int = 0, end: int = 0) -> None:
+    def __init__(
+        self,
+        name: str,
+        start: int = 0,
+        end: int = 0,
+        qualname: Optional[str] = None,
+        parent: Optional["Item"] = None,
+    ) -> None:
         """
         Parameters
         ----------
@@ -25,11 +38,19 @@ class Item:
             Line where the item starts in the file.
         end : int
             Line where the item ends in the file.
+        qualname : Optional[str]
+            Qualified name of the item. Defaults to the name.
+        parent : Optional[Item]
+            Item containing this one. Defaults to None, defined
+            at the module level.
         """
         self._node: Optional[ast.AST] = None
         self._name = name
         self._start = start
         self._end = end
+        self._qualname: str = name if qualname is None else qualname
+        self._parent: Optional[Item] = parent
+        self._children: List[Item] = []
         self._docstrings: int = 0
         self._get_docstrings_called: bool = False
         self._comments = 0
@@ -62,6 +83,40 @@ class Item:
         """
         return self._name
 
+    @property
+    def qualname(self) -> str:
+        """Qualified name of the item, like Class.method.<locals>.inner.
+
+        Returns
+        -------
+        qualname : str
+
+        See Also
+        --------
+        qualified_name
+        """
+        return self._qualname
+
+    @property
+    def parent(self) -> Optional["Item"]:
+        """Item containing this one, None at the module level.
+
+        Returns
+        -------
+        parent : Optional[Item]
+        """
+        return self._parent
+
+    @property
+    def children(self) -> List["Item"]:
+        """Items defined directly inside this one.
+
+        Returns
+        -------
+        children : List[Item]
+        """
+        return self._children
+
     @property
     def start(self) -> int:
         """Line of the source file where the item starts.
@@ -83,8 +138,13 @@ class Item:
         return self._end
 
     def __len__(self) -> int:
-        """Computes the total number of lines of the function."""
-        return self.end - self.start
+        """Computes the total number of lines of the function.
+
+        The lines of the items defined inside are not included,
+        those are counted by the nested items.
+        """
+        nested: int = sum(child.end - child.start + 1 for child in self.children)
+        return self.end - self.start - nested
 
     def __lt__(self, other: Union["Item", int]) -> bool:
         """Lower than operator to allow the objects to be sorted in a list.
@@ -136,7 +196,7 @@ class Item:
         return self._docstrings
 
     @docstrings.setter
-    def docstrings(self, docs: int):
+    def docstrings(self, docs: int) -> None:
         self._docstrings = docs
 
     @property
@@ -150,7 +210,7 @@ class Item:
         return self._comments
 
     @comments.setter
-    def comments(self, cmnt: int):
+    def comments(self, cmnt: int) -> None:
         self._comments = cmnt
 
     @property
@@ -179,18 +239,8 @@ class Item:
         """
         return len(self) - self.docstrings - self.comments - self.blank_lines
 
-
-class FunctionDef(Item):
-    """Implementation of an ast.FunctionDef.
-
-    No distinction to an AsyncFunctionDef is made.
-    """
-
-    def __init__(self, name: str, start: int = 0, end: int = 0) -> None:
-        super().__init__(name, start=start, end=end)
-
     def get_docstrings(self) -> int:
-        """Obtain the number of lines which are docstring inside the function.
+        """Obtain the number of lines which are docstring inside the item.
 
         The method must be called once a node is already registered.
 
@@ -204,8 +254,76 @@ class FunctionDef(Item):
         """
         if not self._get_docstrings_called:
             self.docstrings = get_docstring_lines(self.node)
+            self._get_docstrings_called = True
         return self.docstrings
 
+    @property
+    def metrics(self) -> mt.FunctionMetrics:
+        """Detached record of the values registered in the item.
+
+        Returns
+        -------
+        metrics : mt.FunctionMetrics
+
+        See Also
+        --------
+        reducto.metrics.FunctionMetrics
+        """
+        return mt.FunctionMetrics(
+            name=self.qualname,
+            start=self.start,
+            end=self.end,
+            docstrings=self.docstrings,
+            comments=self.comments,
+            blank_lines=self.blank_lines,
+            source_lines=self.source_lines,
+        )
+
+
+class FunctionDef(Item):
+    """Implementation of an ast.FunctionDef.
+
+    No distinction to an AsyncFunctionDef is made.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        start: int = 0,
+        end: int = 0,
+        qualname: Optional[str] = None,
+        parent: Optional[Item] = None,
+    ) -> None:
+        super().__init__(name, start=start, end=end, qualname=qualname, parent=parent)
+
+
+class ClassDef(Item):
+    """Implementation of an ast.ClassDef.
+
+    Contains the methods (and nested classes) as children.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        start: int = 0,
+        end: int = 0,
+        qualname: Optional[str] = None,
+        parent: Optional[Item] = None,
+    ) -> None:
+        super().__init__(name, start=start, end=end, qualname=qualname, parent=parent)
+
+
+class ModuleDef(Item):
+    """Implementation of an ast.Module.
+
+    Bucket for the lines outside every function and class: module
+    docstrings, comments and blank lines at the module level.
+    """
+
+    def __init__(self, start: int = 0, end: int = 0) -> None:
+        super().__init__(MODULE_NAME, start=start, end=end)
+
 
 class MethodDef(FunctionDef):
     """Equivalent to a FunctionDef.
@@ -218,6 +336,131 @@ class MethodDef(FunctionDef):
         super().__init__(name, start=start, end=end)
 
 
+def qualified_name(name: str, parent: Optional[Item]) -> str:
+    """Qualified name of an item, as in the __qualname__ of python objects.
+
+    Parameters
+    ----------
+    name : str
+        Name of the item.
+    parent : Optional[Item]
+        Item containing it, None at the module level.
+
+    Returns
+    -------
+    qualname : str
+
+    Examples
+    --------
+    >>> method = FunctionDef("method", qualname=qualified_name("method", ClassDef("A")))
+    >>> qualified_name("inner", method)
+    'A.method.<locals>.inner'
+    """
+    if parent is None or isinstance(parent, ModuleDef):
+        return name
+    if isinstance(parent, FunctionDef):
+        return f"{parent.qualname}.<locals>.{name}"
+    return f"{parent.qualname}.{name}"
+
+
+class ItemIndex:
+    """Interval index finding the innermost item containing a line.
+
+    The items of a source file are either nested or disjoint, so the
+    lines of the file are split in consecutive segments, each one owned
+    by the innermost item containing it. The lines outside every item
+    are owned by the root (the module).
+
+    Examples
+    --------
+    >>> index = ItemIndex(items, root=module)
+    >>> index.find(31)
+    FunctionDef(_inner_func[30, 31])
+    """
+
+    def __init__(self, items: Iterable[Item], root: Optional[Item] = None) -> None:
+        """
+        Parameters
+        ----------
+        items : Iterable[Item]
+            Items of a source file, with their bounds.
+        root : Optional[Item]
+            Owner of the lines outside every item. Defaults to None.
+        """
+        self._root: Optional[Item] = root
+        # Segment i spans the lines [bounds[i], bounds[i + 1]).
+        self._bounds: List[int] = [0]
+        self._owners: List[Optional[Item]] = [root]
+
+        open_items: List[Item] = []
+        # Parents go before their children when starting on the same line.
+        for item in sorted(items, key=lambda item: (item.start, -item.end)):
+            while open_items and open_items[-1].end < item.start:
+                self._close(open_items)
+            self._mark(item.start, item)
+            open_items.append(item)
+        while open_items:
+            self._close(open_items)
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({len(self._bounds)} segments)"
+
+    def _mark(self, line: int, owner: Optional[Item]) -> None:
+        """Starts a new segment on a line."""
+        if self._bounds[-1] == line:
+            self._owners[-1] = owner
+        else:
+            self._bounds.append(line)
+            self._owners.append(owner)
+
+    def _close(self, open_items: List[Item]) -> None:
+        """Closes the innermost item open, its parent owns the following lines."""
+        item: Item = open_items.pop()
+        self._mark(item.end + 1, open_items[-1] if open_items else self._root)
+
+    def find(self, line: int) -> Optional[Item]:
+        """Innermost item containing a line, in O(log n).
+
+        Parameters
+        ----------
+        line : int
+
+        Returns
+        -------
+        item : Optional[Item]
+            The root when the line is outside every item.
+        """
+        return self._owners[bisect_right(self._bounds, line) - 1]
+
+    def count(self, positions: List[int]) -> Dict[Item, int]:
+        """Counts the lines owned by each item.
+
+        The positions are counted per segment in bulk, those outside
+        every item are counted on the root.
+
+        Parameters
+        ----------
+        positions : List[int]
+            Line positions, sorted.
+
+        Returns
+        -------
+        counts : Dict[Item, int]
+            Number of positions owned by each item, only those with any.
+        """
+        counts: Dict[Item, int] = {}
+        lower: int = 0
+        for owner, bound in zip(self._owners, self._bounds[1:]):
+            upper: int = bisect_left(positions, bound, lower)
+            if upper > lower and owner is not None:
+                counts[owner] = counts.get(owner, 0) + upper - lower
+            lower = upper
+        last_owner: Optional[Item] = self._owners[-1]
+        if len(positions) > lower and last_owner is not None:
+            counts[last_owner] = counts.get(last_owner, 0) + len(positions) - lower
+        return counts
+
+
 def get_docstring_lines(node: Union[ast.Module, ast.FunctionDef, ast.AST]) -> int:
     r"""Obtains the number of lines which are docstrings.
 
@@ -0,0 +1,230 @@
+"""Module containing the merge of json reports without analyzing again.
+
+Reports generated with ``--mergeable`` (or ``--shard``) carry the raw totals
+of each target under ACCUMULATORS_KEY: sums of the lines, counts of files
+and functions, and the sum of the source lines of the functions. Unlike
+the values reported (averages and percentages are rounded), the totals of
+disjoint sets of files are added exactly.
+
+``reducto merge`` combines any number of such reports, like the reports
+of the shards of a package or of different packages, visiting each one once.
+The merged report carries the accumulators too, so it can be merged again.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+import json
+import pathlib
+
+import reducto.metrics as mt
+import reducto.reports as rp
+
+# Key of the report under which the accumulators are stored.
+ACCUMULATORS_KEY: str = "__accumulators__"
+
+
+class MergeError(Exception):
+    """Error raised when the reports can't be merged."""
+
+    pass
+
+
+def accumulators_as_dict(
+    totals: Dict[str, mt.PackageTotals],
+    files: Iterable[str] = (),
+    grouped: bool = False,
+    percentage: bool = False,
+) -> Dict[str, Any]:
+    """Accumulators stored along a json report.
+
+    Parameters
+    ----------
+    totals : Dict[str, mt.PackageTotals]
+        Totals of each target, by its name in the report.
+    files : Iterable[str]
+        Names of the targets which are source files, instead of packages.
+        Defaults to ().
+    grouped : bool
+        Whether the packages are reported grouped. Defaults to False.
+    percentage : bool
+        Whether the lines are reported as percentage. Defaults to False.
+
+    Returns
+    -------
+    data : Dict[str, Any]
+    """
+    return {
+        "grouped": grouped,
+        "percentage": percentage,
+        "files": sorted(files),
+        "totals": {name: target._asdict() for name, target in totals.items()},
+    }
+
+
+class Merge:
+    """Combines json reports carrying accumulators.
+
+    The targets of the same name are merged: the files of the ungrouped
+    packages are joined and the totals are added.
+
+    Examples
+    --------
+    >>> merge = Merge()
+    >>> merge.add(shard_1)
+    >>> merge.add(shard_2)
+    >>> merge.report()
+    {'reducto': {...}, '__accumulators__': {...}}
+    """
+
+    def __init__(self) -> None:
+        # Grouped and percentage of the reports.
+        self._options: Optional[Tuple[bool, bool]] = None
+        self._totals: Dict[str, mt.PackageTotals] = {}
+        self._contents: Dict[str, Dict[str, Any]] = {}
+        self._files: Dict[str, bool] = {}
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({len(self._totals)} targets)"
+
+    def add(self, report: Dict[str, Any]) -> None:
+        """Adds the targets of a report.
+
+        Parameters
+        ----------
+        report : Dict[str, Any]
+            Json report with accumulators.
+
+        Raises
+        ------
+        MergeError
+            If the report has no accumulators, was generated with other
+            options than the previous ones, or a file is repeated.
+        """
+        data: Optional[Dict[str, Any]] = report.get(ACCUMULATORS_KEY)
+        if data is None:
+            raise MergeError("The report wasn't generated with --mergeable.")
+        options: Tuple[bool, bool] = (data["grouped"], data["percentage"])
+        if self._options is None:
+            self._options = options
+        elif options != self._options:
+            raise MergeError("The reports were generated with different options.")
+
+        files = set(data["files"])
+        for name, totals in data["totals"].items():
+            is_file: bool = name in files
+            if self._files.setdefault(name, is_file) != is_file:
+                raise MergeError(f"{name} is both a source file and a package.")
+            if is_file and name in self._totals:
+                raise MergeError(f"Source file {name} is repeated.")
+            self._totals[name] = self._totals.get(name, mt.PackageTotals()).merge(
+                mt.PackageTotals(**totals)
+            )
+            if is_file or not options[0]:
+                self._join(name, report[name], is_file)
+
+    def _join(self, name: str, content: Dict[str, Any], is_file: bool) -> None:
+        """Joins the rows of a target, every source file must be new."""
+        if is_file:
+            self._contents[name] = content
+            return
+        rows: Dict[str, Any] = self._contents.setdefault(name, {})
+        for relname, row in content.items():
+            if relname in rows:
+                raise MergeError(f"Source file {relname} is repeated.")
+            rows[relname] = row
+
+    @property
+    def totals(self) -> mt.PackageTotals:
+        """Totals of every target merged.
+
+        Returns
+        -------
+        totals : mt.PackageTotals
+        """
+        totals = mt.PackageTotals()
+        for target in self._totals.values():
+            totals = totals.merge(target)
+        return totals
+
+    def report(self) -> Dict[str, Any]:
+        """Report of the targets merged, with their accumulators.
+
+        When there are multiple targets, the summary of all of them is
+        reported under rp.SUMMARY_KEY.
+
+        Returns
+        -------
+        report : Dict[str, Any]
+
+        Raises
+        ------
+        MergeError
+            If no report was added.
+        """
+        if self._options is None:
+            raise MergeError("No reports to merge.")
+        grouped, percentage = self._options
+        report: Dict[str, Any] = {}
+        for name, totals in self._totals.items():
+            if grouped and not self._files[name]:
+                report[name] = rp.totals_as_dict(totals, percentage=percentage)
+            else:
+                report[name] = self._contents[name]
+        if len(self._totals) > 1:
+            report[rp.SUMMARY_KEY] = rp.totals_as_dict(
+                self.totals, percentage=percentage
+            )
+        report[ACCUMULATORS_KEY] = accumulators_as_dict(
+            self._totals,
+            files=[name for name, is_file in self._files.items() if is_file],
+            grouped=grouped,
+            percentage=percentage,
+        )
+        return report
+
+
+def merge(reports: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merges json reports carrying accumulators.
+
+    Parameters
+    ----------
+    reports : Iterable[Dict[str, Any]]
+
+    Returns
+    -------
+    report : Dict[str, Any]
+
+    See Also
+    --------
+    Merge
+    """
+    merger = Merge()
+    for report in reports:
+        merger.add(report)
+    return merger.report()
+
+
+def load_reports(paths: Iterable[pathlib.Path]) -> Iterator[Dict[str, Any]]:
+    """Reads json reports, one at a time.
+
+    Parameters
+    ----------
+    paths : Iterable[pathlib.Path]
+
+    Yields
+    ------
+    report : Dict[str, Any]
+
+    Raises
+    ------
+    MergeError
+        If a report can't be read.
+    """
+    for path in paths:
+        try:
+            with open(path) as f:
+                report: Any = json.load(f)
+        except (OSError, ValueError) as e:
+            raise MergeError(f"Can't read the report {path}: {e}") from e
+        if not isinstance(report, dict):
+            raise MergeError(f"{path} is not a json report.")
+        yield report
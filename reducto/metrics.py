@@ -0,0 +1,460 @@
+"""Contains the records storing the metrics computed for the source files.
+
+These records are plain immutable tuples, detached from the ast and the
+tokens of the file they were computed from, so they are cheap to keep in
+memory and to send between processes. The metrics of many files can be
+kept in a columnar MetricsStore.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Sequence, Tuple
+import array
+import operator
+import os
+import sys
+
+# Version of the definitions of the metrics. Must be increased every time
+# the way any metric is computed changes, so stored metrics are invalidated.
+METRICS_VERSION: int = 3
+
+
+class FunctionMetrics(NamedTuple):
+    """Metrics computed for a function (or method) in a source file.
+
+    Equivalent to the content of a reducto.items.FunctionDef once registered,
+    the name is the qualified name of the function (Class.method).
+    """
+
+    name: str
+    start: int
+    end: int
+    docstrings: int
+    comments: int
+    blank_lines: int
+    source_lines: int
+
+
+class FileMetrics(NamedTuple):
+    """Metrics computed for a source file.
+
+    Contains the values reported per source file and the metrics of each
+    of the functions found in it.
+    """
+
+    path: str
+    lines: int
+    docstrings: int
+    comment_lines: int
+    blank_lines: int
+    source_lines: int
+    functions: Tuple[FunctionMetrics, ...]
+
+    @classmethod
+    def from_list(cls, data: Sequence[Any]) -> "FileMetrics":
+        """Rebuilds the record from its nested list form.
+
+        This is the form obtained when the record is dumped to json.
+
+        Parameters
+        ----------
+        data : Sequence[Any]
+            Fields of the record, the last one being the list of functions.
+
+        Returns
+        -------
+        metrics : FileMetrics
+
+        Examples
+        --------
+        >>> FileMetrics.from_list(json.loads(json.dumps(metrics))) == metrics
+        True
+        """
+        return cls(
+            path=data[0],
+            lines=data[1],
+            docstrings=data[2],
+            comment_lines=data[3],
+            blank_lines=data[4],
+            source_lines=data[5],
+            functions=tuple(FunctionMetrics(*func) for func in data[6]),
+        )
+
+    @property
+    def name(self) -> str:
+        """Name of the file the metrics were computed from.
+
+        Returns
+        -------
+        name : str
+        """
+        return os.path.basename(self.path)
+
+    @property
+    def number_of_functions(self) -> int:
+        """Number of functions found in the file.
+
+        Returns
+        -------
+        number_of_functions : int
+        """
+        return len(self.functions)
+
+    @property
+    def function_source_lines(self) -> int:
+        """Sum of the source lines of the functions in the file.
+
+        Returns
+        -------
+        source_lines : int
+        """
+        return sum(f.source_lines for f in self.functions)
+
+    @property
+    def average_function_length(self) -> int:
+        """Average source lines of the functions in the file.
+
+        Returns
+        -------
+        average : int
+            Average function length, rounded to the closest int.
+            0 if no function is found.
+        """
+        if len(self.functions) == 0:
+            return 0
+        # Same as statistics.mean, the true division of ints is correctly rounded.
+        return round(self.function_source_lines / len(self.functions))
+
+
+class PackageTotals(NamedTuple):
+    """Totals of the metrics of the source files in a package.
+
+    The totals can be updated by adding or subtracting the metrics
+    of a single file, without visiting the remaining ones.
+    """
+
+    source_files: int = 0
+    lines: int = 0
+    number_of_functions: int = 0
+    docstrings: int = 0
+    comment_lines: int = 0
+    blank_lines: int = 0
+    source_lines: int = 0
+    # Sum of the source lines of the functions of every file.
+    function_source_lines: int = 0
+
+    @classmethod
+    def from_metrics(cls, metrics: Iterable[FileMetrics]) -> "PackageTotals":
+        """Computes the totals of a set of files.
+
+        Parameters
+        ----------
+        metrics : Iterable[FileMetrics]
+
+        Returns
+        -------
+        totals : PackageTotals
+        """
+        totals = cls()
+        for file_metrics in metrics:
+            totals = totals.add(file_metrics)
+        return totals
+
+    def _update(self, metrics: FileMetrics, sign: int) -> "PackageTotals":
+        return PackageTotals(
+            source_files=self.source_files + sign,
+            lines=self.lines + sign * metrics.lines,
+            number_of_functions=self.number_of_functions
+            + sign * metrics.number_of_functions,
+            docstrings=self.docstrings + sign * metrics.docstrings,
+            comment_lines=self.comment_lines + sign * metrics.comment_lines,
+            blank_lines=self.blank_lines + sign * metrics.blank_lines,
+            source_lines=self.source_lines + sign * metrics.source_lines,
+            function_source_lines=self.function_source_lines
+            + sign * metrics.function_source_lines,
+        )
+
+    def add(self, metrics: FileMetrics) -> "PackageTotals":
+        """Returns the totals including the metrics of a file.
+
+        Parameters
+        ----------
+        metrics : FileMetrics
+
+        Returns
+        -------
+        totals : PackageTotals
+        """
+        return self._update(metrics, 1)
+
+    def subtract(self, metrics: FileMetrics) -> "PackageTotals":
+        """Returns the totals excluding the metrics of a file.
+
+        Parameters
+        ----------
+        metrics : FileMetrics
+            Metrics of a file previously added.
+
+        Returns
+        -------
+        totals : PackageTotals
+        """
+        return self._update(metrics, -1)
+
+    def merge(self, other: "PackageTotals") -> "PackageTotals":
+        """Returns the totals of two disjoint sets of files.
+
+        Parameters
+        ----------
+        other : PackageTotals
+
+        Returns
+        -------
+        totals : PackageTotals
+        """
+        return PackageTotals(*map(operator.add, self, other))
+
+    @property
+    def average_function_length(self) -> int:
+        """Average source lines of the functions of every file.
+
+        Returns
+        -------
+        average : int
+            Rounded to the closest int, 0 for a package without functions.
+        """
+        if self.number_of_functions == 0:
+            return 0
+        return round(self.function_source_lines / self.number_of_functions)
+
+
+# Fields stored per file and per function in a MetricsStore.
+FILE_FIELDS: Tuple[str, ...] = (
+    "lines",
+    "docstrings",
+    "comment_lines",
+    "blank_lines",
+    "source_lines",
+    "number_of_functions",
+    "function_source_lines",
+    "average_function_length",
+    "first_function",
+)
+FUNCTION_FIELDS: Tuple[str, ...] = (
+    "file",
+    "start",
+    "end",
+    "docstrings",
+    "comments",
+    "blank_lines",
+    "source_lines",
+)
+
+
+class MetricsStore:
+    """Compact store of the metrics of a set of source files.
+
+    Every field of the tables (files and functions) is stored in its own
+    typed array of 64 bit integers, with a position per file or function.
+    The columns are returned without copying, and can be exported to NumPy
+    arrays sharing their memory. The paths and function names are interned
+    strings.
+
+    The functions of the file in position i are the rows from
+    first_function[i] to first_function[i] + number_of_functions[i].
+    """
+
+    def __init__(self) -> None:
+        self._files: Dict[str, "array.array[int]"] = {
+            name: array.array("q") for name in FILE_FIELDS
+        }
+        self._functions: Dict[str, "array.array[int]"] = {
+            name: array.array("q") for name in FUNCTION_FIELDS
+        }
+        self._paths: List[str] = []
+        self._function_names: List[str] = []
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({len(self)} files)"
+
+    def __len__(self) -> int:
+        """Number of files stored."""
+        return len(self._paths)
+
+    @classmethod
+    def from_metrics(cls, metrics: Iterable[FileMetrics]) -> "MetricsStore":
+        """Creates a store from the metrics of a set of files.
+
+        Parameters
+        ----------
+        metrics : Iterable[FileMetrics]
+
+        Returns
+        -------
+        store : MetricsStore
+        """
+        store = cls()
+        for file_metrics in metrics:
+            store.append(file_metrics)
+        return store
+
+    def append(self, metrics: FileMetrics) -> None:
+        """Adds the metrics of a file to the store.
+
+        Parameters
+        ----------
+        metrics : FileMetrics
+        """
+        file_index: int = len(self._paths)
+        self._paths.append(sys.intern(metrics.path))
+        row: Tuple[int, ...] = (
+            metrics.lines,
+            metrics.docstrings,
+            metrics.comment_lines,
+            metrics.blank_lines,
+            metrics.source_lines,
+            metrics.number_of_functions,
+            metrics.function_source_lines,
+            metrics.average_function_length,
+            len(self._function_names),
+        )
+        for name, value in zip(FILE_FIELDS, row):
+            self._files[name].append(value)
+        for func in metrics.functions:
+            self._function_names.append(sys.intern(func.name))
+            self._functions["file"].append(file_index)
+            for name, value in zip(FUNCTION_FIELDS[1:], func[1:]):
+                self._functions[name].append(value)
+
+    @property
+    def paths(self) -> List[str]:
+        """Paths of the files, in the order they were stored.
+
+        Returns
+        -------
+        paths : List[str]
+        """
+        return self._paths
+
+    @property
+    def function_names(self) -> List[str]:
+        """Names of the functions, in the order of the function rows.
+
+        Returns
+        -------
+        function_names : List[str]
+        """
+        return self._function_names
+
+    def file_column(self, name: str) -> "array.array[int]":
+        """Obtain the values of a field for every file.
+
+        The array stored is returned, not a copy, so it must not be modified.
+
+        Parameters
+        ----------
+        name : str
+            One of FILE_FIELDS.
+
+        Returns
+        -------
+        column : array.array[int]
+        """
+        return self._files[name]
+
+    def function_column(self, name: str) -> "array.array[int]":
+        """Obtain the values of a field for every function.
+
+        The array stored is returned, not a copy, so it must not be modified.
+
+        Parameters
+        ----------
+        name : str
+            One of FUNCTION_FIELDS.
+
+        Returns
+        -------
+        column : array.array[int]
+        """
+        return self._functions[name]
+
+    def __getitem__(self, index: int) -> FileMetrics:
+        """Rebuilds the FileMetrics of the file in a given position."""
+        files = self._files
+        first: int = files["first_function"][index]
+        number: int = files["number_of_functions"][index]
+        columns = [self._functions[name] for name in FUNCTION_FIELDS[1:]]
+        functions = tuple(
+            FunctionMetrics(self._function_names[i], *(col[i] for col in columns))
+            for i in range(first, first + number)
+        )
+        return FileMetrics(
+            path=self._paths[index],
+            lines=files["lines"][index],
+            docstrings=files["docstrings"][index],
+            comment_lines=files["comment_lines"][index],
+            blank_lines=files["blank_lines"][index],
+            source_lines=files["source_lines"][index],
+            functions=functions,
+        )
+
+    def __iter__(self) -> Iterator[FileMetrics]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def totals(self) -> PackageTotals:
+        """Computes the totals of the files stored from the columns.
+
+        Returns
+        -------
+        totals : PackageTotals
+        """
+        return PackageTotals(
+            source_files=len(self),
+            lines=sum(self.file_column("lines")),
+            number_of_functions=sum(self.file_column("number_of_functions")),
+            docstrings=sum(self.file_column("docstrings")),
+            comment_lines=sum(self.file_column("comment_lines")),
+            blank_lines=sum(self.file_column("blank_lines")),
+            source_lines=sum(self.file_column("source_lines")),
+            function_source_lines=sum(self.file_column("function_source_lines")),
+        )
+
+    def to_numpy(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Exports the columns of the tables as NumPy arrays.
+
+        The arrays are views of the memory of the store, no data is copied.
+        The paths and function names are not included, the field file of
+        the functions is the position of the file in paths.
+        Requires numpy to be installed.
+
+        Returns
+        -------
+        tables : Tuple[Dict[str, numpy.ndarray], Dict[str, numpy.ndarray]]
+            Files and functions tables, a column by each of the fields
+            in FILE_FIELDS and FUNCTION_FIELDS respectively.
+
+        Raises
+        ------
+        ModuleNotFoundError
+            When numpy is not installed.
+
+        Examples
+        --------
+        >>> files, functions = store.to_numpy()
+        >>> functions["source_lines"].mean()
+        """
+        try:
+            import numpy as np
+        except ModuleNotFoundError as err:  # pragma: no cover, optional dependency
+            raise ModuleNotFoundError(
+                "numpy is required to export the metrics: pip install reducto[numpy]"
+            ) from err
+
+        files = {
+            name: np.frombuffer(column, dtype="=i8")
+            for name, column in self._files.items()
+        }
+        functions = {
+            name: np.frombuffer(column, dtype="=i8")
+            for name, column in self._functions.items()
+        }
+        return files, functions
@@ -1,12 +1,21 @@
-"""Module containing code to control python package crawling. """
+"""Module containing code to control python package crawling."""
 
-import statistics
-from typing import Iterable, Optional, List
+import os
+from collections import Counter
+from typing import Any, Dict, Iterator, Optional, List
 from pathlib import Path
 
 import reducto.src as src
 import reducto.items as it
+import reducto.metrics as mt
 import reducto.reports as rp
+import reducto.analyzer as an
+import reducto.cache as ch
+import reducto.state as st
+import reducto.walker as wk
+import reducto.exclude as ex
+import reducto.profile as pf
+import reducto.shard as sh
 
 
 class PackageError(Exception):
@@ -28,21 +37,69 @@ class Package:
     The general content of a package is grabbed from here.
     """
 
-    def __init__(self, path: Path) -> None:
+    def __init__(
+        self,
+        path: Path,
+        workers: int = 1,
+        cache: Optional[ch.Cache] = None,
+        previous: Optional[st.PackageState] = None,
+        exclude: Optional[ex.Exclude] = None,
+        analyzer: Optional[an.Analyzer] = None,
+        profile: Optional[pf.Profile] = None,
+        shard: Optional[sh.Shard] = None,
+    ) -> None:
         """
         Parameters
         ----------
         path : Path
             Full path pointing to the package.
+        workers : int
+            Number of processes used to analyze the source files.
+            Defaults to 1, the files are analyzed on the current process.
+        cache : Optional[ch.Cache]
+            Cache to reuse the metrics of previous runs. Defaults to None.
+        previous : Optional[st.PackageState]
+            State of a previous report of the package. When given, only the
+            files changed since are analyzed and the totals are updated from
+            the previous ones. Takes precedence over cache. Defaults to None.
+        exclude : Optional[ex.Exclude]
+            Paths (relative to the package) and functions to exclude.
+            Defaults to None.
+        analyzer : Optional[an.Analyzer]
+            Analyzer shared with other packages, its pool of processes is
+            used instead of workers. Defaults to None, the package creates
+            its own analyzer.
+        profile : Optional[pf.Profile]
+            Records the time spent on each phase of the analysis of the
+            files, unused when an analyzer is given. Defaults to None.
+        shard : Optional[sh.Shard]
+            Only the source files of the shard are part of the package.
+            Defaults to None, every source file.
         """
         self.validate(path)
         self._path: Path = path
+        self._workers: int = workers
+        self._cache: Optional[ch.Cache] = cache
+        self._previous: Optional[st.PackageState] = previous
+        self._exclude: Optional[ex.Exclude] = exclude
+        self._analyzer: Optional[an.Analyzer] = analyzer
+        self._profile: Optional[pf.Profile] = profile
+        self._shard: Optional[sh.Shard] = shard
+        self._previous_metrics: Dict[str, mt.FileMetrics] = {}
+        if previous is not None:
+            self._cache = previous.cache(path.parent)
+            # Keep the previous metrics, the entries are replaced when analyzed.
+            self._previous_metrics = {
+                entry_path: entry["metrics"]
+                for entry_path, entry in self._cache.entries.items()
+            }
+        self._paths: Optional[List[str]] = None
         self._source_files: Optional[List[src.SourceFile]] = None
-        self._blank_lines: Optional[List[int]] = None
-        self._comment_lines: Optional[List[int]] = None
-        self._docstrings: Optional[List[int]] = None
+        self._store: Optional[mt.MetricsStore] = None
+        self._columns: Dict[str, List[int]] = {}
+        self._totals: Optional[mt.PackageTotals] = None
+        self._stats: "Counter[str]" = Counter()
         self._functions: Optional[List[List[it.FunctionDef]]] = None
-        self._average_function_length: Optional[List[int]] = None
 
     def __repr__(self) -> str:
         return type(self).__name__ + f"({self.name})"
@@ -54,7 +111,7 @@ class Package:
         -------
         lines : int
         """
-        return sum(self.lines)
+        return self.totals.lines
 
     @staticmethod
     def validate(path: Path) -> None:
@@ -99,32 +156,81 @@ class Package:
         """
         return self.path.name
 
-    def _walk(self) -> None:
-        """Traverses the package structure.
+    def relname(self, path: str) -> str:
+        """Obtain the name of a file relative to the package.
 
-        Walks listing the files on the main dir, and if any subpackage
-        is found on the process this is walked recursively, generating
-        a subpackage.
+        Parameters
+        ----------
+        path : str
+            Full path of a file in the package.
+
+        Returns
+        -------
+        relname : str
+            Relative path of the file starting on the package.
 
-        Inspired by trailrunner.Trailrunner.walk.
+        Examples
+        --------
+        For a given __init__.py file at the top of a package
+        named my_package:
+
+        >>> package.relname('/home/user/my_package/__init__.py')
+        'my_package/__init__.py'
         """
+        relname: str = os.path.relpath(path, start=self.path)
+        return str(Path(self.name) / relname)
 
-        def walk(path: Path) -> Iterable[src.SourceFile]:
-            for child in path.iterdir():
+    @property
+    def shard(self) -> Optional[sh.Shard]:
+        """Shard of the package analyzed, None for the whole package.
 
-                try:
-                    yield src.SourceFile(child)
-                except src.SourceFileError:
-                    pass
+        Returns
+        -------
+        shard : Optional[sh.Shard]
+        """
+        return self._shard
 
-                # Maybe regenerate a package to crawl itself
-                # if self.validate(child):
-                #     yield Package(child)
+    @property
+    def workers(self) -> int:
+        """Number of processes used to analyze the source files.
+
+        Returns
+        -------
+        workers : int
+        """
+        if self._analyzer is not None:
+            return self._analyzer.workers
+        return self._workers
+
+    def _walk(self) -> None:
+        """Traverses the package structure.
+
+        Lists the paths of the source files of the package and its
+        subdirectories, pruning the directories which don't contain
+        source code and the paths ignored by git. With a shard, only
+        the paths of the shard are kept.
+
+        See Also
+        --------
+        reducto.walker.walk
+        reducto.shard.select
+        """
+        paths: List[str] = list(wk.walk(self.path, exclude=self._exclude))
+        if self._shard is not None:
+            paths = sh.select(paths, str(self.path), self._shard)
+        self._paths = paths
 
-                if child.is_dir():
-                    yield from walk(child)
+    @property
+    def paths(self) -> List[str]:
+        """Returns the full paths of the source files.
 
-        self._source_files = list(walk(self.path))
+        Returns
+        -------
+        paths : List[str]
+        """
+        if self._paths is None:
+            self._walk()
+        return self._paths  # type: ignore[return-value]
 
     @property
     def source_files(self) -> List[src.SourceFile]:
@@ -136,8 +242,185 @@ class Package:
         """
         # FIXME: Check when no files are found
         if self._source_files is None:
-            self._walk()
-        return self._source_files  # type: ignore[return-value]
+            self._source_files = [src.SourceFile(Path(path)) for path in self.paths]
+        return self._source_files
+
+    @property
+    def store(self) -> mt.MetricsStore:
+        """Returns the store with the metrics computed for each source file.
+
+        The source files are analyzed by a reducto.analyzer.Analyzer,
+        spread over the number of workers of the package, and reusing
+        the metrics found in the cache.
+
+        Returns
+        -------
+        store : mt.MetricsStore
+            Metrics in the same order as source_files.
+
+        See Also
+        --------
+        reducto.analyzer.Analyzer
+        reducto.metrics.MetricsStore
+        """
+        if self._store is None:
+            self._store = mt.MetricsStore.from_metrics(self.iter_metrics())
+        return self._store
+
+    @property
+    def metrics(self) -> List[mt.FileMetrics]:
+        """Returns the metrics computed for each source file.
+
+        The records are rebuilt from the store on every call.
+
+        Returns
+        -------
+        metrics : List[mt.FileMetrics]
+            Metrics in the same order as source_files.
+        """
+        return list(self.store)
+
+    def iter_metrics(self) -> Iterator[mt.FileMetrics]:
+        """Yields the metrics of each source file as soon as they are computed.
+
+        Unlike metrics, the metrics are not kept by the package (unless they
+        were already computed), to report packages with a huge number
+        of files without holding every result in memory.
+        The functions excluded are removed from the metrics.
+
+        Yields
+        ------
+        metrics : mt.FileMetrics
+            Metrics in the same order as source_files.
+        """
+        if self._store is not None:
+            yield from self._store
+            return
+
+        if self._analyzer is not None:
+            yield from self._analyze(self._analyzer)
+            return
+
+        with an.Analyzer(workers=self.workers, profile=self._profile) as analyzer:
+            yield from self._analyze(analyzer)
+
+    def _analyze(self, analyzer: an.Analyzer) -> Iterator[mt.FileMetrics]:
+        """Analyzes the source files, keeping the stats of this package."""
+        before: "Counter[str]" = analyzer.stats.copy()
+        metrics: Iterator[mt.FileMetrics] = analyzer.iter_analyze(
+            self.paths, cache=self._cache
+        )
+        if self._exclude is not None and self._exclude.excludes_functions:
+            metrics = map(self._exclude.filter, metrics)
+        yield from metrics
+        self._stats.update(analyzer.stats - before)
+
+    @property
+    def stats(self) -> "Counter[str]":
+        """Statistics of the analysis of the package.
+
+        Contains the number of files seen (files), analyzed (analyzed), found
+        in the cache (cache_hits) and copied from a file with the same content
+        (dedup_hits).
+
+        Returns
+        -------
+        stats : Counter[str]
+        """
+        return self._stats
+
+    @property
+    def totals(self) -> mt.PackageTotals:
+        """Totals of the metrics of the source files.
+
+        When the package was created from a previous state, the previous
+        totals are updated subtracting the metrics of the files changed or
+        removed, and adding the metrics of the files changed or added.
+
+        Returns
+        -------
+        totals : mt.PackageTotals
+        """
+        if self._totals is None:
+            if self._previous is None:
+                self._totals = self.store.totals()
+            else:
+                self._totals = self._update_totals(self._previous.totals)
+        return self._totals
+
+    def _update_totals(self, totals: mt.PackageTotals) -> mt.PackageTotals:
+        """Updates the totals of the previous state with the files changed."""
+        previous: Dict[str, mt.FileMetrics] = self._previous_metrics
+        current: Dict[str, mt.FileMetrics] = {m.path: m for m in self.metrics}
+        # The metrics of unchanged files are equal to the previous ones.
+        for path, metrics in previous.items():
+            if current.get(path) != metrics:
+                totals = totals.subtract(metrics)
+        for path, metrics in current.items():
+            if previous.get(path) != metrics:
+                totals = totals.add(metrics)
+        return totals
+
+    def state(self) -> st.PackageState:
+        """Obtain the state of the package to be stored along a report.
+
+        Returns
+        -------
+        state : st.PackageState
+
+        See Also
+        --------
+        reducto.state.PackageState
+        """
+        files: Dict[str, Dict[str, Any]] = {}
+        for metrics in self.metrics:
+            entry: Dict[str, Any]
+            if isinstance(self._cache, ch.MemoryCache):
+                cached = self._cache.entries.get(metrics.path)
+                stored: Optional[mt.FileMetrics] = None
+                if cached is not None:
+                    # The cache holds the metrics before excluding functions.
+                    stored = cached["metrics"]
+                    if self._exclude is not None:
+                        stored = self._exclude.filter(stored)
+                if cached is None or stored != metrics:
+                    # The file changed while being analyzed, the entry
+                    # must never match to be analyzed again on the next run.
+                    entry = {"size": -1, "mtime_ns": -1, "digest": ""}
+                else:
+                    entry = cached
+            else:
+                key = ch.file_key(metrics.path)
+                entry = {
+                    "size": key.size,
+                    "mtime_ns": key.mtime_ns,
+                    "digest": ch.file_digest(metrics.path),
+                }
+            relname = self.relname(metrics.path)
+            files[relname] = dict(
+                entry, path=relname, metrics=metrics._replace(path=relname)
+            )
+
+        return st.PackageState(self.name, files, self.totals)
+
+    def _column(self, name: str) -> List[int]:
+        """Obtain a column of values per source file, computed once.
+
+        Parameters
+        ----------
+        name : str
+            Name of a field of the files in mt.FILE_FIELDS.
+
+        Returns
+        -------
+        column : List[int]
+            Value of the field for each source file.
+        """
+        column: Optional[List[int]] = self._columns.get(name)
+        if column is None:
+            column = self.store.file_column(name).tolist()
+            self._columns[name] = column
+        return column
 
     @property
     def lines(self) -> List[int]:
@@ -148,7 +431,7 @@ class Package:
         lines : List[int]
             Number of lines of each of the source_files.
         """
-        return [len(file) for file in self.source_files]
+        return self._column("lines")
 
     @property
     def blank_lines(self) -> List[int]:
@@ -159,9 +442,7 @@ class Package:
         blank_lines : List[int]
             Number of blank lines per source_file.
         """
-        if self._blank_lines is None:
-            self._walk()
-        return [file.blank_lines for file in self.source_files]
+        return self._column("blank_lines")
 
     @property
     def docstrings(self) -> List[int]:
@@ -172,9 +453,7 @@ class Package:
         docstrings : List[int]
             Number of docstrings per source_file.
         """
-        if self._docstrings is None:
-            self._walk()
-        return [file.total_docstrings for file in self.source_files]
+        return self._column("docstrings")
 
     @property
     def comment_lines(self) -> List[int]:
@@ -185,9 +464,7 @@ class Package:
         comment_lines : List[int]
             Number of comment lines per source_file.
         """
-        if self._comment_lines is None:
-            self._walk()
-        return [file.comment_lines for file in self.source_files]
+        return self._column("comment_lines")
 
     @property
     def source_lines(self) -> List[int]:
@@ -196,17 +473,17 @@ class Package:
         Returns
         -------
         source_lines : List[int]
-            Number of source lines of each source file.
+            Number of source lines of the functions of each source file.
         """
-        return [
-            sum([func.source_lines for func in file.functions])
-            for file in self.source_files
-        ]
+        return self._column("function_source_lines")
 
     @property
     def functions(self) -> List[List[it.FunctionDef]]:
         """Returns a list of lists of FunctionDef objects.
 
+        Unlike the remaining properties, the FunctionDef objects require
+        the source files to be parsed on the current process.
+
         Returns
         -------
         functions : List[List[it.FunctionDef]]
@@ -230,7 +507,7 @@ class Package:
         number_of_functions : List[int]
             Number of FunctionDef per source_file.
         """
-        return [len(func_list) for func_list in self.functions]
+        return self._column("number_of_functions")
 
     @property
     def average_function_length(self) -> int:
@@ -243,16 +520,10 @@ class Package:
         average : int
             Average function length, rounded to the closest int.
         """
-        source_lines: List[float] = []
-        for function_list in self.functions:
-            for function in function_list:
-                source_lines.append(function.source_lines)
-
-        average: int = (
-            round(statistics.mean(source_lines)) if len(source_lines) > 0 else 0
-        )
-
-        return average
+        number_of_functions: int = sum(self.number_of_functions)
+        if number_of_functions == 0:
+            return 0
+        return round(sum(self.source_lines) / number_of_functions)
 
     @property
     def average_function_lengths(self) -> List[int]:
@@ -263,17 +534,7 @@ class Package:
         averages : List[int]
             Average length of the functions per source file.
         """
-        averages: List[int] = []
-        for function_list in self.functions:
-            if len(function_list) == 0:
-                avg_func_length: int = 0
-            else:
-                avg_func_length = round(
-                    statistics.mean([f.source_lines for f in function_list])
-                )
-            averages.append(avg_func_length)
-
-        return averages
+        return self._column("average_function_length")
 
     def report(self) -> rp.PackageReport:
         """Obtains the PackageReport.
@@ -0,0 +1,238 @@
+"""Module containing the profiling of the phases of the analysis.
+
+The wall and CPU time of each phase is recorded per source file:
+
+- read: reading the raw content of the file (memory mapped when large).
+- tokenize: generating the tokens and finding the comments and blank lines.
+- parse: parsing the ast of the file.
+- visit: visiting the ast with the SourceVisitor.
+- register: registering the docstrings, comments and blank lines on the functions.
+
+The rendering of the reports is recorded for the whole run (phase report).
+When no profile is given, the analysis isn't instrumented at all.
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+import contextlib
+import json
+import pathlib
+import time
+
+# Phases of the analysis of a source file, in order.
+FILE_PHASES: Tuple[str, ...] = ("read", "tokenize", "parse", "visit", "register")
+# Phases recorded for the whole run.
+RUN_PHASES: Tuple[str, ...] = ("report",)
+
+# Wall and CPU time of each phase, in seconds.
+Timings = Dict[str, Tuple[float, float]]
+
+T = TypeVar("T")
+
+
+class Profile:
+    """Wall and CPU time spent on each phase, per source file.
+
+    Examples
+    --------
+    >>> profile = Profile()
+    >>> source_file = SourceFile(path, profile=profile)
+    >>> source_file.metrics
+    >>> print(profile.table())
+    """
+
+    def __init__(self) -> None:
+        self._files: Dict[str, Timings] = {}
+        self._run: Timings = {}
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({len(self.files)} files)"
+
+    @property
+    def files(self) -> Dict[str, Timings]:
+        """Timings of each source file, by path.
+
+        Returns
+        -------
+        files : Dict[str, Timings]
+        """
+        return self._files
+
+    def add(
+        self, phase: str, wall: float, cpu: float, path: Optional[str] = None
+    ) -> None:
+        """Accumulates the time spent on a phase.
+
+        Parameters
+        ----------
+        phase : str
+            One of FILE_PHASES or RUN_PHASES.
+        wall : float
+            Wall time, in seconds.
+        cpu : float
+            CPU time, in seconds.
+        path : Optional[str]
+            Source file, None for the phases of the whole run.
+        """
+        timings: Timings = (
+            self._run if path is None else self._files.setdefault(path, {})
+        )
+        previous_wall, previous_cpu = timings.get(phase, (0.0, 0.0))
+        timings[phase] = (previous_wall + wall, previous_cpu + cpu)
+
+    def update(self, path: str, timings: Timings) -> None:
+        """Adds the timings of a source file, like those recorded by a worker.
+
+        Parameters
+        ----------
+        path : str
+        timings : Timings
+        """
+        for phase, (wall, cpu) in timings.items():
+            self.add(phase, wall, cpu, path=path)
+
+    @contextlib.contextmanager
+    def phase(self, phase: str, path: Optional[str] = None) -> Iterator[None]:
+        """Context manager recording the time spent in its block.
+
+        Parameters
+        ----------
+        phase : str
+        path : Optional[str]
+            Source file, None for the phases of the whole run.
+        """
+        wall: float = time.perf_counter()
+        cpu: float = time.process_time()
+        try:
+            yield
+        finally:
+            self.add(
+                phase,
+                time.perf_counter() - wall,
+                time.process_time() - cpu,
+                path=path,
+            )
+
+    def call(
+        self, phase: str, path: Optional[str], func: Callable[..., T], *args: Any
+    ) -> T:
+        """Calls a function recording the time spent.
+
+        Parameters
+        ----------
+        phase : str
+        path : Optional[str]
+        func : Callable[..., T]
+        args : Any
+            Arguments passed to func.
+
+        Returns
+        -------
+        result : T
+            Value returned by func.
+        """
+        with self.phase(phase, path=path):
+            return func(*args)
+
+    def totals(self) -> Timings:
+        """Time spent on each phase, for every file and the whole run.
+
+        Returns
+        -------
+        totals : Timings
+        """
+        totals = Profile()
+        for timings in self._files.values():
+            totals.update("", timings)
+        totals.update("", self._run)
+        return totals.files.get("", {})
+
+    def slowest(self, n: int = 10) -> List[Tuple[str, float, float]]:
+        """Files with the highest wall time.
+
+        Parameters
+        ----------
+        n : int
+            Number of files. Defaults to 10.
+
+        Returns
+        -------
+        slowest : List[Tuple[str, float, float]]
+            Path, wall and CPU time of each file.
+        """
+        files = [
+            (
+                path,
+                sum(wall for wall, _ in timings.values()),
+                sum(cpu for _, cpu in timings.values()),
+            )
+            for path, timings in self._files.items()
+        ]
+        return sorted(files, key=lambda file: file[1], reverse=True)[:n]
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Returns the raw timings.
+
+        Returns
+        -------
+        profile : Dict[str, Any]
+            Contains the totals and the timings of each file, each
+            phase with the keys wall and cpu (in seconds).
+        """
+
+        def timings_dict(timings: Timings) -> Dict[str, Dict[str, float]]:
+            return {
+                phase: {"wall": wall, "cpu": cpu}
+                for phase, (wall, cpu) in timings.items()
+            }
+
+        return {
+            "totals": timings_dict(self.totals()),
+            "files": {
+                path: timings_dict(timings) for path, timings in self._files.items()
+            },
+        }
+
+    def dump(self, path: pathlib.Path) -> None:
+        """Writes the raw timings as json.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+        """
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=4)
+
+    def table(self, n: int = 10) -> str:
+        """Summary of the time per phase and the slowest files.
+
+        Parameters
+        ----------
+        n : int
+            Number of files shown. Defaults to 10.
+
+        Returns
+        -------
+        table : str
+        """
+        totals: Timings = self.totals()
+        rows: List[Tuple[str, float, float]] = [
+            (phase, *totals[phase])
+            for phase in FILE_PHASES + RUN_PHASES
+            if phase in totals
+        ]
+        rows.append(
+            (
+                "total",
+                sum(wall for _, wall, _ in rows),
+                sum(cpu for _, _, cpu in rows),
+            )
+        )
+        lines: List[str] = [f"{'phase':<12}{'wall (s)':>12}{'cpu (s)':>12}"]
+        lines.extend(f"{name:<12}{wall:>12.4f}{cpu:>12.4f}" for name, wall, cpu in rows)
+        lines.append("")
+        lines.append(f"{'slowest files':<60}{'wall (s)':>12}{'cpu (s)':>12}")
+        lines.extend(
+            f"{path:<60}{wall:>12.4f}{cpu:>12.4f}"
+            for path, wall, cpu in self.slowest(n)
+        )
+        return "\n".join(lines)
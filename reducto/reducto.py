@@ -1,16 +1,42 @@
-"""Module containing the application abstraction. """
+"""Module containing the application abstraction."""
 
-from typing import List, Optional, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 import argparse
+import contextlib
+import os
 import pathlib
-import json
-import pprint
+import sys
 
-import reducto.package as pkg
 import reducto.src as src
 import reducto.reports as rp
+import reducto.analyzer as an
+import reducto.exclude as ex
+import reducto.metrics as mt
+import reducto.profile as pf
 import reducto as rd
 
+if TYPE_CHECKING:
+    # Imported by the runs using them, a single source file never
+    # walks a package.
+    import reducto.cache as ch  # pragma: no cover
+    import reducto.package as pkg  # pragma: no cover
+    import reducto.shard as sh  # pragma: no cover
+    import reducto.state as st  # pragma: no cover
+
+# Target reading a source file from the standard input.
+STDIN_TARGET: pathlib.Path = pathlib.Path("-")
+
 
 class Reducto:
     """Class defining the package application.
@@ -23,20 +49,53 @@ class Reducto:
     The different arguments for the app are defined as private methods of this class.
     """
 
-    def __init__(self) -> None:  # pragma: no cover, redirects methods
+    def __init__(
+        self, analyzer: Optional[an.Analyzer] = None
+    ) -> None:  # pragma: no cover, redirects methods
+        """
+        Parameters
+        ----------
+        analyzer : Optional[an.Analyzer]
+            Analyzer shared by every run, like the one kept warm by the daemon.
+            Defaults to None, each run creates its own analyzer.
+        """
         self.parser: argparse.ArgumentParser = argparse.ArgumentParser()
         self.args: Optional[argparse.Namespace] = None
+        self.profile: Optional[pf.Profile] = None
+        self.analyzer: Optional[an.Analyzer] = analyzer
         # Add arguments
         self._add_argument_version()
         self._add_argument_target()
+        self._add_argument_manifest()
         self._add_argument_format()
         self._add_argument_grouped()
         self._add_argument_output_file()
+        self._add_argument_exclude()
         self._add_argument_as_percentage()
+        self._add_argument_jobs()
+        self._add_argument_cache_dir()
+        self._add_argument_incremental()
+        self._add_argument_compress()
+        self._add_argument_profile()
+        self._add_argument_daemon()
+        self._add_argument_watch()
+        self._add_argument_shard()
+        self._add_argument_mergeable()
+        self._add_argument_stdin_name()
+        # Subcommands, given as the first argument.
+        self.commands: Dict[str, Callable[[List[str]], None]] = {
+            "history": self._run_history,
+            "serve": self._run_serve,
+            "merge": self._run_merge,
+        }
+        self.history_parser: argparse.ArgumentParser = self._history_parser()
+        self.serve_parser: argparse.ArgumentParser = self._serve_parser()
+        self.merge_parser: argparse.ArgumentParser = self._merge_parser()
 
     def _parse_args(self, argv: Optional[List[str]] = None) -> None:  # pragma: no cover
         # proxy function to simplify testing
         self.args = self.parser.parse_args(argv)
+        self.profile = pf.Profile() if self.args.profile else None
 
     def _add_argument_version(self) -> None:  # pragma: no cover
         """Version argument.
@@ -54,19 +113,35 @@ class Reducto:
     def _add_argument_target(self) -> None:  # pragma: no cover
         """Target argument.
 
-        Expects the path pointing to a python package or source file.
+        Expects the paths pointing to python packages or source files.
         """
         self.parser.add_argument(
             "target",
             type=pathlib.Path,
-            default=pathlib.Path.cwd(),
+            default=[],
             help="Path to execute the program into. "
             "Must be either a python package (directory containing an __init__.py) "
-            "or a python source file {SRC.py}",
-            nargs="?",
+            "or a python source file {SRC.py}. Multiple targets can be given, "
+            "defaults to the current working directory. Use - to read a single "
+            "source file from the standard input.",
+            nargs="*",
         )
 
-    def _add_argument_format(self) -> None:  # pragma: no cover
+    def _add_argument_manifest(self) -> None:  # pragma: no cover
+        """Add argument to read the targets from a file."""
+        self.parser.add_argument(
+            "--manifest",
+            type=pathlib.Path,
+            default=None,
+            dest="manifest",
+            help="File containing a target per line, analyzed along the "
+            "targets given. Relative paths are relative to the file, empty "
+            "lines and lines starting with # are ignored.",
+        )
+
+    def _add_argument_format(
+        self, parser: Optional[argparse.ArgumentParser] = None
+    ) -> None:  # pragma: no cover
         """Adds the argument for the type of output format.
 
         The current implementation only allows for raw format (a dict).
@@ -75,7 +150,8 @@ class Reducto:
         -----
         Add redirection to tabulate methods.
         """
-        self.parser.add_argument(
+        parser = parser or self.parser
+        parser.add_argument(
             "-f",
             "--format",
             type=rp.ReportFormat,
@@ -111,9 +187,12 @@ class Reducto:
         )
         self.parser.set_defaults(grouped=True)
 
-    def _add_argument_output_file(self) -> None:  # pragma: no cover
+    def _add_argument_output_file(
+        self, parser: Optional[argparse.ArgumentParser] = None
+    ) -> None:  # pragma: no cover
         """Argument to insert the output file (if applies)."""
-        self.parser.add_argument(
+        parser = parser or self.parser
+        parser.add_argument(
             "-o",
             "--output",
             type=pathlib.Path,
@@ -122,13 +201,54 @@ class Reducto:
             " given, redirects to stdout.",
         )
 
-    def _add_argument_exclude(self) -> None:  # pragma: no cover
+    def _add_argument_exclude(
+        self, parser: Optional[argparse.ArgumentParser] = None
+    ) -> None:  # pragma: no cover
         """Add argument to exclude paths, files, methods (private or dunder)."""
-        raise NotImplementedError
+        parser = parser or self.parser
+        parser.add_argument(
+            "-e",
+            "--exclude",
+            action="append",
+            default=[],
+            dest="exclude",
+            metavar="PATTERN",
+            help="Glob pattern of the paths to exclude, relative to the package. "
+            "A pattern without / matches the name of a file or directory "
+            "at any level. Can be given multiple times.",
+        )
+        parser.add_argument(
+            "--exclude-private",
+            dest="exclude_private",
+            action="store_true",
+            help="Exclude the private functions (_name) from the function metrics.",
+        )
+        parser.add_argument(
+            "--exclude-dunder",
+            dest="exclude_dunder",
+            action="store_true",
+            help="Exclude the dunder methods (__name__) from the function metrics.",
+        )
+
+    def _exclude(self) -> ex.Exclude:
+        """Rules to exclude paths and functions, compiled once per run.
+
+        Returns
+        -------
+        exclude : ex.Exclude
+        """
+        return ex.Exclude(
+            self.args.exclude,  # type: ignore[union-attr]
+            private=self.args.exclude_private,  # type: ignore[union-attr]
+            dunder=self.args.exclude_dunder,  # type: ignore[union-attr]
+        )
 
-    def _add_argument_as_percentage(self) -> None:  # pragma: no cover
+    def _add_argument_as_percentage(
+        self, parser: Optional[argparse.ArgumentParser] = None
+    ) -> None:  # pragma: no cover
         """Add argument to report lines as percentage."""
-        self.parser.add_argument(
+        parser = parser or self.parser
+        parser.add_argument(
             "-p",
             "--percentage",
             dest="percentage",
@@ -136,6 +256,314 @@ class Reducto:
             help="Report the number of lines as percentage.",
         )
 
+    def _add_argument_jobs(
+        self, parser: Optional[argparse.ArgumentParser] = None
+    ) -> None:  # pragma: no cover
+        """Add argument to set the number of processes analyzing a package."""
+        parser = parser or self.parser
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=an.usable_cpus(),
+            dest="jobs",
+            help="Number of processes used to analyze the source files of "
+            "a package. Defaults to the number of usable CPUs.",
+        )
+
+    def _add_argument_cache_dir(
+        self, parser: Optional[argparse.ArgumentParser] = None
+    ) -> None:  # pragma: no cover
+        """Add argument to store the metrics of the files between runs."""
+        parser = parser or self.parser
+        parser.add_argument(
+            "--cache-dir",
+            type=pathlib.Path,
+            default=None,
+            dest="cache_dir",
+            help="Directory to cache the metrics of each source file. "
+            "Only the files changed since the previous run are analyzed.",
+        )
+
+    def _add_argument_incremental(self) -> None:  # pragma: no cover
+        """Add argument to update the report of a previous run."""
+        self.parser.add_argument(
+            "--incremental",
+            type=pathlib.Path,
+            default=None,
+            dest="incremental",
+            metavar="PREVIOUS_REPORT",
+            help="Json report of a previous run generated with this option. "
+            "Only the files changed since are analyzed, and the report is "
+            "generated with the state required for the next run. "
+            "When the file doesn't exist, the whole package is analyzed.",
+        )
+
+    def _add_argument_compress(self) -> None:  # pragma: no cover
+        """Add argument to compress the streamed reports."""
+        self.parser.add_argument(
+            "--compress",
+            choices=sorted(rp.COMPRESSIONS.values()),
+            default=None,
+            dest="compress",
+            help="Compression of the ndjson report. Defaults to the one "
+            "given by the extension of the output (.gz or .xz), if any.",
+        )
+
+    def _add_argument_profile(self) -> None:  # pragma: no cover
+        """Add arguments to time the phases of the analysis."""
+        self.parser.add_argument(
+            "--profile",
+            dest="profile",
+            action="store_true",
+            help="Record the wall and CPU time spent on each phase of the "
+            "analysis, and print a summary with the slowest files "
+            "to the standard error.",
+        )
+        self.parser.add_argument(
+            "--profile-output",
+            type=pathlib.Path,
+            default=None,
+            dest="profile_output",
+            help="Json file to write the timings of every file, "
+            "used along --profile.",
+        )
+
+    def _add_argument_daemon(self) -> None:  # pragma: no cover
+        """Add argument to obtain the report from the daemon."""
+        self.parser.add_argument(
+            "--daemon",
+            dest="daemon",
+            action="store_true",
+            help="Obtain the report from the daemon started with reducto serve, "
+            "reusing the metrics of the files not changed since. "
+            "Runs as usual when the daemon isn't running.",
+        )
+
+    def _add_argument_watch(self) -> None:  # pragma: no cover
+        """Add argument to report the package again when it changes."""
+        self.parser.add_argument(
+            "--watch",
+            dest="watch",
+            action="store_true",
+            help="Keep running, reporting the package again every time its "
+            "source files change. Only the files changed are analyzed again. "
+            "Requires a single package as target.",
+        )
+
+    def _add_argument_shard(self) -> None:  # pragma: no cover
+        """Add argument to analyze a single shard of the package."""
+
+        def shard(text: str) -> "sh.Shard":
+            import reducto.shard as sh
+
+            return sh.Shard.parse(text)
+
+        self.parser.add_argument(
+            "--shard",
+            type=shard,
+            default=None,
+            dest="shard",
+            metavar="I/N",
+            help="Analyze only the I-th of N subsets of the source files, "
+            "spread by size. The json reports of every shard can be combined "
+            "without analyzing the files again.",
+        )
+
+    def _add_argument_mergeable(self) -> None:  # pragma: no cover
+        """Add argument to include the accumulators in the report."""
+        self.parser.add_argument(
+            "--mergeable",
+            dest="mergeable",
+            action="store_true",
+            help="Include the raw totals of each target in the json report, "
+            "so it can be combined with other reports by reducto merge. "
+            "Implied by --shard.",
+        )
+
+    def _add_argument_stdin_name(self) -> None:  # pragma: no cover
+        """Add argument to name the source file read from the standard input."""
+        self.parser.add_argument(
+            "--stdin-name",
+            default="stdin.py",
+            dest="stdin_name",
+            help="Name reported for the source file read from the standard "
+            "input (target -), must end with .py. Defaults to stdin.py.",
+        )
+
+    def _merge_parser(self) -> argparse.ArgumentParser:  # pragma: no cover
+        """Parser of the merge subcommand."""
+        parser = argparse.ArgumentParser(
+            prog="reducto merge",
+            description="Combine json reports generated with --mergeable "
+            "(or --shard) into exact totals, without analyzing the files again.",
+        )
+        parser.add_argument(
+            "reports",
+            type=pathlib.Path,
+            nargs="+",
+            help="Json reports to merge.",
+        )
+        self._add_argument_output_file(parser)
+        return parser
+
+    def _serve_parser(self) -> argparse.ArgumentParser:  # pragma: no cover
+        """Parser of the serve subcommand."""
+        parser = argparse.ArgumentParser(
+            prog="reducto serve",
+            description="Daemon keeping the metrics of the files in memory, "
+            "answering the queries of the clients on a Unix socket.",
+        )
+        parser.add_argument(
+            "--socket",
+            type=pathlib.Path,
+            default=None,
+            dest="socket",
+            help="Path of the socket. Defaults to $REDUCTO_SOCKET, or reducto.sock "
+            "in the runtime directory of the user.",
+        )
+        action = parser.add_mutually_exclusive_group(required=False)
+        action.add_argument(
+            "--stop",
+            dest="stop",
+            action="store_true",
+            help="Stop the daemon running on the socket.",
+        )
+        action.add_argument(
+            "--status",
+            dest="status",
+            action="store_true",
+            help="Print the stats of the daemon running on the socket.",
+        )
+        self._add_argument_jobs(parser)
+        return parser
+
+    def _history_parser(self) -> argparse.ArgumentParser:  # pragma: no cover
+        """Parser of the history subcommand.
+
+        Shares the options of the report which apply to a summary per commit.
+        """
+        parser = argparse.ArgumentParser(
+            prog="reducto history",
+            description="Summary of a package on every commit since a revision, "
+            "read from the git object store without checking out any commit.",
+        )
+        parser.add_argument(
+            "target",
+            type=pathlib.Path,
+            nargs="?",
+            default=pathlib.Path.cwd(),
+            help="Directory of the package, inside a git repository. "
+            "Defaults to the current working directory.",
+        )
+        parser.add_argument(
+            "--since",
+            required=True,
+            dest="since",
+            metavar="REF",
+            help="Revision where the history starts (excluded), like a tag "
+            "or HEAD~100.",
+        )
+        parser.add_argument(
+            "--rev",
+            default="HEAD",
+            dest="rev",
+            help="Revision where the history ends. Defaults to HEAD.",
+        )
+        parser.add_argument(
+            "--first-parent",
+            dest="first_parent",
+            action="store_true",
+            help="Follow only the first parent of the merge commits.",
+        )
+        self._add_argument_format(parser)
+        self._add_argument_output_file(parser)
+        self._add_argument_exclude(parser)
+        self._add_argument_as_percentage(parser)
+        self._add_argument_jobs(parser)
+        self._add_argument_cache_dir(parser)
+        return parser
+
+    def _render(self, reporter: Any, **kwargs: Any) -> Any:
+        """Renders a report, timing it when profiling.
+
+        Parameters
+        ----------
+        reporter : Union[rp.SourceReport, rp.PackageReport]
+        kwargs : Any
+            Arguments of the report method.
+
+        Returns
+        -------
+        report : Union[rp.SourceReportType, rp.PackageReportType]
+        """
+        if self.profile is None:
+            return reporter.report(**kwargs)
+        return self.profile.call("report", None, lambda: reporter.report(**kwargs))
+
+    def _write_profile(self) -> None:
+        """Prints the summary of the profile, and writes it if requested."""
+        if self.profile is None:
+            return
+        print(self.profile.table(), file=sys.stderr)
+        output: Optional[pathlib.Path] = self.args.profile_output  # type: ignore[union-attr]
+        if output is not None:
+            self.profile.dump(output)
+            print(f"Profile generated: {output}", file=sys.stderr)
+
+    def _source_file(self, target: pathlib.Path) -> src.SourceFile:
+        """Create the source file to be reported with the options given.
+
+        When the application has an analyzer, the metrics are obtained
+        from it (and its cache).
+
+        Parameters
+        ----------
+        target : pathlib.Path
+            Path to the source file.
+
+        Returns
+        -------
+        source_file : src.SourceFile
+        """
+        if target == STDIN_TARGET:
+            return self._stdin_source_file()
+        metrics: Optional[mt.FileMetrics] = None
+        if self.analyzer is not None:
+            src.SourceFile.validate(target)
+            metrics = self.analyzer.analyze([target])[0]
+        return src.SourceFile(
+            target,
+            lean=True,
+            exclude=self._exclude(),
+            profile=self.profile,
+            metrics=metrics,
+        )
+
+    def _stdin_source_file(self) -> src.SourceFile:
+        """Create the source file read from the standard input.
+
+        The content is never written to the file system, it's reported
+        with the name given by --stdin-name.
+
+        Returns
+        -------
+        source_file : src.SourceFile
+        """
+        name: str = self.args.stdin_name  # type: ignore[union-attr]
+        source: bytes = sys.stdin.buffer.read()
+        metrics: Optional[mt.FileMetrics] = None
+        if self.analyzer is not None:
+            metrics = self.analyzer.analyze_sources([(name, source)])[0]
+        return src.SourceFile.from_source(
+            source,
+            name=name,
+            lean=True,
+            exclude=self._exclude(),
+            profile=self.profile,
+            metrics=metrics,
+        )
+
     def _report_source_file(self, target: pathlib.Path) -> rp.SourceReportType:
         """Create a report of a single source file.
 
@@ -149,13 +577,176 @@ class Reducto:
         report : rp.ReportDict
             Dict containing the report.
         """
-        src_file: src.SourceFile = src.SourceFile(target)
-        reporter: rp.SourceReport = src_file.report()
-        return reporter.report(
+        src_file: src.SourceFile = self._source_file(target)
+        src_file.metrics  # Analyze before rendering the report.
+        report: rp.SourceReportType = self._render(
+            src_file.report(),
             fmt=self.args.format,  # type: ignore[union-attr]
             is_package=True,
             percentage=self.args.percentage,  # type: ignore[union-attr]
         )
+        self._add_accumulators(
+            report,
+            {src_file.name: mt.PackageTotals().add(src_file.metrics)},
+            files=[src_file.name],
+        )
+        return report
+
+    def _targets(self) -> List[pathlib.Path]:
+        """Paths to analyze, the current working directory if none is given.
+
+        Returns
+        -------
+        targets : List[pathlib.Path]
+            Targets given in the command line followed by those in the manifest.
+        """
+        targets: List[pathlib.Path] = list(self.args.target)  # type: ignore[union-attr]
+        manifest: Optional[pathlib.Path] = self.args.manifest  # type: ignore[union-attr]
+        if manifest is not None:
+            targets.extend(read_manifest(manifest))
+        if len(targets) == 0:
+            targets.append(pathlib.Path.cwd())
+        return targets
+
+    def _package(
+        self, target: pathlib.Path, analyzer: Optional[an.Analyzer] = None
+    ) -> "pkg.Package":
+        """Create the package to be reported with the options given.
+
+        Parameters
+        ----------
+        target : pathlib.Path
+            Path to the package.
+        analyzer : Optional[an.Analyzer]
+            Analyzer shared by multiple targets, along with its cache.
+            Defaults to None.
+
+        Returns
+        -------
+        package : pkg.Package
+        """
+        import reducto.package as pkg
+        import reducto.state as st
+
+        previous_report: Optional[pathlib.Path] = self.args.incremental  # type: ignore[union-attr]
+        previous: Optional[st.PackageState] = None
+        if previous_report is not None:
+            # Without a previous state, every file is analyzed.
+            previous = st.PackageState.load(
+                previous_report, target.name
+            ) or st.PackageState(target.name)
+
+        if analyzer is None:
+            analyzer = self.analyzer
+        return pkg.Package(
+            target,
+            workers=self.args.jobs,  # type: ignore[union-attr]
+            cache=self._metrics_cache() if analyzer is None else None,
+            previous=previous,
+            exclude=self._exclude(),
+            analyzer=analyzer,
+            profile=self.profile,
+            shard=self.args.shard,  # type: ignore[union-attr]
+        )
+
+    def _metrics_cache(self) -> Optional["ch.MetricsCache"]:
+        """Persistent cache of the metrics, if a directory was given."""
+        import reducto.cache as ch
+
+        cache_dir: Optional[pathlib.Path] = self.args.cache_dir  # type: ignore[union-attr]
+        return ch.MetricsCache(cache_dir) if cache_dir is not None else None
+
+    def _analyzer(self) -> ContextManager[an.Analyzer]:
+        """Analyzer shared by every target, with a single pool and cache.
+
+        The analyzer given to the application is used (and kept open) if any.
+
+        Returns
+        -------
+        analyzer : ContextManager[an.Analyzer]
+        """
+        if self.analyzer is not None:
+            return contextlib.nullcontext(self.analyzer)
+        return an.Analyzer(
+            workers=self.args.jobs,  # type: ignore[union-attr]
+            cache=self._metrics_cache(),
+            profile=self.profile,
+        )
+
+    def _report_targets(
+        self, targets: List[pathlib.Path]
+    ) -> Union[str, Dict[str, Any]]:
+        """Create a combined report of multiple targets.
+
+        Every target is analyzed with the same pool of processes and cache.
+        The reports are keyed by the name of each target (or its path
+        if the name is repeated), followed by a summary of all of them
+        under rp.SUMMARY_KEY. For the table formats, the tables are
+        concatenated with the summary table at the end.
+
+        Parameters
+        ----------
+        targets : List[pathlib.Path]
+
+        Returns
+        -------
+        report : Union[str, Dict[str, Any]]
+        """
+        fmt: rp.ReportFormat = self.args.format  # type: ignore[union-attr]
+        percentage: bool = self.args.percentage  # type: ignore[union-attr]
+        reports: List[Tuple[pathlib.Path, Any, mt.PackageTotals]] = []
+        totals = mt.PackageTotals()
+        with self._analyzer() as analyzer:
+            for target in targets:
+                if target.is_file():
+                    source_file = self._source_file(target)
+                    target_totals = mt.PackageTotals().add(source_file.metrics)
+                    report: Any = self._render(
+                        source_file.report(),
+                        fmt=fmt,
+                        is_package=True,
+                        percentage=percentage,
+                    )
+                else:
+                    package: pkg.Package = self._package(target, analyzer=analyzer)
+                    package.store  # Analyze before rendering the report.
+                    report = self._render(
+                        package.report(),
+                        fmt=fmt,
+                        grouped=self.args.grouped,  # type: ignore[union-attr]
+                        percentage=percentage,
+                    )
+                    target_totals = package.totals
+                totals = totals.merge(target_totals)
+                reports.append((target, report, target_totals))
+
+        summary = rp.totals_as_dict(totals, percentage=percentage)
+        if fmt != rp.ReportFormat.JSON:
+            tables: List[str] = [report for _, report, _ in reports]
+            tables.append(
+                rp.tabulate_report(
+                    rp.SUMMARY_KEY,
+                    {rp.SUMMARY_KEY: summary},
+                    rp.PACKAGE_COLUMNS,
+                    grouped=True,
+                    fmt=str(fmt),
+                )
+            )
+            return "\n\n".join(tables)
+
+        combined: Dict[str, Any] = {}
+        accumulators: Dict[str, mt.PackageTotals] = {}
+        files: List[str] = []
+        for target, report, target_totals in reports:
+            for name, content in report.items():
+                name = name if name not in combined else str(target)
+                combined[name] = content
+                accumulators[name] = target_totals
+                if target.is_file():
+                    files.append(name)
+        combined[rp.SUMMARY_KEY] = summary
+        self._add_accumulators(combined, accumulators, files=files)
+        return combined
 
     def _report_package(self, target: pathlib.Path) -> rp.PackageReportType:
         """Create a report of a python package.
@@ -170,33 +761,125 @@ class Reducto:
         report : rp.ReportPackageDict
             Dict containing the report.
         """
-        package: pkg.Package = pkg.Package(target)
-        reporter: rp.PackageReport = package.report()
-        return reporter.report(
+        package: pkg.Package = self._package(target)
+        previous_report: Optional[pathlib.Path] = self.args.incremental  # type: ignore[union-attr]
+        package.store  # Analyze before rendering the report.
+        report: rp.PackageReportType = self._render(
+            package.report(),
             fmt=self.args.format,  # type: ignore[union-attr]
             grouped=self.args.grouped,  # type: ignore[union-attr]
             percentage=self.args.percentage,  # type: ignore[union-attr]
         )
+        if previous_report is not None:
+            import reducto.state as st
+
+            report[st.STATE_KEY] = package.state().as_dict()  # type: ignore[index]
+        if package.shard is not None:
+            import reducto.shard as sh
+
+            report[sh.SHARD_KEY] = sh.shard_as_dict(  # type: ignore[index]
+                package.shard, package.name
+            )
+        self._add_accumulators(report, {package.name: package.totals})
+        return report
+
+    def _add_accumulators(
+        self,
+        report: Union[rp.SourceReportType, rp.PackageReportType],
+        totals: Dict[str, mt.PackageTotals],
+        files: Iterable[str] = (),
+    ) -> None:
+        """Stores the accumulators in a json report when it must be mergeable.
+
+        Parameters
+        ----------
+        report : Union[rp.SourceReportType, rp.PackageReportType]
+        totals : Dict[str, mt.PackageTotals]
+            Totals of each target, by its name in the report.
+        files : Iterable[str]
+            Names of the targets which are source files. Defaults to ().
+
+        See Also
+        --------
+        reducto.merge.accumulators_as_dict
+        """
+        args: argparse.Namespace = self.args  # type: ignore[assignment]
+        if not args.mergeable and args.shard is None:
+            return
+        import reducto.merge as mg
+
+        report[mg.ACCUMULATORS_KEY] = mg.accumulators_as_dict(  # type: ignore[index]
+            totals, files=files, grouped=args.grouped, percentage=args.percentage
+        )
 
-    def report(self) -> Union[rp.SourceReportType, rp.PackageReportType]:
+    def report(
+        self, targets: Optional[List[pathlib.Path]] = None
+    ) -> Union[rp.SourceReportType, rp.PackageReportType]:
         """Detects whether the input target is a file or a directory.
 
-        Calls the corresponding method depending on the target.
+        Calls the corresponding method depending on the target, or
+        creates a combined report when multiple targets are given.
+
+        Parameters
+        ----------
+        targets : Optional[List[pathlib.Path]]
+            Paths to analyze. Defaults to None, read from the arguments.
 
         See Also
         --------
         run
         """
-        target: pathlib.Path = self.args.target  # type: ignore[union-attr]
-        if target.is_file():
-            report: Union[
-                rp.SourceReportType, rp.PackageReportType
-            ] = self._report_source_file(target)
+        if targets is None:
+            targets = self._targets()
+        if len(targets) > 1:
+            return self._report_targets(targets)
+
+        target: pathlib.Path = targets[0]
+        if target == STDIN_TARGET or target.is_file():
+            report: Union[rp.SourceReportType, rp.PackageReportType] = (
+                self._report_source_file(target)
+            )
         else:
             report = self._report_package(target)
 
         return report
 
+    def _stream_report(self, targets: List[pathlib.Path]) -> None:
+        """Streams the report of the target with the ndjson format.
+
+        The records are written to the output file (or the standard output)
+        as soon as each source file is analyzed. With multiple targets,
+        the records of every target are followed by a summary record
+        named rp.SUMMARY_KEY.
+
+        Parameters
+        ----------
+        targets : List[pathlib.Path]
+            Paths to analyze.
+
+        See Also
+        --------
+        reducto.reports.PackageReport.stream
+        """
+        output: Optional[pathlib.Path] = self.args.output  # type: ignore[union-attr]
+        percentage: bool = self.args.percentage  # type: ignore[union-attr]
+        totals = mt.PackageTotals()
+        with rp.open_report_stream(
+            output, self.args.compress  # type: ignore[union-attr]
+        ) as fp, self._analyzer() as analyzer:
+            for target in targets:
+                reporter: Union[rp.SourceReport, rp.PackageReport]
+                if target == STDIN_TARGET or target.is_file():
+                    reporter = self._source_file(target).report()
+                else:
+                    reporter = self._package(target, analyzer=analyzer).report()
+                totals = totals.merge(reporter.stream(fp, percentage=percentage))
+            if len(targets) > 1:
+                rp.write_summary(fp, rp.SUMMARY_KEY, totals, percentage=percentage)
+
+        if output is not None:
+            print(f"Report generated: {output}")
+
     def _write_report(
         self, report: Union[rp.SourceReportType, rp.PackageReportType]
     ) -> None:  # pragma: no cover, proxy to json dump
@@ -207,6 +890,8 @@ class Reducto:
         report : Union[rp.ReportDict, rp.ReportPackageDict]
             Contains the resulting report.
         """
+        import json
+
         output_file = self.args.output  # type: ignore[union-attr]
         if isinstance(report, dict):
             with open(output_file, "w") as f:
@@ -217,20 +902,176 @@ class Reducto:
 
         print(f"Report generated: {output_file}")
 
+    def _run_history(self, argv: List[str]) -> None:
+        """Execute the history subcommand.
+
+        Writes the summary of the package on each commit, oldest first.
+
+        Parameters
+        ----------
+        argv : List[str]
+            Arguments passed from the terminal, after the subcommand.
+        """
+        import json
+        import pprint
+        import reducto.history as hs
+
+        args = self.args = self.history_parser.parse_args(argv)
+        fmt: rp.ReportFormat = args.format
+        percentage: bool = args.percentage
+        try:
+            history = hs.History(
+                args.target,
+                args.since,
+                rev=args.rev,
+                first_parent=args.first_parent,
+                exclude=self._exclude(),
+                workers=args.jobs,
+                cache=self._metrics_cache(),
+            )
+            if fmt == rp.ReportFormat.NDJSON:
+                with rp.open_report_stream(args.output) as fp:
+                    for commit, totals in history.summaries():
+                        record: Dict[str, Any] = {
+                            "type": "commit",
+                            "name": history.name,
+                            "commit": commit.sha,
+                        }
+                        record.update(hs.commit_as_dict(commit, totals, percentage))
+                        fp.write(json.dumps(record) + "\n")
+                if args.output is not None:
+                    print(f"Report generated: {args.output}")
+                return
+            commits: Dict[str, Any] = {
+                commit.sha: hs.commit_as_dict(commit, totals, percentage)
+                for commit, totals in history.summaries()
+            }
+        except hs.GitError as e:
+            self.history_parser.error(str(e))
+
+        report: Union[str, Dict[str, Any]]
+        if fmt == rp.ReportFormat.JSON:
+            report = {history.name: commits}
+        else:
+            report = hs.tabulate_history(commits, fmt=str(fmt))
+        if args.output is not None:  # pragma: no cover
+            self._write_report(report)
+        elif fmt == rp.ReportFormat.JSON:
+            pprint.pprint(report)
+        else:
+            print(report)
+
+    def _run_merge(self, argv: List[str]) -> None:
+        """Execute the merge subcommand.
+
+        Combines the reports given into a single json report.
+
+        Parameters
+        ----------
+        argv : List[str]
+            Arguments passed from the terminal, after the subcommand.
+
+        See Also
+        --------
+        reducto.merge.Merge
+        """
+        import pprint
+        import reducto.merge as mg
+
+        args = self.args = self.merge_parser.parse_args(argv)
+        try:
+            report: Dict[str, Any] = mg.merge(mg.load_reports(args.reports))
+        except mg.MergeError as e:
+            self.merge_parser.error(str(e))
+        if args.output is not None:  # pragma: no cover
+            self._write_report(report)
+        else:
+            pprint.pprint(report)
+
     def run(self, argv: Optional[List[str]] = None) -> None:
         """Execute reducto.
 
         The only relevant public method.
         Parses the terminal arguments, generates the report
-        and writes it to a file.
+        and writes it to a file. When the first argument is
+        a subcommand (like history), it is executed instead.
 
         Parameters
         ----------
         argv : Optional[List[str]]
             Arguments passed from the terminal.
         """
+        if argv is None:
+            argv = sys.argv[1:]
+        if len(argv) > 0 and argv[0] in self.commands:
+            self.commands[argv[0]](argv[1:])
+            return
         self._parse_args(argv)
-        report: Union[rp.SourceReportType, rp.PackageReportType] = self.report()
+        # Read once, the manifest may be long.
+        targets: List[pathlib.Path] = self._targets()
+        if STDIN_TARGET in targets and (
+            len(targets) > 1
+            or self.args.incremental is not None  # type: ignore[union-attr]
+            or self.args.watch  # type: ignore[union-attr]
+            or self.args.shard is not None  # type: ignore[union-attr]
+        ):
+            self.parser.error(
+                "- (standard input) must be the only target, without "
+                "--incremental, --watch nor --shard."
+            )
+        if (
+            self.args.incremental is not None  # type: ignore[union-attr]
+            and self.args.format != rp.ReportFormat.JSON  # type: ignore[union-attr]
+        ):
+            self.parser.error("--incremental requires the json format.")
+        if (
+            self.args.incremental is not None  # type: ignore[union-attr]
+            and len(targets) > 1
+        ):
+            self.parser.error("--incremental requires a single target.")
+        if self.args.shard is not None and (  # type: ignore[union-attr]
+            self.args.format != rp.ReportFormat.JSON  # type: ignore[union-attr]
+            or self.args.incremental is not None  # type: ignore[union-attr]
+            or self.args.watch  # type: ignore[union-attr]
+            or len(targets) > 1
+            or targets[0].is_file()
+        ):
+            self.parser.error(
+                "--shard requires the json format and a single package as target."
+            )
+        if (
+            self.args.mergeable  # type: ignore[union-attr]
+            and self.args.format != rp.ReportFormat.JSON  # type: ignore[union-attr]
+        ):
+            self.parser.error("--mergeable requires the json format.")
+        if self.args.watch:  # type: ignore[union-attr]
+            self._watch(targets)
+            return
+        if self.args.format == rp.ReportFormat.NDJSON:  # type: ignore[union-attr]
+            self._stream_report(targets)
+            self._write_profile()
+            return
+        if self.args.compress is not None:  # type: ignore[union-attr]
+            self.parser.error("--compress requires the ndjson format.")
+        report: Optional[Union[rp.SourceReportType, rp.PackageReportType]] = None
+        if self.args.daemon:  # type: ignore[union-attr]
+            report = self._daemon_report(argv)
+        if report is None:
+            report = self.report(targets)
+        self._print_report(report)
+        self._write_profile()
+
+    def _print_report(
+        self, report: Union[rp.SourceReportType, rp.PackageReportType]
+    ) -> None:
+        """Prints the report, or writes it to the output file if given.
+
+        Parameters
+        ----------
+        report : Union[rp.SourceReportType, rp.PackageReportType]
+        """
+        import pprint
+
         if self.args.output is not None:  # type: ignore[union-attr]  # pragma: no cover
             # Write file if output is given.
             self._write_report(report)
@@ -239,3 +1080,179 @@ class Reducto:
             pprint.pprint(report)
         else:  # tabulate results are expected to be printed with print.
             print(report)
+
+    def _watch(self, targets: List[pathlib.Path]) -> None:
+        """Reports the package again every time its source files change.
+
+        Runs until interrupted (Ctrl+C). The report is printed (or written)
+        as on a single run.
+
+        Parameters
+        ----------
+        targets : List[pathlib.Path]
+            Paths given, must be a single package.
+
+        See Also
+        --------
+        reducto.watch.Watch
+        """
+        import reducto.watch as wt
+
+        args: argparse.Namespace = self.args  # type: ignore[assignment]
+        if len(targets) > 1 or targets[0].is_file():
+            self.parser.error("--watch requires a single package as target.")
+        if args.incremental is not None or args.format == rp.ReportFormat.NDJSON:
+            self.parser.error("--watch doesn't support --incremental nor ndjson.")
+        target: pathlib.Path = targets[0]
+        try:
+            with self._analyzer() as analyzer:
+                watch = wt.Watch(target, exclude=self._exclude(), analyzer=analyzer)
+                print(f"Watching {target}, press Ctrl+C to stop.", file=sys.stderr)
+                try:
+                    for package in watch:
+                        self._print_report(
+                            self._render(
+                                package.report(),
+                                fmt=args.format,
+                                grouped=args.grouped,
+                                percentage=args.percentage,
+                            )
+                        )
+                        self._write_profile()
+                        sys.stdout.flush()
+                finally:
+                    watch.close()
+        except KeyboardInterrupt:
+            pass
+
+    def _daemon_report(
+        self, argv: List[str]
+    ) -> Optional[Union[rp.SourceReportType, rp.PackageReportType]]:
+        """Obtains the report from the daemon, if it is running.
+
+        The runs which can't be answered by the daemon (with the incremental
+        or profile options, or reading the standard input) are run as usual.
+
+        Parameters
+        ----------
+        argv : List[str]
+            Arguments passed from the terminal.
+
+        Returns
+        -------
+        report : Optional[Union[rp.SourceReportType, rp.PackageReportType]]
+            None when the report must be generated on this process.
+        """
+        import reducto.daemon as dm
+
+        args: argparse.Namespace = self.args  # type: ignore[assignment]
+        if (
+            args.incremental is not None
+            or self.profile is not None
+            or STDIN_TARGET in args.target
+        ):
+            return None
+        try:
+            with dm.Client() as client:
+                report: Union[rp.SourceReportType, rp.PackageReportType] = client.query(
+                    "report", argv=argv, cwd=str(pathlib.Path.cwd())
+                )
+                return report
+        except dm.DaemonError:
+            # Not running, or the report failed there: the error (if any)
+            # is raised again by the report on this process.
+            return None
+
+    def daemon_report(
+        self, argv: List[str], cwd: pathlib.Path
+    ) -> Union[rp.SourceReportType, rp.PackageReportType]:
+        """Generates the report of a command line for a client of the daemon.
+
+        Parameters
+        ----------
+        argv : List[str]
+            Arguments passed from the terminal of the client.
+        cwd : pathlib.Path
+            Working directory of the client, the relative paths
+            are resolved from it.
+
+        Returns
+        -------
+        report : Union[rp.SourceReportType, rp.PackageReportType]
+        """
+        self._parse_args(argv)
+        args: argparse.Namespace = self.args  # type: ignore[assignment]
+        args.target = [cwd / target for target in args.target]
+        if args.manifest is not None:
+            args.manifest = cwd / args.manifest
+        elif len(args.target) == 0:
+            args.target = [cwd]
+        return self.report()
+
+    def _run_serve(self, argv: List[str]) -> None:
+        """Execute the serve subcommand.
+
+        Starts the daemon on the foreground, or stops it (--stop)
+        or prints its stats (--status) if running.
+
+        Parameters
+        ----------
+        argv : List[str]
+            Arguments passed from the terminal, after the subcommand.
+        """
+        import pprint
+        import reducto.daemon as dm
+
+        args = self.args = self.serve_parser.parse_args(argv)
+        try:
+            if args.stop or args.status:
+                with dm.Client(args.socket) as client:
+                    stats = client.query("ping")
+                    if args.stop:
+                        client.query("shutdown")
+                        print(f"Daemon stopped (pid {stats['pid']}).")
+                    else:
+                        pprint.pprint(stats)
+                return
+            daemon = dm.Daemon(workers=args.jobs)
+            print(
+                f"Listening on {args.socket or dm.socket_path()} (pid {os.getpid()}).",
+                file=sys.stderr,
+            )
+            daemon.serve(args.socket)
+        except dm.DaemonError as e:
+            self.serve_parser.error(str(e))
+
+
+def read_manifest(path: pathlib.Path) -> List[pathlib.Path]:
+    """Reads the targets listed in a manifest file.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        File with a target per line. Empty lines and lines starting
+        with # are ignored.
+
+    Returns
+    -------
+    targets : List[pathlib.Path]
+        Relative paths are joined to the directory of the manifest.
+
+    Examples
+    --------
+    For a file services.txt containing:
+
+        # Services
+        billing/src/billing
+        /opt/shared/utils
+
+    >>> read_manifest(pathlib.Path("/repo/services.txt"))
+    [PosixPath('/repo/billing/src/billing'), PosixPath('/opt/shared/utils')]
+    """
+    targets: List[pathlib.Path] = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                targets.append(path.parent / line)
+    return targets
@@ -1,22 +1,26 @@
-"""Module storing the different reports presented by the package. """
+"""Module storing the different reports presented by the package."""
 
 from __future__ import annotations
 
-import pathlib
-from typing import Dict, Union, List, cast, Any
+from typing import (
+    Dict,
+    Union,
+    List,
+    Any,
+    Iterable,
+    Iterator,
+    Optional,
+    TextIO,
+    Tuple,
+)
 from enum import Enum
-import statistics
-
-try:
-    from tabulate import tabulate
-except ModuleNotFoundError:  # pragma: no cover, check for library installation
-    import warnings
-
-    warnings.warn(
-        "tabulate package is not installed and may raise errors if the format is called."
-    )
-    tabulate = None  # type: ignore[assignment]
+import contextlib
+import io
+import json
+import pathlib
+import sys
 
+from .metrics import FileMetrics, PackageTotals
 
 # This is done to avoid circular imports.
 from typing import TYPE_CHECKING
@@ -25,8 +29,6 @@ if TYPE_CHECKING:
     from .src import SourceFile  # pragma: no cover, only to avoid circular imports
     from .package import Package  # pragma: no cover, only to avoid circular imports
 
-import os
-
 
 # The values in GroupedReportType may be either str or int.
 # Due to mypy failure they are left to Any to avoid complains.
@@ -35,15 +37,32 @@ UnGroupedReportType = Dict[str, GroupedReportType]
 SourceReportType = Union[str, UnGroupedReportType]
 PackageReportType = Union[str, GroupedReportType, UnGroupedReportType]
 
+# Key of the summary in the reports of multiple targets.
+SUMMARY_KEY: str = "__summary__"
+
+# Columns of the package reports.
+PACKAGE_COLUMNS: List[str] = [
+    "lines",
+    "number_of_functions",
+    "source_lines",
+    "docstring_lines",
+    "comment_lines",
+    "blank_lines",
+    "average_function_length",
+    "source_files",
+]
+
 
 class ReportFormat(Enum):
     """Formats allowed for the reports.
 
-    JSON corresponds to the base dict format, the remaining
+    JSON corresponds to the base dict format, NDJSON writes a json
+    record per line as soon as each source file is analyzed, the remaining
     formats correspond to the ones defined in tabulate package.
     """
 
     JSON = "json"
+    NDJSON = "ndjson"
     # Tabulate formats:
     SIMPLE = "simple"
     PLAIN = "plain"
@@ -148,6 +167,11 @@ class SourceReport:
         ReportFormatError
             When the reporting required is not defined in ReportFormat enum.
         """
+        if fmt == ReportFormat.NDJSON:
+            stream = io.StringIO()
+            self.stream(stream, percentage=percentage)
+            return stream.getvalue()
+
         report_ = self._as_dict(percentage=percentage)
 
         if fmt == ReportFormat.JSON:
@@ -178,37 +202,37 @@ class SourceReport:
         -------
         dict_report : ReportDict
         """
-        # Check whether any function was found
-        if len(self.source_file.functions) == 0:
-            avg_func_length: int = 0
-        else:
-            avg_func_length = round(
-                statistics.mean([f.source_lines for f in self.source_file.functions])
+        return {
+            self.source_file.name: metrics_as_dict(
+                self.source_file.metrics, percentage=percentage
             )
-
-        docstring_lines = self.source_file.total_docstrings
-        comment_lines = self.source_file.comment_lines
-        blank_lines = self.source_file.blank_lines
-        source_lines = self.source_file.source_lines
-        lines = len(self.source_file)
-
-        if percentage:
-            docstring_lines = str(round(docstring_lines / lines * 100)) + "%"  # type: ignore[assignment]
-            comment_lines = str(round(comment_lines / lines * 100)) + "%"  # type: ignore[assignment]
-            blank_lines = str(round(blank_lines / lines * 100)) + "%"  # type: ignore[assignment]
-            source_lines = str(round(source_lines / lines * 100)) + "%"  # type: ignore[assignment]
-
-        data: Dict[str, Union[int, str]] = {
-            "lines": lines,
-            "number_of_functions": len(self.source_file.functions),
-            "average_function_length": round(avg_func_length),
-            "docstring_lines": docstring_lines,
-            "comment_lines": comment_lines,
-            "blank_lines": blank_lines,
-            "source_lines": source_lines,
         }
 
-        return {self.source_file.name: data}
+    def stream(self, fp: TextIO, percentage: bool = False) -> PackageTotals:
+        """Writes the report of the file with the ndjson format.
+
+        Writes the record of the file followed by the summary record.
+
+        Parameters
+        ----------
+        fp : TextIO
+            Text stream to write the records.
+        percentage : bool
+            Whether to report the lines as percentage or not. Defaults to False
+
+        Returns
+        -------
+        totals : PackageTotals
+            Totals of the records written.
+
+        See Also
+        --------
+        write_ndjson
+        """
+        metrics = self.source_file.metrics
+        return write_ndjson(
+            fp, metrics.name, [(metrics.name, metrics)], percentage=percentage
+        )
 
     def _table(
         self, report: GroupedReportType, fmt: str = "grid"
@@ -247,16 +271,7 @@ class PackageReport:
             Package containing the data to be reported
         """
         self._package: Package = package
-        self.columns: List[str] = [
-            "lines",
-            "number_of_functions",
-            "source_lines",
-            "docstring_lines",
-            "comment_lines",
-            "blank_lines",
-            "average_function_length",
-            "source_files",
-        ]
+        self.columns: List[str] = PACKAGE_COLUMNS.copy()
 
     def __repr__(self) -> str:
         return type(self).__name__ + f"({self.package.name})"
@@ -308,10 +323,15 @@ class PackageReport:
         ReportFormatError
             When a report format is not defined
         """
+        if fmt == ReportFormat.NDJSON:
+            stream = io.StringIO()
+            self.stream(stream, percentage=percentage)
+            return stream.getvalue()
+
         if grouped:
-            report: Union[
-                GroupedReportType, UnGroupedReportType
-            ] = self._report_grouped(percentage=percentage)
+            report: Union[GroupedReportType, UnGroupedReportType] = (
+                self._report_grouped(percentage=percentage)
+            )
         else:
             report = self._report_ungrouped(percentage=percentage)
 
@@ -337,47 +357,12 @@ class PackageReport:
         report : ReportDict
             Dict ordered as: {package_name: {source_file_report}}.
         """
-        report_ungrouped: UnGroupedReportType = self._report_ungrouped()
-        package_lines: int = len(self.package)
-
-        lines: int = 0
-        number_of_functions: int = 0
-        average_function_length: int = 0
-        docstring_lines: Union[int, str] = 0
-        comment_lines: Union[int, str] = 0
-        blank_lines: Union[int, str] = 0
-        source_lines: Union[int, str] = 0
-
-        for reporting in report_ungrouped[self.package.name].values():
-            lines += cast(int, reporting["lines"])
-            number_of_functions += cast(int, reporting["number_of_functions"])
-            # Weight for the average function length across the whole package.
-            weight: float = cast(int, reporting["lines"]) / package_lines
-            average_function_length += reporting["average_function_length"] * weight
-            docstring_lines += reporting["docstring_lines"]
-            comment_lines += reporting["comment_lines"]
-            blank_lines += reporting["blank_lines"]
-            source_lines += reporting["source_lines"]
-
-        if percentage:
-            docstring_lines = str(round(docstring_lines / lines * 100)) + "%"  # type: ignore[operator]
-            comment_lines = str(round(comment_lines / lines * 100)) + "%"  # type: ignore[operator]
-            blank_lines = str(round(blank_lines / lines * 100)) + "%"  # type: ignore[operator]
-            source_lines = str(round(source_lines / lines * 100)) + "%"  # type: ignore[operator]
-
-        report_grouped: Dict[str, Union[int, str]] = {
-            "lines": lines,
-            "number_of_functions": number_of_functions,
-            "average_function_length": round(average_function_length),
-            "docstring_lines": docstring_lines,
-            "comment_lines": comment_lines,
-            "blank_lines": blank_lines,
-            "source_files": len(self.package.source_files),
-            "source_lines": source_lines,
+        return {
+            self.package.name: totals_as_dict(
+                self.package.totals, percentage=percentage
+            )
         }
 
-        return {self.package.name: report_grouped}
-
     def _report_ungrouped(self, percentage: bool = False) -> UnGroupedReportType:
         """Obtain the reporting information per source file.
 
@@ -400,15 +385,42 @@ class PackageReport:
             }
         """
         report: GroupedReportType = {}
-        for file in self.package.source_files:
-            report[self._get_relname(str(file))] = SourceReport(file).report(
-                fmt=ReportFormat.JSON, percentage=percentage
-            )[
-                file.name  # type: ignore[index]
-            ]
+        for metrics in self.package.store:
+            report[self._get_relname(metrics.path)] = metrics_as_dict(
+                metrics, percentage=percentage
+            )
 
         return {self.package.name: report}
 
+    def stream(self, fp: TextIO, percentage: bool = False) -> PackageTotals:
+        """Writes the report of the package with the ndjson format.
+
+        Each record is written as soon as the source file is analyzed,
+        followed by the summary record of the package, so the report of
+        the whole package is never held in memory.
+
+        Parameters
+        ----------
+        fp : TextIO
+            Text stream to write the records.
+        percentage : bool
+            Whether to report the lines as percentage or not. Defaults to False
+
+        Returns
+        -------
+        totals : PackageTotals
+            Totals of the records written.
+
+        See Also
+        --------
+        write_ndjson
+        """
+        records = (
+            (self._get_relname(metrics.path), metrics)
+            for metrics in self.package.iter_metrics()
+        )
+        return write_ndjson(fp, self.package.name, records, percentage=percentage)
+
     def _get_relname(self, file: str) -> str:
         """Obtain the relative name of a file in the package.
 
@@ -422,16 +434,11 @@ class PackageReport:
         relname : str
             Relative path of the file starting on the package.
 
-        Examples
+        See Also
         --------
-        For a given __init__.py file at the top of a package
-        named my_package:
-
-        >>> package_report._package_relname('__init__.py')
-        'my_package/__init__.py'
+        reducto.package.Package.relname
         """
-        relname: str = os.path.relpath(file, start=self.package.path)
-        return str(pathlib.Path(self.package.name) / relname)
+        return self.package.relname(file)
 
     def _table(
         self,
@@ -445,6 +452,244 @@ class PackageReport:
         )
 
 
+def as_percentage(value: int, lines: int) -> str:
+    """Formats a number of lines as a percentage of the total lines.
+
+    Parameters
+    ----------
+    value : int
+        Number of lines.
+    lines : int
+        Total number of lines, a file without lines is reported as 0%.
+
+    Returns
+    -------
+    percentage : str
+
+    Examples
+    --------
+    >>> as_percentage(29, 128)
+    '23%'
+    """
+    if lines == 0:
+        return "0%"
+    return str(round(value / lines * 100)) + "%"
+
+
+def metrics_as_dict(
+    metrics: FileMetrics, percentage: bool = False
+) -> Dict[str, Union[int, str]]:
+    """Report of the metrics of a source file with a dict format.
+
+    The reporting contains the following data: lines (total lines of
+    the file), number of functions, average function length, docstring
+    lines, comment lines, blank lines and source lines.
+
+    Parameters
+    ----------
+    metrics : FileMetrics
+        Metrics computed for a source file.
+    percentage : bool
+        Whether to report the lines as percentage or not. Defaults to False
+
+    Returns
+    -------
+    data : Dict[str, Union[int, str]]
+    """
+    docstring_lines = metrics.docstrings
+    comment_lines = metrics.comment_lines
+    blank_lines = metrics.blank_lines
+    source_lines = metrics.source_lines
+    lines = metrics.lines
+
+    if percentage:
+        docstring_lines = as_percentage(docstring_lines, lines)  # type: ignore[assignment]
+        comment_lines = as_percentage(comment_lines, lines)  # type: ignore[assignment]
+        blank_lines = as_percentage(blank_lines, lines)  # type: ignore[assignment]
+        source_lines = as_percentage(source_lines, lines)  # type: ignore[assignment]
+
+    data: Dict[str, Union[int, str]] = {
+        "lines": lines,
+        "number_of_functions": metrics.number_of_functions,
+        "average_function_length": metrics.average_function_length,
+        "docstring_lines": docstring_lines,
+        "comment_lines": comment_lines,
+        "blank_lines": blank_lines,
+        "source_lines": source_lines,
+    }
+
+    return data
+
+
+def totals_as_dict(
+    totals: PackageTotals, percentage: bool = False
+) -> Dict[str, Union[int, str]]:
+    """Report of the totals of a package with a dict format.
+
+    Parameters
+    ----------
+    totals : PackageTotals
+        Totals of the metrics of the source files of a package.
+    percentage : bool
+        Whether to report the lines as percentage or not. Defaults to False
+
+    Returns
+    -------
+    data : Dict[str, Union[int, str]]
+    """
+    lines: int = totals.lines
+    docstring_lines: Union[int, str] = totals.docstrings
+    comment_lines: Union[int, str] = totals.comment_lines
+    blank_lines: Union[int, str] = totals.blank_lines
+    source_lines: Union[int, str] = totals.source_lines
+
+    if percentage:
+        docstring_lines = as_percentage(totals.docstrings, lines)
+        comment_lines = as_percentage(totals.comment_lines, lines)
+        blank_lines = as_percentage(totals.blank_lines, lines)
+        source_lines = as_percentage(totals.source_lines, lines)
+
+    data: Dict[str, Union[int, str]] = {
+        "lines": lines,
+        "number_of_functions": totals.number_of_functions,
+        "average_function_length": totals.average_function_length,
+        "docstring_lines": docstring_lines,
+        "comment_lines": comment_lines,
+        "blank_lines": blank_lines,
+        "source_files": totals.source_files,
+        "source_lines": source_lines,
+    }
+
+    return data
+
+
+def write_ndjson(
+    fp: TextIO,
+    name: str,
+    records: Iterable[Tuple[str, FileMetrics]],
+    percentage: bool = False,
+) -> PackageTotals:
+    """Writes a report with a json record per line.
+
+    Every source file is written in a line as soon as it is obtained,
+    with a type "file" and its name. The last line contains the summary
+    of the files written, with type "summary" and the name of the package.
+
+    Parameters
+    ----------
+    fp : TextIO
+        Text stream to write the records.
+    name : str
+        Name of the package (or file) for the summary.
+    records : Iterable[Tuple[str, FileMetrics]]
+        Name to report each source file along its metrics.
+    percentage : bool
+        Whether to report the lines as percentage or not. Defaults to False
+
+    Returns
+    -------
+    totals : PackageTotals
+        Totals of the records written.
+
+    Examples
+    --------
+    The lines written look like:
+
+    {"type": "file", "name": "reducto/cli.py", "lines": 20, ...}
+    {"type": "file", "name": "reducto/src.py", "lines": 561, ...}
+    {"type": "summary", "name": "reducto", "lines": 581, ..., "source_files": 2}
+    """
+    totals = PackageTotals()
+    for filename, metrics in records:
+        record: Dict[str, Any] = {"type": "file", "name": filename}
+        record.update(metrics_as_dict(metrics, percentage=percentage))
+        fp.write(json.dumps(record) + "\n")
+        totals = totals.add(metrics)
+
+    write_summary(fp, name, totals, percentage=percentage)
+    return totals
+
+
+def write_summary(
+    fp: TextIO, name: str, totals: PackageTotals, percentage: bool = False
+) -> None:
+    """Writes the summary record of a ndjson report.
+
+    Parameters
+    ----------
+    fp : TextIO
+        Text stream to write the record.
+    name : str
+        Name of the package, or SUMMARY_KEY for the summary of
+        multiple targets.
+    totals : PackageTotals
+    percentage : bool
+        Whether to report the lines as percentage or not. Defaults to False
+    """
+    summary: Dict[str, Any] = {"type": "summary", "name": name}
+    summary.update(totals_as_dict(totals, percentage=percentage))
+    fp.write(json.dumps(summary) + "\n")
+
+
+# Compressions allowed for the streamed reports, by extension.
+COMPRESSIONS: Dict[str, str] = {".gz": "gzip", ".xz": "xz"}
+
+
+@contextlib.contextmanager
+def open_report_stream(
+    output: Optional[pathlib.Path] = None, compression: Optional[str] = None
+) -> Iterator[TextIO]:
+    """Opens a text stream to write a report.
+
+    Parameters
+    ----------
+    output : Optional[pathlib.Path]
+        File to write the report. Defaults to None, the standard output.
+    compression : Optional[str]
+        Either gzip or xz. Defaults to None, inferred from the extension
+        of the output (.gz or .xz), or uncompressed.
+
+    Yields
+    ------
+    stream : TextIO
+        Closed on exit, unless it is the standard output.
+
+    Raises
+    ------
+    ValueError
+        If the compression is not one of gzip or xz.
+
+    Examples
+    --------
+    >>> with open_report_stream(pathlib.Path("report.ndjson.gz")) as fp:
+    ...     package.report().stream(fp)
+    """
+    if compression is None and output is not None:
+        compression = COMPRESSIONS.get(output.suffix)
+    if compression is not None and compression not in COMPRESSIONS.values():
+        raise ValueError(f"Compression not allowed: {compression}.")
+
+    if compression is None and output is None:
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+
+    fileobj: Any = sys.stdout.buffer if output is None else output
+    if compression == "gzip":
+        import gzip
+
+        stream: TextIO = gzip.open(fileobj, "wt")
+    elif compression == "xz":
+        import lzma
+
+        stream = lzma.open(fileobj, "wt")
+    else:
+        stream = open(fileobj, "w")
+
+    with stream:
+        yield stream
+
+
 def tabulate_report(
     name: str,
     report: Union[GroupedReportType, UnGroupedReportType],
@@ -495,7 +740,11 @@ def tabulate_report(
             rows.append(row)
         table.extend(rows)
 
-    return tabulate(table, headers=headers, tablefmt=fmt)
+    # Imported here, the json formats don't need it.
+    from tabulate import tabulate
+
+    rendered: str = tabulate(table, headers=headers, tablefmt=fmt)
+    return rendered
 
 
 def column_split(columns: List[str], fmt: str = "rst") -> List[str]:
@@ -0,0 +1,221 @@
+"""Module containing the sharding of a package, to split a run across jobs.
+
+``reducto --shard i/N`` analyzes only the i-th of N subsets of the source
+files of a package. Every shard sees the same files (the same checkout),
+so the subsets are disjoint and cover the whole package without any
+coordination between the jobs.
+
+The files are spread by size: the largest files are placed first, each one
+on the shard with the fewest bytes so far, and the files of the same size
+are ordered by the hash of their path relative to the package. The subsets
+don't depend on the location of the package nor on the order of the walk.
+They do depend on the whole set of files and their sizes: adding, removing
+or resizing a single file can move other files between shards, so the jobs
+of a run must share the same checkout, and the subsets of different commits
+aren't comparable.
+
+The json report of a shard is identified under SHARD_KEY, and carries the
+accumulators of its files (see reducto.merge), so the reports of every shard
+can be combined without analyzing again.
+"""
+
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+import hashlib
+import heapq
+import os
+
+import reducto.merge as mg
+
+# Key of the report under which the shard and its totals are stored.
+SHARD_KEY: str = "__shard__"
+
+
+class ShardError(Exception):
+    """Error raised when the reports of the shards can't be combined."""
+
+    pass
+
+
+class Shard(NamedTuple):
+    """Subset of the source files of a package, the number-th of total."""
+
+    number: int
+    total: int
+
+    def __str__(self) -> str:
+        return f"{self.number}/{self.total}"
+
+    @classmethod
+    def parse(cls, text: str) -> "Shard":
+        """Reads a shard written as i/N, with 1 <= i <= N.
+
+        Parameters
+        ----------
+        text : str
+
+        Returns
+        -------
+        shard : Shard
+
+        Raises
+        ------
+        ValueError
+            If the text isn't a valid shard.
+        """
+        number, sep, total = text.partition("/")
+        shard = cls(int(number), int(total)) if sep else None
+        if shard is None or not 1 <= shard.number <= shard.total:
+            raise ValueError(f"Invalid shard {text!r}, expected i/N with 1 <= i <= N.")
+        return shard
+
+
+def path_hash(relname: str) -> int:
+    """Stable hash of the path of a file relative to the package.
+
+    Parameters
+    ----------
+    relname : str
+        Relative path, with / as separator.
+
+    Returns
+    -------
+    hash : int
+    """
+    return int.from_bytes(
+        hashlib.blake2b(relname.encode(), digest_size=8).digest(), "big"
+    )
+
+
+def partition(files: Sequence[Tuple[str, int]], count: int) -> List[int]:
+    """Spreads the files in shards with a similar size.
+
+    Parameters
+    ----------
+    files : Sequence[Tuple[str, int]]
+        Relative path and size of each file.
+    count : int
+        Number of shards.
+
+    Returns
+    -------
+    shards : List[int]
+        Index of the shard (from 0) of each file, in the same order.
+
+    Notes
+    -----
+    The files are balanced greedily (longest processing time first), so the
+    shard of a file depends on every other file: a change in the set of files
+    may reassign files which didn't change.
+    """
+    order: List[int] = sorted(
+        range(len(files)), key=lambda i: (-files[i][1], path_hash(files[i][0]))
+    )
+    # Size of each shard so far, along its index.
+    loads: List[Tuple[int, int]] = [(0, shard) for shard in range(count)]
+    shards: List[int] = [0] * len(files)
+    for i in order:
+        load, shard = heapq.heappop(loads)
+        shards[i] = shard
+        heapq.heappush(loads, (load + files[i][1], shard))
+    return shards
+
+
+def select(paths: Sequence[str], root: str, shard: Shard) -> List[str]:
+    """Obtain the source files of a package which belong to a shard.
+
+    Parameters
+    ----------
+    paths : Sequence[str]
+        Full paths of every source file of the package.
+    root : str
+        Directory of the package.
+    shard : Shard
+
+    Returns
+    -------
+    paths : List[str]
+        Paths of the shard, in the same order.
+    """
+    files: List[Tuple[str, int]] = []
+    for path in paths:
+        try:
+            size: int = os.stat(path).st_size
+        except OSError:  # Removed while walking, reported as an error later.
+            size = 0
+        relname: str = os.path.relpath(path, start=root).replace(os.sep, "/")
+        files.append((relname, size))
+    shards: List[int] = partition(files, shard.total)
+    return [path for path, i in zip(paths, shards) if i == shard.number - 1]
+
+
+def shard_as_dict(shard: Shard, name: str) -> Dict[str, str]:
+    """Information of a shard stored along its json report.
+
+    Parameters
+    ----------
+    shard : Shard
+    name : str
+        Name of the package.
+
+    Returns
+    -------
+    data : Dict[str, str]
+    """
+    return {"shard": str(shard), "package": name}
+
+
+def combine(reports: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combines the json reports of every shard of a package.
+
+    Parameters
+    ----------
+    reports : Iterable[Dict[str, Any]]
+        Report of each shard.
+
+    Returns
+    -------
+    report : Dict[str, Any]
+        Report of the whole package, as if it was run without shards
+        (along with its accumulators).
+
+    Raises
+    ------
+    ShardError
+        If a report has no shard, or the shards don't cover the package
+        exactly once.
+
+    See Also
+    --------
+    reducto.merge.Merge
+    """
+    # Package and number of shards of the run.
+    run: Optional[Tuple[str, int]] = None
+    seen: Set[int] = set()
+    merger = mg.Merge()
+    for report in reports:
+        data: Optional[Dict[str, Any]] = report.get(SHARD_KEY)
+        if data is None:
+            raise ShardError("The report wasn't generated with --shard.")
+        shard: Shard = Shard.parse(data["shard"])
+        if run is None:
+            run = (data["package"], shard.total)
+        elif (data["package"], shard.total) != run:
+            raise ShardError("The reports belong to different runs.")
+        if shard.number in seen:
+            raise ShardError(f"Shard {shard} is repeated.")
+        seen.add(shard.number)
+        try:
+            merger.add(report)
+        except mg.MergeError as e:
+            raise ShardError(str(e)) from e
+
+    if run is None:
+        raise ShardError("No reports to combine.")
+    missing: List[str] = [
+        str(Shard(number, run[1]))
+        for number in range(1, run[1] + 1)
+        if number not in seen
+    ]
+    if missing:
+        raise ShardError(f"Missing shards: {', '.join(missing)}.")
+    return merger.report()
@@ -10,17 +10,47 @@ References
 - https://kamneemaran45.medium.com/python-ast-5789a1b60300
 """
 
-from typing import List, Optional, Dict
+from typing import (
+    Callable,
+    List,
+    Optional,
+    Dict,
+    Iterable,
+    Iterator,
+    Tuple,
+    Union,
+)
 import ast
+import io
+import itertools
+import mmap
+import os
+import re
 import tokenize
 import pathlib
-from bisect import bisect_left
 
 import reducto.items as it
+import reducto.metrics as mt
+import reducto.exclude as ex
+import reducto.profile as pf
 import reducto.reports as rp
 
 NL_CHAR: str = "\n"  # New line character
 COMMENT_CHAR: str = "#"  # Comment character
+# Content of a blank line, with any of the line endings.
+BLANK_LINES: Tuple[str, ...] = (NL_CHAR, "\r\n", "\r")
+# Files of at least this size (in bytes) are memory mapped instead of read.
+MMAP_THRESHOLD: int = 256 * 1024
+# Encoding declaration, only valid on the first two lines (PEP 263).
+CODING_COOKIE = re.compile(rb"^[ \t\f]*#.*?coding[:=]")
+UTF8_BOM: bytes = b"\xef\xbb\xbf"
+# Carriage return which isn't part of a windows line ending.
+LONE_CR = re.compile(rb"\r(?!\n)")
+
+# Raw content of a source file.
+Buffer = Union[bytes, mmap.mmap]
+# Name of the sources given without a name, as with compile.
+SOURCE_NAME: str = "<string>.py"
 
 
 class SourceFileError(Exception):
@@ -33,14 +63,38 @@ class SourceFile:
     """Class representing a .py source file.
 
     Allows to read a file, obtain the tokens and the ast.
+    In lean mode the lines, ast and functions are released once the
+    metrics are computed, only the metrics are kept in memory.
     """
 
-    def __init__(self, filename: pathlib.Path) -> None:
+    def __init__(
+        self,
+        filename: pathlib.Path,
+        lean: bool = False,
+        exclude: Optional[ex.Exclude] = None,
+        profile: Optional[pf.Profile] = None,
+        source: Optional[Buffer] = None,
+        metrics: Optional[mt.FileMetrics] = None,
+    ) -> None:
         """
         Parameters
         ----------
         filename : pathlib.Path
             Full name of the file.
+        lean : bool
+            Release the content of the file once the metrics are computed.
+            Defaults to False.
+        exclude : Optional[ex.Exclude]
+            Functions to exclude from the metrics. Defaults to None.
+        profile : Optional[pf.Profile]
+            Records the time spent on each phase of the analysis.
+            Defaults to None, the analysis isn't timed.
+        source : Optional[Buffer]
+            Raw content of the file, like a blob read from git. The file
+            doesn't need to exist then. Defaults to None, read from filename.
+        metrics : Optional[mt.FileMetrics]
+            Metrics already computed for the file, like those kept by an
+            analyzer, the file isn't analyzed to obtain them. Defaults to None.
 
         Raises
         ------
@@ -48,9 +102,18 @@ class SourceFile:
             If the file doesn't exists.
         """
 
-        self.validate(filename)
+        if source is None:
+            self.validate(filename)
+        elif not filename.name.endswith(".py"):
+            raise SourceFileError(f"{filename} is not a valid python file.")
 
         self._filename: pathlib.Path = filename
+        self._lean: bool = lean
+        self._exclude: Optional[ex.Exclude] = exclude
+        self._profile: Optional[pf.Profile] = profile
+        self._content: Optional[Buffer] = source
+        self._source: Optional[Buffer] = None
+        self._line_count: Optional[int] = None
         self._lines: Optional[List[str]] = None
         self._ast: Optional[ast.Module] = None
         self._tokens: Optional[List[tokenize.TokenInfo]] = None
@@ -59,6 +122,68 @@ class SourceFile:
         self._comment_lines: int = 0
         self._comment_lines_positions: Optional[List[int]] = None
         self._source_visitor: Optional[SourceVisitor] = None
+        self._metrics: Optional[mt.FileMetrics] = None
+        if metrics is not None:
+            self._metrics = metrics if exclude is None else exclude.filter(metrics)
+
+    @classmethod
+    def from_source(
+        cls,
+        source: Union[str, Buffer],
+        name: str = SOURCE_NAME,
+        lean: bool = False,
+        exclude: Optional[ex.Exclude] = None,
+        profile: Optional[pf.Profile] = None,
+        metrics: Optional[mt.FileMetrics] = None,
+    ) -> "SourceFile":
+        """Creates a source file from a content held in memory.
+
+        Nothing is read from the file system, like the buffer of an editor
+        or generated code.
+
+        Parameters
+        ----------
+        source : Union[str, Buffer]
+            Content of the file, either decoded or raw.
+            Decoded contents are encoded as in their encoding declaration
+            (see encode_source).
+        name : str
+            Name reported for the file, must end with .py.
+            Defaults to SOURCE_NAME.
+        lean : bool
+            Release the content once the metrics are computed. Defaults to False.
+        exclude : Optional[ex.Exclude]
+            Functions to exclude from the metrics. Defaults to None.
+        profile : Optional[pf.Profile]
+            Records the time spent on each phase of the analysis.
+            Defaults to None.
+        metrics : Optional[mt.FileMetrics]
+            Metrics already computed for the content. Defaults to None.
+
+        Returns
+        -------
+        source_file : SourceFile
+
+        Raises
+        ------
+        SourceFileError
+            If the name isn't the name of a python file.
+
+        Examples
+        --------
+        >>> SourceFile.from_source("def foo():\n    return 1\n", name="foo.py").metrics.lines
+        2
+        """
+        if isinstance(source, str):
+            source = encode_source(source)
+        return cls(
+            pathlib.Path(name),
+            lean=lean,
+            exclude=exclude,
+            profile=profile,
+            source=source,
+            metrics=metrics,
+        )
 
     def __repr__(self) -> str:
         return type(self).__name__ + f"({self._filename.name})"
@@ -68,7 +193,7 @@ class SourceFile:
 
     def __len__(self) -> int:
         """Return the total number of lines in the file."""
-        return len(self.lines)
+        return self.metrics.lines
 
     @staticmethod
     def validate(path: pathlib.Path) -> None:
@@ -106,27 +231,102 @@ class SourceFile:
         """
         return self._filename.name
 
+    @property
+    def path(self) -> pathlib.Path:
+        """Returns the full path of the file.
+
+        Returns
+        -------
+        path : pathlib.Path
+        """
+        return self._filename
+
+    @property
+    def source(self) -> Buffer:
+        """Raw content of the file, read once.
+
+        The same buffer is parsed and tokenized. Files of at least
+        MMAP_THRESHOLD bytes are memory mapped. The line endings made of
+        a lone carriage return are translated (see normalize_newlines).
+
+        Returns
+        -------
+        source : Buffer
+
+        See Also
+        --------
+        read_source
+        """
+        if self._source is None:
+            source: Buffer
+            if self._content is not None:
+                source = self._content
+            elif self._profile is None:
+                source = read_source(self._filename)
+            else:
+                source = self._profile.call(
+                    "read", str(self._filename), read_source, self._filename
+                )
+            self._source = normalize_newlines(source)
+            if self._source is not source and source is not self._content:
+                if isinstance(source, mmap.mmap):
+                    source.close()
+        return self._source
+
+    @property
+    def encoding(self) -> str:
+        """Encoding of the file.
+
+        UTF-8 unless the file starts with a BOM or declares its encoding.
+
+        Returns
+        -------
+        encoding : str
+        """
+        if is_plain_utf8(self.source):
+            return "utf-8"
+        encoding, _ = tokenize.detect_encoding(self._readline())
+        return encoding
+
+    def _readline(self) -> Callable[[], bytes]:
+        """Returns a readline function over the buffer, from the start."""
+        source: Buffer = self.source
+        if isinstance(source, mmap.mmap):
+            source.seek(0)
+            return source.readline
+        # Shares the buffer of the bytes, no copy is made.
+        return io.BytesIO(source).readline
+
     def _read_file_by_lines(self) -> List[str]:
-        """Read a file using tokenize.open and return the lines.
+        """Decodes the content of the file and return the lines.
+
+        The line endings are translated to new line characters,
+        like a file opened with tokenize.open.
 
         Returns
         -------
         lines : List[str]
             Returns the lines as a list of str.
         """
-        with tokenize.open(str(self._filename)) as fd:
+        with io.TextIOWrapper(io.BytesIO(self.source), encoding=self.encoding) as fd:
             return fd.readlines()
 
     @property
     def lines(self) -> List[str]:
-        """Contains the lines of the file as initially parsed with tokenize module."""
+        """Contains the lines of the file decoded, as with the tokenize module.
+
+        Not needed to compute the metrics, the content is parsed and
+        tokenized from the raw buffer.
+        """
         if self._lines is None:
             self._lines = self._read_file_by_lines()
         return self._lines
 
     @property
     def ast(self) -> ast.Module:
-        """Parses and returns the ast of a file from the lines read with tokenize module.
+        """Parses and returns the ast of a file from its raw content.
+
+        The parser decodes the content itself (encoding declarations included).
 
         Returns
         -------
@@ -134,7 +334,13 @@ class SourceFile:
             Abstract Syntax Tree module object.
         """
         if self._ast is None:
-            self._ast = ast.parse("".join(self.lines))
+            source: Buffer = self.source
+            if self._profile is None:
+                self._ast = ast.parse(source)
+            else:
+                self._ast = self._profile.call(
+                    "parse", str(self._filename), ast.parse, source
+                )
         return self._ast
 
     @property
@@ -146,11 +352,30 @@ class SourceFile:
         tokenize.generate_tokens
         """
         if self._tokens is None:
-            line_iter = iter(self.lines)
-            self._tokens = list(tokenize.generate_tokens(lambda: next(line_iter)))
+            self._tokens = list(self._generate_tokens())
 
         return self._tokens
 
+    def _generate_tokens(self) -> Iterator[tokenize.TokenInfo]:
+        """Generates the tokens of the file, without storing them.
+
+        The lines are read from the raw buffer and counted as they are
+        tokenized. Plain UTF-8 files are decoded directly, otherwise
+        the encoding is detected by tokenize (the ENCODING token is skipped).
+        """
+        readline: Callable[[], bytes] = self._readline()
+        self._line_count = 0
+
+        def counted_readline() -> bytes:
+            line: bytes = readline()
+            if line:
+                self._line_count += 1  # type: ignore[operator]
+            return line
+
+        if is_plain_utf8(self.source):
+            return tokenize.generate_tokens(lambda: counted_readline().decode("utf-8"))
+        return itertools.islice(tokenize.tokenize(counted_readline), 1, None)
+
     @property
     def comment_lines(self) -> int:
         """Returns the total number of lines which are comments.
@@ -163,9 +388,7 @@ class SourceFile:
         --------
         token_is_comment_line
         """
-        if self._comment_lines_positions is None:
-            self._comment_blank_lines_positions()
-        return self._comment_lines
+        return self.metrics.comment_lines
 
     @property
     def comment_lines_positions(self) -> List[int]:
@@ -194,9 +417,7 @@ class SourceFile:
         --------
         token_is_blank_line
         """
-        if self._blank_lines_positions is None:
-            self._comment_blank_lines_positions()  # pragma: no cover, call to a tested method.
-        return self._blank_lines
+        return self.metrics.blank_lines
 
     @property
     def blank_lines_positions(self) -> List[int]:
@@ -225,16 +446,31 @@ class SourceFile:
         token_is_comment_line
         token_is_blank_line
         """
-        self._comment_lines_positions = []
-        self._blank_lines_positions = []
-        for tok in self.tokens:
+        # The tokens are consumed as generated unless already stored.
+        tokens: Iterable[tokenize.TokenInfo] = (
+            self._tokens if self._tokens is not None else self._generate_tokens()
+        )
+        if self._profile is None:
+            self._register_tokens(tokens)
+        else:
+            self._profile.call(
+                "tokenize", str(self._filename), self._register_tokens, tokens
+            )
+
+    def _register_tokens(self, tokens: Iterable[tokenize.TokenInfo]) -> None:
+        """Registers the positions of the comment and blank lines."""
+        comment_lines: List[int] = []
+        blank_lines: List[int] = []
+        self._comment_lines_positions = comment_lines
+        self._blank_lines_positions = blank_lines
+        for tok in tokens:
             if token_is_comment_line(tok):
                 idx: int = tok.start[0]  # Get the line number.
-                self._comment_lines_positions.append(idx)
+                comment_lines.append(idx)
                 self._comment_lines += 1
             if token_is_blank_line(tok):
                 idx = tok.start[0]  # Get the line number.
-                self._blank_lines_positions.append(idx)
+                blank_lines.append(idx)
                 self._blank_lines += 1
 
     @property
@@ -269,14 +505,25 @@ class SourceFile:
         """
         tree: ast.Module = self.ast
         source_visitor = SourceVisitor()
-        source_visitor.visit(tree)
+        if self._profile is None:
+            source_visitor.visit(tree)
+        else:
+            self._profile.call("visit", str(self._filename), source_visitor.visit, tree)
 
         # Register comments and blank lines on the functions.
         content: Dict[str, List[int]] = {
             "comments": self.comment_lines_positions,
             "blank_lines": self.blank_lines_positions,
         }
-        source_visitor.register_functions(content)
+        if self._profile is None:
+            source_visitor.register_functions(content)
+        else:
+            self._profile.call(
+                "register",
+                str(self._filename),
+                source_visitor.register_functions,
+                content,
+            )
 
         return source_visitor
 
@@ -295,6 +542,35 @@ class SourceFile:
         """
         return self.source_visitor.functions
 
+    @property
+    def classes(self) -> List[it.ClassDef]:
+        """Returns the list of classes grabbed through the ast.
+
+        Returns
+        -------
+        classes : List[it.ClassDef]
+
+        See Also
+        --------
+        reducto.items.ClassDef
+        """
+        return self.source_visitor.classes
+
+    @property
+    def module(self) -> it.ModuleDef:
+        """Returns the lines at the module level, outside every function and class.
+
+        Returns
+        -------
+        module : it.ModuleDef
+            Contains the docstrings, comments and blank lines of the module.
+
+        See Also
+        --------
+        reducto.items.ModuleDef
+        """
+        return self.source_visitor.module
+
     @property
     def module_docstrings(self) -> int:
         """Obtains the lines of docstrings at the module level.
@@ -304,22 +580,20 @@ class SourceFile:
         docstrings : int
             Lines of docstrings in the module.
         """
-        return it.get_docstring_lines(self.ast)
+        return self.module.docstrings
 
     @property
     def total_docstrings(self) -> int:
         """Get the total number of docstring lines.
 
         The total number of docstrings are the module level docstrings
-        plus the ones recorded from the functions.
+        plus the ones recorded from the functions and classes.
 
         Returns
         -------
         total_docstrings : int
         """
-        module_docs: int = self.module_docstrings
-        funcs_docs: int = sum([f.docstrings for f in self.functions])
-        return module_docs + funcs_docs
+        return self.metrics.docstrings
 
     @property
     def source_lines(self) -> int:
@@ -332,7 +606,90 @@ class SourceFile:
             minus the docstrings, minus the comment lines and minus
             the blank lines.
         """
-        return len(self) - self.total_docstrings - self.comment_lines - self.blank_lines
+        return self.metrics.source_lines
+
+    @property
+    def metrics(self) -> mt.FileMetrics:
+        """Returns the metrics of the file detached from the ast and tokens.
+
+        Every metric is computed once, the first time it is required.
+        The remaining properties (lines, docstrings, comments...) read
+        their values from this record. In lean mode, the content of the
+        file is released afterwards.
+
+        Returns
+        -------
+        metrics : mt.FileMetrics
+
+        See Also
+        --------
+        reducto.metrics.FileMetrics
+        """
+        if self._metrics is None:
+            self._metrics = self._measure()
+            if self._exclude is not None:
+                self._metrics = self._exclude.filter(self._metrics)
+            if self._lean:
+                self.release()
+        return self._metrics
+
+    def release(self) -> None:
+        """Drops the lines, tokens, ast and functions of the file.
+
+        The metrics already computed are kept. Any of the released
+        attributes is obtained again from the file when accessed.
+        """
+        if isinstance(self._source, mmap.mmap) and self._source is not self._content:
+            self._source.close()
+        self._source = None
+        self._line_count = None
+        self._lines = None
+        self._ast = None
+        self._tokens = None
+        self._comment_lines_positions = None
+        self._blank_lines_positions = None
+        self._comment_lines = 0
+        self._blank_lines = 0
+        # The functions keep references to the nodes of the ast.
+        self._source_visitor = None
+
+    def _measure(self) -> mt.FileMetrics:
+        """Computes all the metrics of the file in a single pass.
+
+        The tokens are traversed once to obtain the comment and blank
+        lines, the ast is visited once to register the functions, and the
+        docstrings of the module and each function and class are obtained once.
+
+        Returns
+        -------
+        metrics : mt.FileMetrics
+        """
+        if self._comment_lines_positions is None:
+            self._comment_blank_lines_positions()
+        source_visitor: SourceVisitor = self.source_visitor
+        functions: Tuple[mt.FunctionMetrics, ...] = tuple(
+            func.metrics for func in source_visitor.functions
+        )
+
+        # Counted while the tokens were generated.
+        lines: int = self._line_count  # type: ignore[assignment]
+        docstrings: int = (
+            source_visitor.module.docstrings
+            + sum(func.docstrings for func in functions)
+            + sum(class_def.docstrings for class_def in source_visitor.classes)
+        )
+        comment_lines: int = self._comment_lines
+        blank_lines: int = self._blank_lines
+
+        return mt.FileMetrics(
+            path=str(self._filename),
+            lines=lines,
+            docstrings=docstrings,
+            comment_lines=comment_lines,
+            blank_lines=blank_lines,
+            source_lines=lines - docstrings - comment_lines - blank_lines,
+            functions=functions,
+        )
 
     def report(self) -> rp.SourceReport:
         """Obtain the reporter class.
@@ -396,28 +753,136 @@ def token_is_blank_line(tok: tokenize.TokenInfo) -> bool:
     >>> token_is_blank_line(tok)
     True
     """
-    return tok.type == tokenize.NL and tok.line == NL_CHAR
+    return tok.type == tokenize.NL and tok.line in BLANK_LINES
+
+
+def read_source(path: pathlib.Path) -> Buffer:
+    """Reads the raw content of a source file.
+
+    Files of at least MMAP_THRESHOLD bytes are memory mapped, so their
+    content is never copied to the heap.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+
+    Returns
+    -------
+    source : Buffer
+        Bytes of the file, or a read only memory map.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return f.read()
+
+
+def normalize_newlines(source: Buffer) -> Buffer:
+    """Translates the line endings when the source has lone carriage returns.
+
+    The buffer is read by lines split on new line characters, so the files
+    with old Mac line endings (or mixed ones) would be read as a single line.
+    Their line endings are translated to new lines, as with universal
+    newlines. Other sources (windows line endings included) are returned
+    as given, without copying them.
+
+    Parameters
+    ----------
+    source : Buffer
+
+    Returns
+    -------
+    source : Buffer
+
+    Examples
+    --------
+    >>> normalize_newlines(b"x = 1\ry = 2\r\n")
+    b'x = 1\ny = 2\n'
+    """
+    if source.find(b"\r") == -1 or LONE_CR.search(source) is None:
+        return source
+    return re.sub(rb"\r\n?", b"\n", source)
+
+
+def encode_source(text: str) -> bytes:
+    """Encodes a decoded source, as it would be written to a file.
+
+    UTF-8 unless the source declares another encoding (PEP 263),
+    so the parser and the tokenizer decode it back to the same text.
+
+    Parameters
+    ----------
+    text : str
+
+    Returns
+    -------
+    source : bytes
+
+    Raises
+    ------
+    UnicodeEncodeError
+        If the text can't be represented in the encoding declared.
+
+    Examples
+    --------
+    >>> encode_source("# -*- coding: latin-1 -*-\nname = 'ñ'\n")[-3:]
+    b"\xf1'\n"
+    """
+    source: bytes = text.encode("utf-8")
+    if is_plain_utf8(source):
+        return source
+    encoding, _ = tokenize.detect_encoding(io.BytesIO(source).readline)
+    if encoding in ("utf-8", "utf-8-sig"):
+        return source
+    return text.encode(encoding)
+
+
+def is_plain_utf8(source: Buffer) -> bool:
+    """Checks whether a source is UTF-8 without a BOM or an encoding declaration.
+
+    Only the first two lines are inspected, as in PEP 263.
+
+    Parameters
+    ----------
+    source : Buffer
+
+    Returns
+    -------
+    check : bool
+
+    Examples
+    --------
+    >>> is_plain_utf8(b"import os\n")
+    True
+    >>> is_plain_utf8(b"# -*- coding: latin-1 -*-\n")
+    False
+    """
+    if source[:3] == UTF8_BOM:
+        return False
+    first: int = source.find(b"\n")
+    second: int = source.find(b"\n", first + 1) if first != -1 else -1
+    head: bytes = source[: second if second != -1 else len(source)]
+    return not any(CODING_COOKIE.match(line) for line in head.split(b"\n"))
 
 
 class SourceVisitor(ast.NodeVisitor):
     """Class inheriting from ast.NodeVisitor.
 
     Defines the actions to be taken on the ast being parsed.
-    Obtains every FunctionDef in the source file, (included async ones)
-    and when a class is found, the corresponding methods are parsed
-    just like FunctionDef objects.
-    No other object is obtained from the SourceVisitor.
+    Obtains every FunctionDef in the source file, (included async ones),
+    every ClassDef and the functions and classes nested inside them,
+    recording the hierarchy and the qualified name of each item
+    (Class.method.<locals>.inner).
     Instantiates the corresponding items and registers the content, like
-    the number of lines and docstrings.
-
-        TODO:
-        - Añadir la distinción entre método y función (método nuevo en lugar
-        de generic_visit?)
+    the number of lines and docstrings. Each comment, blank and docstring
+    line is registered on the innermost item containing it, the lines
+    outside every item on the module.
 
     Notes
     -----
-    For the moment, no distinction is done between functions and definitions,
-    so between the items there will be only FunctionDef, no MethodDef items.
+    For the moment, no distinction is done between functions and methods,
+    so between the items there will be only FunctionDef and ClassDef,
+    no MethodDef items.
 
     See Also
     --------
@@ -426,47 +891,86 @@ class SourceVisitor(ast.NodeVisitor):
 
     def __init__(self) -> None:
         self._items: List[it.Item] = []
-        self._functions: List[it.FunctionDef] = []
+        self._functions: Optional[List[it.FunctionDef]] = None
+        self._classes: Optional[List[it.ClassDef]] = None
+        self._module: it.ModuleDef = it.ModuleDef()
+        self._parents: List[it.Item] = []
+        self._index: Optional[it.ItemIndex] = None
 
     def __repr__(self) -> str:
         return type(self).__name__
 
-    def visit_FunctionDef(self, node):
+    def visit_Module(self, node: ast.Module) -> ast.Module:
+        """Registers the module node, the module level lines are counted on it."""
+        self._module.node = node
+        self.generic_visit(node)
+        return node
+
+    def _visit_item(self, item: it.Item, node: ast.AST) -> None:
+        """Stores an item and visits the nodes defined inside it."""
+        item.node = node
+        if item.parent is not None:
+            item.parent.children.append(item)
+        self._items.append(item)
+        self._parents.append(item)
+        self.generic_visit(node)
+        self._parents.pop()
+
+    def _parent(self) -> Optional[it.Item]:
+        """Innermost item being visited, if any."""
+        return self._parents[-1] if len(self._parents) > 0 else None
+
+    def visit_FunctionDef(
+        self, node: Union[ast.FunctionDef, ast.AsyncFunctionDef]
+    ) -> Union[ast.FunctionDef, ast.AsyncFunctionDef]:
         """Visits the FunctionDef nodes.
 
         Creates and stores the corresponding item, along with the
-        name, start and end lines.
+        name, start and end lines, and visits the functions and
+        classes defined inside.
 
         Parameters
         ----------
-        node : ast.FunctionDef
+        node : Union[ast.FunctionDef, ast.AsyncFunctionDef]
             Node automatically filtered when visit method is called.
 
         Returns
         -------
-        node : ast.FunctionDef
+        node : Union[ast.FunctionDef, ast.AsyncFunctionDef]
             Returns the node itself.
 
         See Also
         --------
         reducto.items.FunctionDef
-
-        Notes
-        -----
-        Typing the argument raises mypy error.
         """
-        func_def = it.FunctionDef(node.name, start=node.lineno, end=node.end_lineno)
-        func_def.node = node
-        self._items.append(func_def)
+        parent: Optional[it.Item] = self._parent()
+        func_def = it.FunctionDef(
+            node.name,
+            start=node.lineno,
+            end=node.end_lineno,  # type: ignore[arg-type]
+            qualname=it.qualified_name(node.name, parent),
+            parent=parent,
+        )
+        self._visit_item(func_def, node)
         return node
 
     visit_AsyncFunctionDef = visit_FunctionDef
 
-    def visit_ClassDef(self, node: ast.ClassDef):
-        """Calls the general generic_visit method on itself, obtaining
-        the FunctionDef objects found.
+    def visit_ClassDef(self, node: ast.ClassDef) -> ast.ClassDef:
+        """Visits the ClassDef nodes.
+
+        Creates and stores the corresponding item, and visits the methods
+        and classes defined inside, obtaining the FunctionDef objects found.
         """
-        self.generic_visit(node)
+        parent: Optional[it.Item] = self._parent()
+        class_def = it.ClassDef(
+            node.name,
+            start=node.lineno,
+            end=node.end_lineno,  # type: ignore[arg-type]
+            qualname=it.qualified_name(node.name, parent),
+            parent=parent,
+        )
+        self._visit_item(class_def, node)
         return node
 
     @property
@@ -476,7 +980,8 @@ class SourceVisitor(ast.NodeVisitor):
         Returns
         -------
         items : List[it.Item]
-            Returns all the items found in the ast source.
+            Returns all the items found in the ast source, in the order
+            they are defined (a parent before its children).
 
         See Also
         --------
@@ -488,34 +993,74 @@ class SourceVisitor(ast.NodeVisitor):
     def functions(self) -> List[it.FunctionDef]:
         """Returns the items which are functions from the list of items obtained.
 
+        Contains the nested functions too.
         When the functions are retrieved, the docstrings are obtained registered.
 
         Returns
         -------
         functions : List[it.FunctionDef]
         """
-        if len(self._functions) == 0:
+        if self._functions is None:
             self._functions = [
                 item for item in self.items if isinstance(item, it.FunctionDef)
             ]
-            [func.get_docstrings() for func in self._functions]
+            for func in self._functions:
+                func.get_docstrings()
         return self._functions
 
+    @property
+    def classes(self) -> List[it.ClassDef]:
+        """Returns the items which are classes, with their docstrings registered.
+
+        Returns
+        -------
+        classes : List[it.ClassDef]
+        """
+        if self._classes is None:
+            self._classes = [
+                item for item in self.items if isinstance(item, it.ClassDef)
+            ]
+            for class_def in self._classes:
+                class_def.get_docstrings()
+        return self._classes
+
+    @property
+    def module(self) -> it.ModuleDef:
+        """Bucket of the lines outside every function and class.
+
+        Returns
+        -------
+        module : it.ModuleDef
+        """
+        if self._module.node is not None:
+            self._module.get_docstrings()
+        return self._module
+
+    @property
+    def index(self) -> it.ItemIndex:
+        """Interval index of the items, built once the source is visited.
+
+        Returns
+        -------
+        index : it.ItemIndex
+            Finds the innermost item containing a line, the module
+            for the lines outside every item.
+        """
+        if self._index is None:
+            self._index = it.ItemIndex(self.items, root=self.module)
+        return self._index
+
     def _register_elements(self, positions: List[int], attribute: str) -> None:
-        """Algorithm to insert the comments and blank lines on functions.
+        """Algorithm to insert the comments and blank lines on the items.
 
-        Algorithm to insert items on functions:
-            1) get position with bisect_left
-            idx = bisect_left(functions, comment_position[0]) - 1
-            2) See if the value is contained in the item (may be between functions)
-            comment_position[0] in functions[idx]
-            3) If found, register
-            functions[idx].comments +=1
+        Each line is registered on the innermost item containing it, or
+        on the module when outside every item. The lines are counted in
+        bulk per segment of the interval index and added at once.
 
         Parameters
         ----------
         positions : List[int]
-            List of ints representings the positions of the lines.
+            List of ints representings the positions of the lines, sorted.
         attribute : str
             Name of the attribute. May be one of comments or blank_lines.
             Must be an attribute of the corresponding items.
@@ -528,24 +1073,19 @@ class SourceVisitor(ast.NodeVisitor):
         Register those lines on the corresponding functions when corresponds:
 
         >>> visitor._register_elements(comment_positions, 'comments')
-        """
-        # Only check between the start of the first function
-        # and the end of the last function.
-        start: int = self.functions[0].start
-        end: int = self.functions[-1].end
 
-        for line in positions:
-            if start < line < end:  # Exclude exactly first and last.
-                idx: int = bisect_left(self.functions, line) - 1
-                function = self.functions[idx]
-                if line in function:
-                    value = getattr(function, attribute) + 1
-                    setattr(function, attribute, value)
+        See Also
+        --------
+        reducto.items.ItemIndex
+        """
+        for item, count in self.index.count(positions).items():
+            setattr(item, attribute, getattr(item, attribute) + count)
 
     def register_functions(self, content: Dict[str, List[int]]) -> None:
         """Register the contents grabbed as tokens outside the ast.
 
-        Inserts the positions of the comments and blank lines.
+        Inserts the positions of the comments and blank lines on the
+        functions, classes and the module.
 
         Parameters
         ----------
@@ -558,6 +1098,5 @@ class SourceVisitor(ast.NodeVisitor):
         >>> content = {'comments': [1, 4, 5, 6, 22], 'blank_lines': [12, 46]}
         >>> visitor.register_functions(content)
         """
-        if len(self.functions) > 0:  # Only run when at least one function was
-            for attribute, positions in content.items():
-                self._register_elements(positions, attribute)
+        for attribute, positions in content.items():
+            self._register_elements(positions, attribute)
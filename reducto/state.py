@@ -0,0 +1,171 @@
+"""Module containing the state of a package stored along its report.
+
+Reports generated in incremental mode carry the identity and the metrics
+of every source file, and the totals of the package. A later run reads
+the state of the previous report to analyze only the files which changed,
+and updates the totals with the differences instead of recomputing them.
+"""
+
+from typing import Any, Dict, Optional
+import json
+import pathlib
+
+import reducto.cache as ch
+import reducto.metrics as mt
+import reducto as rd
+
+# Key of the report under which the state is stored.
+STATE_KEY: str = "__reducto__"
+
+
+class PackageState:
+    """Identity and metrics of the source files of a package.
+
+    The files are stored by their relative name in the report, so the
+    state is independent of the location of the package.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        files: Optional[Dict[str, Dict[str, Any]]] = None,
+        totals: mt.PackageTotals = mt.PackageTotals(),
+    ) -> None:
+        """
+        Parameters
+        ----------
+        name : str
+            Name of the package.
+        files : Optional[Dict[str, Dict[str, Any]]]
+            Cache entries by relative name of the file. Defaults to None,
+            a package without files.
+        totals : mt.PackageTotals
+            Totals of the metrics of the files.
+        """
+        self._name: str = name
+        self._files: Dict[str, Dict[str, Any]] = files if files is not None else {}
+        self._totals: mt.PackageTotals = totals
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self.name})"
+
+    @property
+    def name(self) -> str:
+        """Name of the package.
+
+        Returns
+        -------
+        name : str
+        """
+        return self._name
+
+    @property
+    def files(self) -> Dict[str, Dict[str, Any]]:
+        """Cache entries of the files, by relative name.
+
+        Returns
+        -------
+        files : Dict[str, Dict[str, Any]]
+        """
+        return self._files
+
+    @property
+    def totals(self) -> mt.PackageTotals:
+        """Totals of the package.
+
+        Returns
+        -------
+        totals : mt.PackageTotals
+        """
+        return self._totals
+
+    def cache(self, root: pathlib.Path) -> ch.MemoryCache:
+        """Cache containing the entries of the state.
+
+        Parameters
+        ----------
+        root : pathlib.Path
+            Directory containing the package. The relative names are
+            joined to it to obtain the path of the files.
+
+        Returns
+        -------
+        cache : ch.MemoryCache
+        """
+        entries: Dict[str, Dict[str, Any]] = {}
+        for relname, entry in self.files.items():
+            path = str(root / relname)
+            entries[path] = dict(
+                entry, path=path, metrics=entry["metrics"]._replace(path=path)
+            )
+        return ch.MemoryCache(entries)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Returns the state with the format stored in the report.
+
+        Returns
+        -------
+        state : Dict[str, Any]
+        """
+        return {
+            "version": rd.__version__,
+            "metrics_version": mt.METRICS_VERSION,
+            "package": self.name,
+            "totals": self.totals._asdict(),
+            "files": self.files,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Optional["PackageState"]:
+        """Reads the state as stored in a report.
+
+        Parameters
+        ----------
+        data : Dict[str, Any]
+            State as returned by as_dict.
+
+        Returns
+        -------
+        state : Optional[PackageState]
+            None if the state was generated by a different version.
+        """
+        if (data.get("version"), data.get("metrics_version")) != (
+            rd.__version__,
+            mt.METRICS_VERSION,
+        ):
+            return None
+
+        files: Dict[str, Dict[str, Any]] = {}
+        for relname, entry in data["files"].items():
+            files[relname] = dict(
+                entry, metrics=mt.FileMetrics.from_list(entry["metrics"])
+            )
+        return cls(data["package"], files, mt.PackageTotals(**data["totals"]))
+
+    @classmethod
+    def load(cls, report_path: pathlib.Path, name: str) -> Optional["PackageState"]:
+        """Reads the state of a package from a report file.
+
+        Parameters
+        ----------
+        report_path : pathlib.Path
+            Json report generated in incremental mode.
+        name : str
+            Name of the package expected.
+
+        Returns
+        -------
+        state : Optional[PackageState]
+            None if the report doesn't exist, has no state or the
+            state is from another package or version.
+        """
+        try:
+            with open(report_path) as f:
+                report: Dict[str, Any] = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        data: Optional[Dict[str, Any]] = report.get(STATE_KEY)
+        if data is None or data.get("package") != name:
+            return None
+        return cls.from_dict(data)
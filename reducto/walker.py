@@ -0,0 +1,276 @@
+"""Module containing the traversal of the directories of a package.
+
+The directories are listed with os.scandir, whose entries already contain
+the type of each file, so no additional stat call is needed to tell apart
+the source files from the directories. Well known directories which never
+contain source code of the package (version control, virtual environments
+and caches) are pruned before descending into them, as well as the paths
+ignored by the .gitignore files of the repository. Generic names like build
+or dist are not pruned, they may be subpackages: the build artifacts are
+expected to be ignored by git.
+
+Only a subset of the .gitignore syntax is supported: comments, negated
+patterns (!), patterns restricted to directories (trailing /) and patterns
+relative to the .gitignore file (containing a /). As in fnmatch, a * may
+match a /.
+"""
+
+from typing import FrozenSet, Iterator, List, Optional, Pattern, Tuple, Union
+import fnmatch
+import os
+import pathlib
+import re
+
+import reducto.exclude as ex
+
+# Directories never traversed.
+PRUNED_DIRS: FrozenSet[str] = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        ".venv",
+        ".tox",
+        ".nox",
+        ".eggs",
+        ".mypy_cache",
+        ".pytest_cache",
+        "__pycache__",
+        "node_modules",
+    }
+)
+# Suffix of the directories generated when a package is installed.
+PRUNED_SUFFIX: str = ".egg-info"
+GITIGNORE: str = ".gitignore"
+SOURCE_SUFFIX: str = ".py"
+
+
+class IgnoreRules:
+    """Patterns of a .gitignore file.
+
+    The patterns are matched against the paths relative to the
+    directory containing the .gitignore file.
+    """
+
+    def __init__(self, base: str, patterns: List[str]) -> None:
+        """
+        Parameters
+        ----------
+        base : str
+            Directory the patterns are relative to.
+        patterns : List[str]
+            Lines of the .gitignore file.
+        """
+        self._base: str = base
+        # (regex, negated, only directories, anchored)
+        self._rules: List[Tuple[Pattern[str], bool, bool, bool]] = []
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            negated: bool = pattern.startswith("!")
+            pattern = pattern.lstrip("!")
+            dir_only: bool = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            anchored: bool = "/" in pattern
+            pattern = pattern.lstrip("/")
+            if pattern:
+                regex = re.compile(fnmatch.translate(pattern))
+                self._rules.append((regex, negated, dir_only, anchored))
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self.base})"
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    @property
+    def base(self) -> str:
+        """Directory the patterns are relative to.
+
+        Returns
+        -------
+        base : str
+        """
+        return self._base
+
+    @classmethod
+    def from_file(cls, path: Union[str, pathlib.Path]) -> "IgnoreRules":
+        """Reads the patterns of a .gitignore file.
+
+        Parameters
+        ----------
+        path : Union[str, pathlib.Path]
+            Path of the .gitignore file.
+
+        Returns
+        -------
+        rules : IgnoreRules
+        """
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return cls(os.path.dirname(os.path.abspath(path)), f.readlines())
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        """Checks whether a path is ignored by the patterns.
+
+        Parameters
+        ----------
+        path : str
+            Full path, inside base.
+        is_dir : bool
+            Whether the path is a directory.
+
+        Returns
+        -------
+        ignored : Optional[bool]
+            True if the last pattern matching the path ignores it, False
+            if it is negated, None when no pattern matches.
+        """
+        relpath: str = os.path.relpath(path, self.base).replace(os.sep, "/")
+        name: str = os.path.basename(path)
+        ignored: Optional[bool] = None
+        for regex, negated, dir_only, anchored in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relpath if anchored else name):
+                ignored = not negated
+        return ignored
+
+
+def is_ignored(rules: List[IgnoreRules], path: str, is_dir: bool) -> bool:
+    """Checks a path against a set of .gitignore files.
+
+    Parameters
+    ----------
+    rules : List[IgnoreRules]
+        Rules ordered from the outermost to the innermost directory,
+        the innermost taking precedence.
+    path : str
+    is_dir : bool
+
+    Returns
+    -------
+    ignored : bool
+    """
+    for rule in reversed(rules):
+        ignored: Optional[bool] = rule.match(path, is_dir)
+        if ignored is not None:
+            return ignored
+    return False
+
+
+def repository_rules(path: Union[str, pathlib.Path]) -> List[IgnoreRules]:
+    """Reads the .gitignore files of the directories above a path.
+
+    Only the directories up to the root of the git repository containing
+    the path are considered, none if the path isn't in a repository.
+
+    Parameters
+    ----------
+    path : Union[str, pathlib.Path]
+        Directory to be walked.
+
+    Returns
+    -------
+    rules : List[IgnoreRules]
+        Ordered from the outermost to the innermost directory.
+    """
+    rules: List[IgnoreRules] = []
+    directory: str = os.path.abspath(path)
+    if os.path.exists(os.path.join(directory, ".git")):
+        return rules
+    while True:
+        parent: str = os.path.dirname(directory)
+        if parent == directory:
+            return []  # Not inside a repository.
+        directory = parent
+        gitignore = os.path.join(directory, GITIGNORE)
+        if os.path.isfile(gitignore):
+            rules.insert(0, IgnoreRules.from_file(gitignore))
+        if os.path.exists(os.path.join(directory, ".git")):
+            return rules
+
+
+def is_pruned(name: str) -> bool:
+    """Checks whether a directory is never traversed.
+
+    Parameters
+    ----------
+    name : str
+        Name of the directory.
+
+    Returns
+    -------
+    pruned : bool
+    """
+    return name in PRUNED_DIRS or name.endswith(PRUNED_SUFFIX)
+
+
+def walk(
+    path: Union[str, pathlib.Path],
+    gitignore: bool = True,
+    exclude: Optional[ex.Exclude] = None,
+) -> Iterator[str]:
+    """Yields the paths of the source files found under a directory.
+
+    The entries of every directory are visited sorted by name, so the
+    order is the same on every run. Symbolic links to directories are
+    not followed. Excluded entries are checked by name, before any
+    other access to them.
+
+    Parameters
+    ----------
+    path : Union[str, pathlib.Path]
+        Directory to walk.
+    gitignore : bool
+        Skip the paths ignored by the .gitignore files. Defaults to True.
+    exclude : Optional[ex.Exclude]
+        Paths to exclude, relative to the directory walked. Defaults to None.
+
+    Yields
+    ------
+    path : str
+        Full path of each source file.
+
+    Examples
+    --------
+    >>> list(walk("reducto"))
+    ['reducto/__init__.py', 'reducto/analyzer.py', ...]
+    """
+    rules: List[IgnoreRules] = repository_rules(path) if gitignore else []
+    if exclude is not None and not exclude.excludes_paths:
+        exclude = None
+    yield from _walk(os.fspath(path), "", rules, gitignore, exclude)
+
+
+def _walk(
+    directory: str,
+    prefix: str,
+    rules: List[IgnoreRules],
+    gitignore: bool,
+    exclude: Optional[ex.Exclude],
+) -> Iterator[str]:
+    try:
+        with os.scandir(directory) as it:
+            entries: List["os.DirEntry[str]"] = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        return
+
+    if gitignore and any(entry.name == GITIGNORE for entry in entries):
+        rules = rules + [IgnoreRules.from_file(os.path.join(directory, GITIGNORE))]
+
+    for entry in entries:
+        if exclude is not None and exclude.match_path(prefix + entry.name):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            if is_pruned(entry.name):
+                continue
+            if rules and is_ignored(rules, entry.path, True):
+                continue
+            yield from _walk(
+                entry.path, prefix + entry.name + "/", rules, gitignore, exclude
+            )
+        elif entry.name.endswith(SOURCE_SUFFIX) and entry.is_file():
+            if rules and is_ignored(rules, entry.path, False):
+                continue
+            yield entry.path
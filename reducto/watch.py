@@ -0,0 +1,439 @@
+"""Module containing the watch mode, reporting a package again when it changes.
+
+The state of the package is kept in memory between reports: on every
+change only the source files touched are analyzed again, and the totals
+are updated with the differences (as in the incremental reports).
+
+The changes are detected with inotify when available (linux), or polling
+the size and modification time of the source files otherwise. The events
+received in a short interval (like the bursts of writes when saving many
+files) are coalesced into a single report.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from collections import Counter
+import ctypes
+import ctypes.util
+import os
+import pathlib
+import select
+import struct
+import sys
+import time
+
+import reducto.analyzer as an
+import reducto.exclude as ex
+import reducto.package as pkg
+import reducto.state as st
+import reducto.walker as wk
+
+# Seconds between the checks of the polling watcher.
+POLL_INTERVAL: float = 1.0
+# Seconds without changes before reporting again.
+DEBOUNCE: float = 0.2
+
+# Events of inotify, see inotify(7).
+IN_MODIFY: int = 0x00000002
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_FROM: int = 0x00000040
+IN_MOVED_TO: int = 0x00000080
+IN_CREATE: int = 0x00000100
+IN_DELETE: int = 0x00000200
+IN_DELETE_SELF: int = 0x00000400
+IN_MOVE_SELF: int = 0x00000800
+IN_ISDIR: int = 0x40000000
+IN_NONBLOCK: int = 0o4000
+IN_CLOEXEC: int = 0o2000000
+WATCH_MASK: int = (
+    IN_MODIFY
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+# Header of an inotify event: watch descriptor, mask, cookie and length of the name.
+EVENT_HEADER = struct.Struct("iIII")
+
+# Identity of each source file: size and modification time.
+Snapshot = Dict[str, Tuple[int, int]]
+
+
+def snapshot(path: pathlib.Path, exclude: Optional[ex.Exclude] = None) -> Snapshot:
+    """Size and modification time of the source files of a package.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+    exclude : Optional[ex.Exclude]
+        Paths to exclude. Defaults to None.
+
+    Returns
+    -------
+    snapshot : Snapshot
+        By path of the source file.
+    """
+    files: Snapshot = {}
+    for file_path in wk.walk(path, exclude=exclude):
+        try:
+            stat = os.stat(file_path)
+        except OSError:  # Removed while walking.
+            continue
+        files[file_path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+class PollWatcher:
+    """Detects the changes of a package polling its source files.
+
+    Examples
+    --------
+    >>> watcher = PollWatcher(path)
+    >>> watcher.wait()  # Blocks until a file is added, removed or modified.
+    True
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        exclude: Optional[ex.Exclude] = None,
+        interval: float = POLL_INTERVAL,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        path : pathlib.Path
+            Directory of the package.
+        exclude : Optional[ex.Exclude]
+            Paths to exclude. Defaults to None.
+        interval : float
+            Seconds between the checks. Defaults to POLL_INTERVAL.
+        """
+        self._path: pathlib.Path = path
+        self._exclude: Optional[ex.Exclude] = exclude
+        self._interval: float = interval
+        self._snapshot: Snapshot = snapshot(path, exclude=exclude)
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self._path})"
+
+    def __enter__(self) -> "PollWatcher":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits until a source file changes.
+
+        Parameters
+        ----------
+        timeout : Optional[float]
+            Maximum seconds to wait. Defaults to None, waits forever.
+
+        Returns
+        -------
+        changed : bool
+            False when the timeout expired without changes.
+        """
+        deadline: Optional[float] = None
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+        while True:
+            delay: float = self._interval
+            if deadline is not None:
+                delay = min(delay, max(0.0, deadline - time.monotonic()))
+            time.sleep(delay)
+            current: Snapshot = snapshot(self._path, exclude=self._exclude)
+            if current != self._snapshot:
+                self._snapshot = current
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def close(self) -> None:
+        """Nothing to release, defined for symmetry with InotifyWatcher."""
+        pass
+
+
+def _inotify() -> Optional[ctypes.CDLL]:
+    """The C library if it provides inotify, None otherwise."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:  # pragma: no cover, depends on the platform
+        return None
+    if not hasattr(libc, "inotify_init1"):  # pragma: no cover
+        return None
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_init1.restype = ctypes.c_int
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_add_watch.restype = ctypes.c_int
+    return libc
+
+
+class InotifyWatcher:
+    """Detects the changes of a package with inotify.
+
+    Every directory of the package (except those never traversed, like
+    __pycache__) is watched, including the directories created later.
+    Only the events on source files and directories are considered.
+    """
+
+    def __init__(
+        self, path: pathlib.Path, exclude: Optional[ex.Exclude] = None
+    ) -> None:
+        """
+        Parameters
+        ----------
+        path : pathlib.Path
+            Directory of the package.
+        exclude : Optional[ex.Exclude]
+            Paths to exclude. Defaults to None.
+
+        Raises
+        ------
+        OSError
+            If inotify is not available or can't be initialized.
+        """
+        libc = _inotify()
+        if libc is None:
+            raise OSError("inotify is not available.")
+        self._libc: ctypes.CDLL = libc
+        self._path: pathlib.Path = path
+        self._exclude: Optional[ex.Exclude] = exclude
+        self._fd: int = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        # Directory watched by each watch descriptor.
+        self._directories: Dict[int, str] = {}
+        self._watch_tree(str(path), "")
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self._path})"
+
+    def __enter__(self) -> "InotifyWatcher":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _watch_tree(self, directory: str, prefix: str) -> None:
+        """Watches a directory and its subdirectories."""
+        wd: int = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(directory), WATCH_MASK
+        )
+        if wd < 0:  # Removed in the meantime, or the limit of watches reached.
+            return
+        self._directories[wd] = prefix
+        try:
+            with os.scandir(directory) as it:
+                entries: List["os.DirEntry[str]"] = list(it)
+        except OSError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False) and self._is_watched(
+                prefix + entry.name
+            ):
+                self._watch_tree(entry.path, prefix + entry.name + "/")
+
+    def _is_watched(self, relpath: str) -> bool:
+        """Whether a directory (relative to the package) must be watched."""
+        name: str = relpath.rpartition("/")[2]
+        if wk.is_pruned(name):
+            return False
+        return self._exclude is None or not self._exclude.match_path(relpath)
+
+    def _read_events(self) -> bool:
+        """Reads the pending events, watching the new directories.
+
+        Returns
+        -------
+        relevant : bool
+            Whether any event concerns a source file or a directory.
+        """
+        try:
+            data: bytes = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return False
+        relevant: bool = False
+        position: int = 0
+        while position < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, position)
+            position += EVENT_HEADER.size
+            name: str = os.fsdecode(data[position : position + length].rstrip(b"\0"))
+            position += length
+            prefix: Optional[str] = self._directories.get(wd)
+            if prefix is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                relevant = True
+            elif mask & IN_ISDIR:
+                if self._is_watched(prefix + name):
+                    relevant = True
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        directory = os.path.join(self._path, prefix, name)
+                        self._watch_tree(directory, prefix + name + "/")
+            elif name.endswith(wk.SOURCE_SUFFIX) or name == wk.GITIGNORE:
+                relevant = True
+        return relevant
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits until a source file changes.
+
+        Parameters
+        ----------
+        timeout : Optional[float]
+            Maximum seconds to wait. Defaults to None, waits forever.
+
+        Returns
+        -------
+        changed : bool
+            False when the timeout expired without changes.
+        """
+        deadline: Optional[float] = None
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+        while True:
+            remaining: Optional[float] = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+            if readable and self._read_events():
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+    def close(self) -> None:
+        """Closes the inotify instance, removing every watch."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+Watcher = Union[PollWatcher, InotifyWatcher]
+
+
+def default_watcher(
+    path: pathlib.Path,
+    exclude: Optional[ex.Exclude] = None,
+    interval: float = POLL_INTERVAL,
+) -> Watcher:
+    """Watcher of a package, with inotify when available.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        Directory of the package.
+    exclude : Optional[ex.Exclude]
+        Paths to exclude. Defaults to None.
+    interval : float
+        Seconds between the checks when polling. Defaults to POLL_INTERVAL.
+
+    Returns
+    -------
+    watcher : Watcher
+    """
+    try:
+        return InotifyWatcher(path, exclude=exclude)
+    except OSError:
+        return PollWatcher(path, exclude=exclude, interval=interval)
+
+
+class Watch:
+    """Reports a package every time its source files change.
+
+    The state of the package is kept between the reports, only the source
+    files changed are analyzed again.
+
+    Examples
+    --------
+    >>> for package in Watch(path):
+    ...     print(package.totals.lines)
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        exclude: Optional[ex.Exclude] = None,
+        analyzer: Optional[an.Analyzer] = None,
+        watcher: Optional[Watcher] = None,
+        debounce: float = DEBOUNCE,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        path : pathlib.Path
+            Directory of the package.
+        exclude : Optional[ex.Exclude]
+            Paths (relative to the package) and functions to exclude.
+            Defaults to None.
+        analyzer : Optional[an.Analyzer]
+            Analyzer used for every report. Defaults to None, the files
+            are analyzed on the current process.
+        watcher : Optional[Watcher]
+            Detects the changes of the package. Defaults to None, obtained
+            from default_watcher.
+        debounce : float
+            Seconds without changes before reporting again. Defaults to DEBOUNCE.
+        """
+        pkg.Package.validate(path)
+        self._path: pathlib.Path = path
+        self._exclude: Optional[ex.Exclude] = exclude
+        self._analyzer: an.Analyzer = (
+            analyzer if analyzer is not None else an.Analyzer()
+        )
+        self._watcher: Watcher = (
+            watcher if watcher is not None else default_watcher(path, exclude=exclude)
+        )
+        self._debounce: float = debounce
+        # Starting from an empty state, every file is analyzed through the
+        # cache of the state, so a file changed while analyzed is detected.
+        self._state: st.PackageState = st.PackageState(path.name)
+        self.stats: "Counter[str]" = Counter()
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + f"({self._path.name})"
+
+    def __iter__(self) -> Iterator[pkg.Package]:
+        """Yields the package now and after every change.
+
+        Yields
+        ------
+        package : pkg.Package
+            Package with the metrics and totals updated.
+        """
+        yield self.update()
+        while True:
+            self._watcher.wait()
+            # Coalesce the changes received until there is a pause.
+            while self._watcher.wait(self._debounce):
+                self.stats["coalesced"] += 1
+            yield self.update()
+
+    def update(self) -> pkg.Package:
+        """Analyzes the source files changed since the previous update.
+
+        Returns
+        -------
+        package : pkg.Package
+        """
+        package = pkg.Package(
+            self._path,
+            previous=self._state,
+            exclude=self._exclude,
+            analyzer=self._analyzer,
+        )
+        package.totals  # Analyze the changed files and update the totals.
+        self._state = package.state()
+        self.stats["updates"] += 1
+        self.stats.update(package.stats)
+        return package
+
+    def close(self) -> None:
+        """Stops watching the package."""
+        self._watcher.close()
@@ -2,6 +2,7 @@
 Contains functions useful on different testing modules.
 """
 
+import importlib.util
 import os
 import pathlib
 import tempfile
@@ -12,6 +13,9 @@ import pytest
 PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
 SAMPLE_DATA = os.path.join(PARENT_DIR, 'data')
 
+# The table formats import tabulate when rendered.
+TABULATE_MISSING = importlib.util.find_spec('tabulate') is None
+
 
 def get_sample_file(name: str) -> str:
     return os.path.join(SAMPLE_DATA, name)
@@ -0,0 +1,98 @@
+"""
+Contains tests related to reducto/aio.py
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+import reducto as rd
+import reducto.aio as aio
+import reducto.exclude as ex
+import reducto.package as pkg
+import reducto.src as src
+
+from tests.conftest import get_sample_file
+
+
+async def collect(path, **kwargs):
+    return [metrics async for metrics in aio.iter_analyze_async(path, **kwargs)]
+
+
+def test_source_paths(sample_package):
+    assert aio.source_paths(sample_package) == pkg.Package(sample_package).paths
+    assert aio.source_paths(get_sample_file('example.py')) == [
+        get_sample_file('example.py')
+    ]
+    with pytest.raises(src.SourceFileError):
+        aio.source_paths(get_sample_file('example.txt'))
+
+
+@pytest.mark.parametrize('workers, concurrency', [(1, None), (1, 1), (2, None)])
+def test_iter_analyze_async(sample_package, workers, concurrency):
+    metrics = asyncio.run(
+        collect(sample_package, workers=workers, concurrency=concurrency)
+    )
+    assert metrics == pkg.Package(sample_package).metrics
+
+
+def test_iter_analyze_async_exclude(sample_package):
+    exclude = ex.Exclude(['data'], private=True)
+    metrics = asyncio.run(collect(sample_package, exclude=exclude))
+    assert metrics == pkg.Package(sample_package, exclude=exclude).metrics
+
+
+def test_iter_analyze_async_executor(sample_package):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        metrics = asyncio.run(collect(sample_package, executor=executor))
+        # The executor given isn't shut down.
+        assert executor.submit(sum, [1, 2]).result() == 3
+    assert len(metrics) == 7
+
+
+def test_iter_analyze_async_errors(sample_package):
+    with pytest.raises(ValueError):
+        asyncio.run(collect(sample_package, workers=0))
+    with pytest.raises(ValueError):
+        asyncio.run(collect(sample_package, concurrency=0))
+
+
+def test_analyze_async(sample_package):
+    store = asyncio.run(rd.analyze_async(sample_package, workers=2))
+    package = pkg.Package(sample_package)
+    assert list(store) == package.metrics
+    assert store.totals() == package.totals
+
+
+def test_analyze_async_source_file():
+    store = asyncio.run(rd.analyze_async(get_sample_file('example.py')))
+    assert store.paths == [get_sample_file('example.py')]
+
+
+def test_analyze_async_cancel(sample_package):
+    started = []
+    release = threading.Event()
+
+    def analyze_file(path):
+        started.append(path)
+        release.wait(5)
+        return src.SourceFile(path).metrics
+
+    async def main():
+        task = asyncio.ensure_future(
+            aio.analyze_async(sample_package, concurrency=1)
+        )
+        while not started:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    with mock.patch('reducto.analyzer.analyze_file', analyze_file):
+        asyncio.run(main())
+    # Only the file being analyzed when cancelled was started.
+    assert len(started) == 1
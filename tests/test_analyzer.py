@@ -0,0 +1,163 @@
+"""
+Contains tests related to reducto/analyzer.py
+"""
+
+import os
+from unittest import mock
+
+import pytest
+
+import reducto.analyzer as an
+import reducto.metrics as mt
+import reducto.package as pkg
+import reducto.cache as ch
+import reducto.profile as pf
+
+PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_DATA = os.path.join(PARENT_DIR, 'data')
+
+
+def get_sample_file(name: str) -> str:
+    return os.path.join(SAMPLE_DATA, name)
+
+
+def test_usable_cpus():
+    assert an.usable_cpus() >= 1
+
+
+def test_analyze_file():
+    metrics = an.analyze_file(get_sample_file('example.py'))
+    assert isinstance(metrics, mt.FileMetrics)
+    assert metrics.lines == 128
+    assert metrics.number_of_functions == 12
+
+
+def test_analyze_source():
+    path = get_sample_file('example.py')
+    with open(path, 'rb') as f:
+        metrics = an.analyze_source(f.read(), 'blob/example.py')
+    assert metrics.path == 'blob/example.py'
+    assert metrics[1:] == an.analyze_file(path)[1:]
+
+
+class TestAnalyzer:
+    def test_workers_error(self):
+        with pytest.raises(ValueError):
+            an.Analyzer(workers=0)
+
+    def test_repr(self):
+        assert repr(an.Analyzer(workers=2)) == 'Analyzer(workers=2)'
+
+    def test_analyze_serial(self, sample_package):
+        paths = [f.path for f in pkg.Package(sample_package).source_files]
+        with an.Analyzer() as analyzer:
+            metrics = analyzer.analyze(paths)
+        assert [m.path for m in metrics] == [str(p) for p in paths]
+
+    def test_analyze_parallel(self, sample_package):
+        paths = [f.path for f in pkg.Package(sample_package).source_files]
+        with an.Analyzer() as analyzer:
+            serial = analyzer.analyze(paths)
+        with an.Analyzer(workers=2) as analyzer:
+            parallel = analyzer.analyze(paths)
+            # The pool is reused between calls.
+            assert analyzer.analyze(reversed(paths)) == serial[::-1]
+        assert parallel == serial
+
+    def test_close(self):
+        analyzer = an.Analyzer(workers=2)
+        analyzer.analyze([get_sample_file('example.py')] * 2)
+        analyzer.close()
+        assert analyzer._executor is None
+
+    def test_analyze_cache_override(self):
+        cache = ch.MemoryCache()
+        path = get_sample_file('example.py')
+        with an.Analyzer() as analyzer:
+            analyzer.analyze([path], cache=cache)
+            assert path in cache.entries
+            analyzer.analyze([path], cache=cache)
+        assert analyzer.stats['cache_hits'] == 1
+        assert analyzer.cache is None
+
+    def test_analyze_cache_stat_once(self, sample_package):
+        paths = pkg.Package(sample_package).paths
+        with an.Analyzer() as analyzer, \
+                mock.patch.object(ch, 'file_key', wraps=ch.file_key) as file_key, \
+                mock.patch.object(os, 'stat', wraps=os.stat) as stat:
+            analyzer.analyze(paths, cache=ch.MemoryCache())
+        # The key of each file is obtained once, the dedup reuses its size
+        # (the paths are only stat'ed again to validate the source files).
+        assert file_key.call_count == len(paths)
+        assert [c.args[0] for c in stat.call_args_list if isinstance(c.args[0], str)] == paths
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_analyze_dedup(self, sample_package, workers):
+        paths = pkg.Package(sample_package).paths
+        with an.Analyzer(workers=workers, dedup=False) as analyzer:
+            expected = analyzer.analyze(paths)
+            assert analyzer.stats['analyzed'] == 7
+        with an.Analyzer(workers=workers) as analyzer:
+            assert analyzer.analyze(paths) == expected
+            # 4 copies of the sample file and 2 empty __init__.py files.
+            assert analyzer.stats['analyzed'] == 3
+            assert analyzer.stats['dedup_hits'] == 4
+            # The contents hashed are reused along the run, the file with
+            # a size seen once (the empty file) is hashed on the next call.
+            assert analyzer.analyze(paths[::-1]) == expected[::-1]
+            assert analyzer.stats['analyzed'] == 4
+            assert analyzer.analyze(paths) == expected
+            assert analyzer.stats['analyzed'] == 4
+            assert analyzer.stats['dedup_hits'] == 4 + 6 + 7
+            assert analyzer.stats['files'] == 21
+
+    def test_analyze_dedup_unique_sizes(self, tmp_path):
+        paths = []
+        for i in range(3):
+            path = tmp_path / f'file_{i}.py'
+            path.write_text('x = 1\n' * (i + 1))
+            paths.append(str(path))
+        with an.Analyzer() as analyzer, \
+                mock.patch.object(ch, 'file_digest', side_effect=AssertionError):
+            metrics = analyzer.analyze(paths)
+        assert [m.lines for m in metrics] == [1, 2, 3]
+        assert analyzer.stats['dedup_hits'] == 0
+
+    def test_analyze_profile(self, sample_package):
+        paths = pkg.Package(sample_package).paths
+        profile = pf.Profile()
+        with an.Analyzer(workers=2, profile=profile, dedup=False) as analyzer:
+            assert analyzer.profile is profile
+            metrics = analyzer.analyze(paths)
+        assert metrics == an.Analyzer().analyze(paths)
+        assert list(profile.files) == paths
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_analyze_sources(self, sample_package, workers):
+        paths = pkg.Package(sample_package).paths
+        sources = [(path, open(path, 'rb').read()) for path in paths]
+        expected = an.Analyzer().analyze(paths)
+        with an.Analyzer(workers=workers) as analyzer, \
+                mock.patch.object(an.src, 'read_source', side_effect=AssertionError):
+            assert analyzer.analyze_sources(sources) == expected
+            assert analyzer.stats['analyzed'] == 3
+            assert analyzer.stats['dedup_hits'] == 4
+            # The contents already analyzed are reused, decoded or not.
+            decoded = [(f'buffer_{i}.py', s.decode()) for i, (_, s) in enumerate(sources)]
+            metrics = analyzer.analyze_sources(decoded)
+            assert [m.path for m in metrics] == [name for name, _ in decoded]
+            assert [m[1:] for m in metrics] == [m[1:] for m in expected]
+            assert analyzer.stats['analyzed'] == 3
+
+    def test_analyze_sources_cache(self):
+        cache = ch.MemoryCache()
+        sources = [('a.py', 'x = 1\n'), ('b.py', 'def foo():\n    return\n')]
+        with an.Analyzer(cache=cache, dedup=False) as analyzer:
+            first = analyzer.analyze_sources(sources)
+            assert len(cache.entries) == 2
+            assert analyzer.analyze_sources(sources[::-1]) == first[::-1]
+            assert analyzer.stats['cache_hits'] == 2
+            assert analyzer.stats['analyzed'] == 2
+        with an.Analyzer(dedup=False) as analyzer:
+            analyzer.analyze_sources(sources * 2)
+            assert analyzer.stats['analyzed'] == 4
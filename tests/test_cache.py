@@ -0,0 +1,113 @@
+"""
+Contains tests related to reducto/cache.py
+"""
+
+import os
+import shutil
+from unittest import mock
+
+import pytest
+
+import reducto as rd
+import reducto.analyzer as an
+import reducto.cache as ch
+import reducto.metrics as mt
+import reducto.package as pkg
+
+PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_DATA = os.path.join(PARENT_DIR, 'data')
+
+
+def get_sample_file(name: str) -> str:
+    return os.path.join(SAMPLE_DATA, name)
+
+
+@pytest.fixture()
+def sample_file(tmp_path):
+    path = tmp_path / 'example.py'
+    shutil.copy(get_sample_file('example.py'), path)
+    return path
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    return ch.MetricsCache(tmp_path / 'cache')
+
+
+def test_file_key(sample_file):
+    key = ch.file_key(sample_file)
+    assert key.path == str(sample_file)
+    assert key.size == os.path.getsize(sample_file)
+
+
+def test_file_digest(sample_file, tmp_path):
+    other = tmp_path / 'other.py'
+    shutil.copy(sample_file, other)
+    assert ch.file_digest(sample_file) == ch.file_digest(other)
+    other.write_text('\n')
+    assert ch.file_digest(sample_file) != ch.file_digest(other)
+    assert ch.content_digest(sample_file.read_bytes()) == ch.file_digest(sample_file)
+
+
+class TestMetricsCache:
+    def test_directory(self, cache, tmp_path):
+        namespace = f'{rd.__version__}-{mt.METRICS_VERSION}'
+        assert cache.directory == tmp_path / 'cache' / namespace
+        assert cache.directory.is_dir()
+
+    def test_get_missing(self, cache, sample_file):
+        assert cache.get(ch.file_key(sample_file)) is None
+
+    def test_put_get(self, cache, sample_file):
+        key = ch.file_key(sample_file)
+        metrics = an.analyze_file(str(sample_file))
+        cache.put(key, metrics)
+        assert cache.get(key) == metrics
+
+    def test_put_get_content(self, cache, sample_file):
+        metrics = an.analyze_file(str(sample_file))
+        assert cache.get_content('a' * 40) is None
+        cache.put_content('a' * 40, metrics)
+        assert cache.get_content('a' * 40) == metrics
+        assert cache.get(ch.file_key(sample_file)) is None
+
+    def test_touched_file(self, cache, sample_file):
+        key = ch.file_key(sample_file)
+        metrics = an.analyze_file(str(sample_file))
+        cache.put(key, metrics)
+        os.utime(sample_file, ns=(key.mtime_ns + 10**9, key.mtime_ns + 10**9))
+        new_key = ch.file_key(sample_file)
+        assert new_key != key
+        # Same content, still valid.
+        assert cache.get(new_key) == metrics
+
+    def test_modified_file(self, cache, sample_file):
+        key = ch.file_key(sample_file)
+        cache.put(key, an.analyze_file(str(sample_file)))
+        content = sample_file.read_text()
+        sample_file.write_text(content.replace('Hello', 'Hallo'))
+        os.utime(sample_file, ns=(key.mtime_ns + 10**9, key.mtime_ns + 10**9))
+        assert cache.get(ch.file_key(sample_file)) is None
+
+    def test_put_changed_file(self, cache, sample_file):
+        key = ch.file_key(sample_file)
+        metrics = an.analyze_file(str(sample_file))
+        sample_file.write_text('\n')
+        cache.put(key, metrics)
+        assert cache.get(ch.file_key(sample_file)) is None
+
+    def test_version_invalidation(self, cache, sample_file, tmp_path):
+        key = ch.file_key(sample_file)
+        cache.put(key, an.analyze_file(str(sample_file)))
+        with mock.patch.object(mt, 'METRICS_VERSION', mt.METRICS_VERSION + 1):
+            assert ch.MetricsCache(tmp_path / 'cache').get(key) is None
+
+    def test_warm_run(self, cache, sample_package):
+        cold = pkg.Package(sample_package, cache=cache).metrics
+        with mock.patch('ast.parse', side_effect=AssertionError), \
+                mock.patch('tokenize.generate_tokens', side_effect=AssertionError):
+            with an.Analyzer(cache=cache) as analyzer:
+                warm = analyzer.analyze(m.path for m in cold)
+        assert warm == cold
+        assert analyzer.stats['cache_hits'] == len(cold)
+        assert analyzer.stats['analyzed'] == 0
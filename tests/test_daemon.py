@@ -0,0 +1,200 @@
+"""
+Contains tests related to reducto/daemon.py
+"""
+
+import os
+import pathlib
+import socket
+import threading
+
+import pytest
+
+import reducto.daemon as dm
+import reducto.package as pkg
+import reducto.reducto as rd
+import reducto.reports as rp
+
+from tests.conftest import get_sample_file
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, 'AF_UNIX'), reason='Unix sockets are not available.'
+)
+
+
+@pytest.fixture()
+def daemon():
+    return dm.Daemon()
+
+
+@pytest.fixture()
+def socket_path(tmp_path, monkeypatch):
+    path = tmp_path / 'reducto.sock'
+    monkeypatch.setenv(dm.SOCKET_ENV, str(path))
+    return path
+
+
+@pytest.fixture()
+def running(daemon, socket_path):
+    thread = threading.Thread(target=daemon.serve, args=(socket_path,))
+    thread.start()
+    for _ in range(100):
+        if dm.is_running(socket_path):
+            break
+        thread.join(0.05)
+    yield daemon
+    if dm.is_running(socket_path):
+        with dm.Client(socket_path) as client:
+            client.query('shutdown')
+    thread.join(5)
+
+
+def test_socket_path(socket_path, monkeypatch):
+    assert dm.socket_path() == socket_path
+    monkeypatch.delenv(dm.SOCKET_ENV)
+    monkeypatch.setenv('XDG_RUNTIME_DIR', '/run/user/1000')
+    assert dm.socket_path() == pathlib.Path('/run/user/1000/reducto.sock')
+
+
+class TestDaemon:
+    def test_ping(self, daemon):
+        response = daemon.handle({'query': 'ping'})
+        assert response['ok']
+        assert response['result']['pid'] == os.getpid()
+
+    def test_errors(self, daemon):
+        assert not daemon.handle({'query': 'missing'})['ok']
+        response = daemon.handle({'query': 'file', 'path': 'missing.py'})
+        assert not response['ok']
+        assert 'SourceFileError' in response['error']
+
+    def test_file(self, daemon, sample_package):
+        path = str(sample_package / 'pyfile.py')
+        result = daemon.handle({'query': 'file', 'path': path})['result']
+        package = pkg.Package(sample_package)
+        assert result == rp.metrics_as_dict(package.metrics[1])
+        result = daemon.handle(
+            {'query': 'file', 'path': path, 'exclude_private': True}
+        )['result']
+        assert result['number_of_functions'] == 11
+
+    def test_function(self, daemon, sample_package):
+        path = str(sample_package / 'pyfile.py')
+        functions = daemon.handle({'query': 'function', 'path': path})['result']
+        assert len(functions) == 12
+        inner = daemon.handle(
+            {'query': 'function', 'path': path, 'name': '_inner_func'}
+        )['result']
+        assert [f['name'] for f in inner] == ['nested_func.<locals>._inner_func']
+
+    def test_package(self, daemon, sample_package):
+        result = daemon.handle({'query': 'package', 'path': str(sample_package)})
+        package = pkg.Package(sample_package)
+        assert result['result']['totals'] == rp.totals_as_dict(package.totals)
+        assert len(result['result']['files']) == 7
+
+    def test_warm(self, daemon, sample_package):
+        request = {'query': 'package', 'path': str(sample_package)}
+        daemon.handle(request)
+        analyzed = daemon.analyzer.stats['analyzed']
+        daemon.handle(request)
+        daemon.handle({'query': 'file', 'path': str(sample_package / 'pyfile.py')})
+        assert daemon.analyzer.stats['analyzed'] == analyzed
+        # The entry of a modified file is invalidated.
+        path = sample_package / 'pyfile.py'
+        path.write_text('def foo():\n    return\n')
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        result = daemon.handle({'query': 'file', 'path': str(path)})['result']
+        assert result['lines'] == 2
+        assert daemon.analyzer.stats['analyzed'] == analyzed + 1
+
+    def test_report(self, daemon, sample_package):
+        argv = ['pyfile.py', '--exclude-dunder']
+        result = daemon.handle(
+            {'query': 'report', 'argv': argv, 'cwd': str(sample_package)}
+        )['result']
+        app = rd.Reducto()
+        app._parse_args([str(sample_package / 'pyfile.py'), '--exclude-dunder'])
+        assert result == app.report()
+        result = daemon.handle(
+            {'query': 'report', 'argv': ['--ungrouped'], 'cwd': str(sample_package)}
+        )['result']
+        app._parse_args([str(sample_package), '--ungrouped'])
+        assert result == app.report()
+
+    def test_report_invalid_arguments(self, daemon, sample_package):
+        for argv in (['--format', 'missing'], ['--version']):
+            response = daemon.handle(
+                {'query': 'report', 'argv': argv, 'cwd': str(sample_package)}
+            )
+            assert not response['ok']
+        assert '--format' in daemon.handle(
+            {'query': 'report', 'argv': ['-f', 'missing'], 'cwd': '.'}
+        )['error']
+
+    def test_shutdown(self, daemon):
+        assert daemon.handle({'query': 'shutdown'})['ok']
+        assert daemon.closed
+
+
+class TestServe:
+    def test_client(self, running, socket_path, sample_package):
+        with dm.Client() as client:
+            assert client.query('ping')['pid'] == os.getpid()
+            totals = client.query('package', path=str(sample_package))['totals']
+            assert totals['lines'] == pkg.Package(sample_package).totals.lines
+            with pytest.raises(dm.DaemonError):
+                client.query('file', path='missing.py')
+        with pytest.raises(dm.DaemonError):
+            running.serve(socket_path)
+
+    def test_invalid_report_keeps_serving(self, running, sample_package):
+        with dm.Client() as client:
+            with pytest.raises(dm.DaemonError):
+                client.query('report', argv=['--jobs', 'x'], cwd=str(sample_package))
+            assert client.query('ping')['pid'] == os.getpid()
+        with dm.Client() as client:
+            assert client.query('ping')['pid'] == os.getpid()
+
+    def test_idle_client(self, running):
+        # A connected client without requests doesn't block the others.
+        with dm.Client() as idle, dm.Client(timeout=5) as client:
+            assert client.query('ping')['pid'] == os.getpid()
+            assert idle.query('ping')['pid'] == os.getpid()
+
+    def test_shutdown(self, running, socket_path):
+        with dm.Client() as client:
+            client.query('shutdown')
+        for _ in range(100):
+            if not socket_path.exists():
+                break
+            threading.Event().wait(0.05)
+        assert not dm.is_running(socket_path)
+        assert not socket_path.exists()
+
+    def test_run_daemon(self, running, sample_package, capsys):
+        app = rd.Reducto()
+        app.run([str(sample_package), '--ungrouped'])
+        local = capsys.readouterr().out
+        app.run([str(sample_package), '--ungrouped', '--daemon'])
+        assert capsys.readouterr().out == local
+        assert running.stats['report'] == 1
+
+    def test_run_daemon_not_running(self, socket_path, sample_package, capsys):
+        rd.Reducto().run([str(sample_package), '--daemon'])
+        assert 'lines' in capsys.readouterr().out
+
+    def test_stale_socket(self, daemon, socket_path):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(str(socket_path))
+        sock.close()
+        assert not dm.is_running(socket_path)
+        thread = threading.Thread(target=daemon.serve, args=(socket_path,))
+        thread.start()
+        for _ in range(100):
+            if dm.is_running(socket_path):
+                break
+            thread.join(0.05)
+        rd.Reducto().run(['serve', '--stop'])
+        thread.join(5)
+        assert not thread.is_alive()
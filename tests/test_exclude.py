@@ -0,0 +1,76 @@
+"""
+Contains tests related to reducto/exclude.py
+"""
+
+import pytest
+
+import reducto.exclude as ex
+import reducto.metrics as mt
+
+
+def test_compile_patterns():
+    regex = ex.compile_patterns(['migrations', '*_pb2.py', 'vendor/*', '/docs/'])
+    assert regex.match('app/migrations')
+    assert regex.match('migrations')
+    assert regex.match('api/service_pb2.py')
+    assert regex.match('vendor/lib.py')
+    assert regex.match('docs')
+    assert not regex.match('app/vendor/lib.py')
+    assert not regex.match('app/migrations.py')
+    assert ex.compile_patterns([]) is None
+    assert ex.compile_patterns(['/']) is None
+
+
+@pytest.mark.parametrize('name, private, dunder', [
+    ('foo', False, False),
+    ('_foo', True, False),
+    ('__foo', True, False),
+    ('__init__', False, True),
+    ('__', True, False),
+])
+def test_function_names(name, private, dunder):
+    assert ex.is_private(name) is private
+    assert ex.is_dunder(name) is dunder
+
+
+class TestExclude:
+    def sample_metrics(self) -> mt.FileMetrics:
+        functions = (
+            mt.FunctionMetrics('foo', 1, 5, 1, 0, 1, 2),
+            mt.FunctionMetrics('_bar', 7, 12, 0, 1, 0, 3),
+            mt.FunctionMetrics('__init__', 14, 15, 0, 0, 0, 2),
+        )
+        return mt.FileMetrics('/pkg/module.py', 16, 1, 1, 1, 13, functions)
+
+    def test_bool(self):
+        assert not ex.Exclude()
+        assert ex.Exclude(['tests'])
+        assert ex.Exclude(private=True)
+
+    def test_match_path(self):
+        exclude = ex.Exclude(['tests', '*_pb2.py'])
+        assert exclude.excludes_paths
+        assert exclude.match_path('tests')
+        assert exclude.match_path('sub/api_pb2.py')
+        assert not exclude.match_path('sub/api.py')
+        assert not ex.Exclude().match_path('tests')
+
+    def test_match_function(self):
+        assert ex.Exclude(private=True).match_function('_bar')
+        assert not ex.Exclude(private=True).match_function('__init__')
+        assert ex.Exclude(dunder=True).match_function('__init__')
+        assert not ex.Exclude(['tests']).match_function('_bar')
+        # Qualified names are matched by their last part.
+        assert ex.Exclude(dunder=True).match_function('Foo.__init__')
+        assert ex.Exclude(private=True).match_function('foo.<locals>._inner')
+        assert not ex.Exclude(private=True).match_function('_Foo.method')
+
+    def test_filter(self):
+        metrics = self.sample_metrics()
+        assert ex.Exclude().filter(metrics) is metrics
+        assert ex.Exclude(dunder=True).filter(ex.Exclude(dunder=True).filter(metrics)) == (
+            ex.Exclude(dunder=True).filter(metrics)
+        )
+        filtered = ex.Exclude(private=True, dunder=True).filter(metrics)
+        assert [f.name for f in filtered.functions] == ['foo']
+        assert filtered.lines == metrics.lines
@@ -0,0 +1,192 @@
+"""
+Contains tests related to reducto/history.py
+"""
+
+import json
+import pathlib
+import shutil
+import subprocess
+
+import pytest
+
+import reducto.cache as ch
+import reducto.exclude as ex
+import reducto.history as hs
+import reducto.package as pkg
+import reducto.reducto as rd
+
+from tests.conftest import get_sample_file
+
+pytestmark = pytest.mark.skipif(
+    shutil.which('git') is None, reason='git is not installed.'
+)
+
+
+def git(repository, *args):
+    return subprocess.run(
+        ['git', '-C', str(repository), *args],
+        check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    ).stdout.decode().strip()
+
+
+def commit(repository, message):
+    git(repository, 'add', '-A')
+    git(repository, 'commit', '-q', '-m', message)
+    return git(repository, 'rev-parse', 'HEAD')
+
+
+@pytest.fixture()
+def repository(tmp_path):
+    """Repository with a package changing along 4 commits.
+
+    Yields the repository, the package and the totals of the package
+    on each commit (after the first one), computed from the working tree.
+    """
+    git(tmp_path, 'init', '-q')
+    git(tmp_path, 'config', 'user.email', 'reducto@example.com')
+    git(tmp_path, 'config', 'user.name', 'reducto')
+    (tmp_path / 'README.md').write_text('readme\n')
+    commit(tmp_path, 'Initial commit')
+
+    package = tmp_path / 'package'
+    totals = []
+    package.mkdir()
+    (package / '__init__.py').write_text('"""Package."""\n')
+    shutil.copy(get_sample_file('example.py'), package / 'example.py')
+    commit(tmp_path, 'Add package')
+    totals.append(pkg.Package(package).totals)
+
+    (package / 'sub').mkdir()
+    (package / 'sub' / '__init__.py').write_text('\n')
+    shutil.copy(get_sample_file('example.py'), package / 'sub' / 'copy.py')
+    (package / 'legacy.py').write_text('print "python 2"\n')
+    commit(tmp_path, 'Add subpackage')
+    # The file with invalid syntax is skipped.
+    (package / 'legacy.py').unlink()
+    totals.append(pkg.Package(package).totals)
+    (package / 'legacy.py').write_text('print "python 2"\n')
+
+    (package / 'example.py').write_text('def foo():\n    # Comment\n    return\n')
+    commit(tmp_path, 'Rewrite example')
+    (package / 'legacy.py').unlink()
+    totals.append(pkg.Package(package).totals)
+
+    yield tmp_path, package, totals
+
+
+def test_locate(repository):
+    root, package, _ = repository
+    assert hs.locate(package) == (root.resolve(), 'package')
+    assert hs.locate(root) == (root.resolve(), '')
+    with pytest.raises(hs.GitError):
+        hs.locate(package.parent.parent)
+
+
+def test_list_commits(repository):
+    root, _, _ = repository
+    commits = hs.list_commits(root, 'HEAD~3')
+    assert [c.subject for c in commits] == [
+        'Add package', 'Add subpackage', 'Rewrite example'
+    ]
+    assert commits[-1].sha == git(root, 'rev-parse', 'HEAD')
+    assert hs.list_commits(root, 'HEAD~3', rev='HEAD~2')[0] == commits[0]
+    with pytest.raises(hs.GitError):
+        hs.list_commits(root, 'missing')
+
+
+def test_object_store(repository):
+    root, _, _ = repository
+    with hs.ObjectStore(root) as store:
+        tree = store.commit_tree(git(root, 'rev-parse', 'HEAD'))
+        assert tree == git(root, 'rev-parse', 'HEAD^{tree}')
+        entries = {entry.name: entry for entry in store.tree(tree)}
+        assert entries['package'].mode == hs.TREE_MODE
+        assert store.read(entries['README.md'].sha) == ('blob', b'readme\n')
+        with pytest.raises(hs.GitError):
+            store.read('0' * 40)
+
+
+def test_summaries(repository):
+    root, package, totals = repository
+    history = hs.History(package, 'HEAD~3')
+    summaries = list(history.summaries())
+    assert [c.subject for c, _ in summaries] == [
+        'Add package', 'Add subpackage', 'Rewrite example'
+    ]
+    assert [t for _, t in summaries] == totals
+    assert history.name == 'package'
+
+
+def test_summaries_missing_package(repository):
+    root, package, _ = repository
+    git(root, 'tag', 'start', 'HEAD~3')
+    (root / 'other').mkdir()
+    (root / 'other' / '__init__.py').write_text('\n')
+    history = hs.History(root / 'other', 'start', rev='HEAD')
+    summaries = list(history.summaries())
+    assert len(summaries) == 3
+    assert all(t.source_files == 0 for _, t in summaries)
+
+
+def test_summaries_blobs_analyzed_once(repository):
+    root, package, _ = repository
+    history = hs.History(package, 'HEAD~3')
+    list(history.summaries())
+    # __init__.py, example.py (twice), sub/__init__.py and legacy.py;
+    # sub/copy.py shares the blob with the first example.py.
+    assert history.stats['commits'] == 3
+    assert history.stats['analyzed'] == 5
+    assert history.stats['errors'] == 1
+
+
+def test_summaries_cache(repository):
+    root, package, totals = repository
+    cache = ch.MemoryCache()
+    first = list(hs.History(package, 'HEAD~3', cache=cache).summaries())
+    history = hs.History(package, 'HEAD~3', cache=cache)
+    assert list(history.summaries()) == first
+    assert history.stats['analyzed'] == 1  # The legacy file isn't cached.
+    assert history.stats['cache_hits'] == 4
+
+
+def test_summaries_workers(repository):
+    root, package, totals = repository
+    history = hs.History(package, 'HEAD~3', workers=2)
+    assert [t for _, t in history.summaries()] == totals
+
+
+def test_summaries_exclude(repository):
+    root, package, _ = repository
+    exclude = ex.Exclude(['sub'], private=True)
+    history = hs.History(package, 'HEAD~3', exclude=exclude)
+    last = list(history.summaries())[-1][1]
+    assert last == pkg.Package(package, exclude=exclude).totals
+
+
+def test_run_history(repository, capsys):
+    root, package, totals = repository
+    rd.Reducto().run(['history', str(package), '--since', 'HEAD~3', '-j', '1'])
+    report = eval(capsys.readouterr().out)
+    assert list(report) == ['package']
+    # pprint sorts the commits by hash.
+    commits = [report['package'][c.sha] for c in hs.list_commits(root, 'HEAD~3')]
+    assert [c['lines'] for c in commits] == [t.lines for t in totals]
+    assert commits[-1]['subject'] == 'Rewrite example'
+
+
+def test_run_history_ndjson(repository, capsys):
+    root, package, totals = repository
+    rd.Reducto().run(
+        ['history', str(package), '--since', 'HEAD~3', '--format', 'ndjson']
+    )
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [r['type'] for r in records] == ['commit'] * 3
+    assert [r['source_files'] for r in records] == [t.source_files for t in totals]
+
+
+def test_run_history_errors(repository):
+    root, package, _ = repository
+    with pytest.raises(SystemExit):
+        rd.Reducto().run(['history', str(package)])
+    with pytest.raises(SystemExit):
+        rd.Reducto().run(['history', str(package), '--since', 'missing'])
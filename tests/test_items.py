@@ -212,4 +212,82 @@ def fun(x):
     assert it.get_docstring_lines(function_ast(func_4)) == 1
     assert it.get_docstring_lines(function_ast(func_5)) == 1
     assert it.get_docstring_lines(function_ast(func_6)) == 4
-    assert it.get_docstring_lines(function_ast(numpy_docstring_function)) == 9
\ No newline at end of file
+    assert it.get_docstring_lines(function_ast(numpy_docstring_function)) == 9
+
+def hierarchy():
+    """Items of:
+
+    1  class A:
+    2      def method(self):
+    3          # comment
+    4          def inner():
+    5              pass
+    6
+    7          return inner
+    8  # module comment
+    9  def func():
+    10     pass
+    """
+    class_a = it.ClassDef('A', start=1, end=7)
+    method = it.FunctionDef(
+        'method', start=2, end=7, qualname=it.qualified_name('method', class_a), parent=class_a
+    )
+    inner = it.FunctionDef(
+        'inner', start=4, end=5, qualname=it.qualified_name('inner', method), parent=method
+    )
+    func = it.FunctionDef('func', start=9, end=10, qualname=it.qualified_name('func', None))
+    class_a.children.append(method)
+    method.children.append(inner)
+    return class_a, method, inner, func
+
+
+def test_qualified_name():
+    class_a, method, inner, func = hierarchy()
+    assert [item.qualname for item in (class_a, method, inner, func)] == [
+        'A', 'A.method', 'A.method.<locals>.inner', 'func'
+    ]
+    assert it.qualified_name('f', it.ModuleDef()) == 'f'
+    assert inner.parent is method
+    assert inner.metrics.name == 'A.method.<locals>.inner'
+
+
+def test_len_nested():
+    class_a, method, inner, func = hierarchy()
+    # The lines of inner are counted only on inner.
+    assert len(method) == 5 - 2
+    assert len(inner) == 1
+    assert len(func) == 1
+
+
+class TestItemIndex:
+
+    @pytest.fixture()
+    def items(self):
+        return hierarchy()
+
+    def test_find(self, items):
+        class_a, method, inner, func = items
+        module = it.ModuleDef(start=1, end=10)
+        index = it.ItemIndex(items, root=module)
+        owners = [index.find(line) for line in range(0, 12)]
+        assert owners == [
+            module, class_a, method, method, inner, inner, method, method,
+            module, func, func, module
+        ]
+        assert it.ItemIndex([]).find(3) is None
+
+    def test_count(self, items):
+        class_a, method, inner, func = items
+        module = it.ModuleDef(start=1, end=10)
+        index = it.ItemIndex(reversed(items), root=module)
+        assert index.count([3, 6, 8]) == {method: 2, module: 1}
+        assert index.count([]) == {}
+        assert index.count([5, 10, 11, 12]) == {inner: 1, func: 1, module: 2}
+        assert it.ItemIndex(items).count([8, 11]) == {}
+
+    def test_same_end(self):
+        # Parent and child ending on the same line.
+        outer = it.FunctionDef('outer', start=1, end=4)
+        inner = it.FunctionDef('inner', start=3, end=4, parent=outer)
+        index = it.ItemIndex([outer, inner])
+        assert [index.find(line) for line in range(1, 6)] == [outer, outer, inner, inner, None]
@@ -0,0 +1,117 @@
+"""
+Contains tests related to reducto/merge.py
+"""
+
+import json
+
+import pytest
+
+import reducto.merge as mg
+import reducto.metrics as mt
+import reducto.package as pkg
+import reducto.reducto as rd
+import reducto.reports as rp
+
+
+def run_report(capsys, argv):
+    rd.Reducto().run(argv + ['--mergeable', '-j', '1'])
+    return eval(capsys.readouterr().out)
+
+
+def test_accumulators_as_dict():
+    totals = mt.PackageTotals(source_files=1, lines=10)
+    data = mg.accumulators_as_dict({'b.py': totals, 'a': totals}, files=['b.py'])
+    assert data == {
+        'grouped': False,
+        'percentage': False,
+        'files': ['b.py'],
+        'totals': {'b.py': totals._asdict(), 'a': totals._asdict()},
+    }
+
+
+def test_run_mergeable(sample_package, capsys):
+    report = run_report(capsys, [str(sample_package)])
+    totals = report[mg.ACCUMULATORS_KEY]['totals'][sample_package.name]
+    assert mt.PackageTotals(**totals) == pkg.Package(sample_package).totals
+    with pytest.raises(SystemExit):
+        rd.Reducto().run([str(sample_package), '--mergeable', '-f', 'ndjson'])
+
+
+@pytest.mark.parametrize('grouped', [['--ungrouped'], ['--grouped']])
+def test_merge_packages(sample_package, grouped, capsys):
+    subproj = sample_package / 'subproj'
+    pyfile = sample_package / 'pyfile.py'
+    reports = [
+        run_report(capsys, [str(subproj)] + grouped),
+        run_report(capsys, [str(sample_package / 'src' / 'ext')] + grouped),
+        run_report(capsys, [str(pyfile)] + grouped),
+    ]
+    merged = mg.merge(reports)
+    targets = [str(subproj), str(sample_package / 'src' / 'ext'), str(pyfile)]
+    expected = run_report(capsys, targets + grouped)
+    assert merged == expected
+    # The merged reports can be merged again.
+    assert mg.merge([mg.merge(reports[:2]), reports[2]]) == merged
+    assert merged[mg.ACCUMULATORS_KEY]['files'] == ['pyfile.py']
+
+
+def test_merge_exact_average():
+    # The average of the functions, not of the rounded averages of the files.
+    long_function = (mt.FunctionMetrics('foo', 1, 10, 0, 0, 0, 10),)
+    short_functions = tuple(
+        mt.FunctionMetrics(f'bar{i}', i, i, 0, 0, 0, 1) for i in range(9)
+    )
+    reports = []
+    for metrics in [
+        mt.FileMetrics('/pkg/a.py', 100, 0, 0, 90, 10, long_function),
+        mt.FileMetrics('/pkg/b.py', 10, 0, 0, 1, 9, short_functions),
+    ]:
+        totals = mt.PackageTotals().add(metrics)
+        reports.append({
+            'pkg': rp.totals_as_dict(totals),
+            mg.ACCUMULATORS_KEY: mg.accumulators_as_dict({'pkg': totals}, grouped=True),
+        })
+    merged = mg.merge(reports)
+    assert merged['pkg']['average_function_length'] == 2
+    assert merged['pkg']['source_files'] == 2
+
+
+def test_merge_errors(sample_package, capsys):
+    report = run_report(capsys, [str(sample_package), '--ungrouped'])
+    grouped = run_report(capsys, [str(sample_package)])
+    single = run_report(capsys, [str(sample_package / 'pyfile.py')])
+    with pytest.raises(mg.MergeError, match='No reports'):
+        mg.merge([])
+    with pytest.raises(mg.MergeError, match='--mergeable'):
+        mg.merge([{'package': {}}])
+    with pytest.raises(mg.MergeError, match='different options'):
+        mg.merge([report, grouped])
+    with pytest.raises(mg.MergeError, match='repeated'):
+        mg.merge([report, report])
+    with pytest.raises(mg.MergeError, match='repeated'):
+        mg.merge([single, single])
+
+
+def test_run_merge(sample_package, tmp_path, capsys):
+    paths = []
+    for i, target in enumerate(['subproj', 'pyfile.py']):
+        paths.append(tmp_path / f'report_{i}.json')
+        rd.Reducto().run(
+            [str(sample_package / target), '--mergeable', '-o', str(paths[-1])]
+        )
+    capsys.readouterr()
+    rd.Reducto().run(['merge'] + [str(path) for path in paths])
+    report = eval(capsys.readouterr().out)
+    assert report[rp.SUMMARY_KEY]['source_files'] == 4
+
+    output = tmp_path / 'merged.json'
+    rd.Reducto().run(['merge'] + [str(path) for path in paths] + ['-o', str(output)])
+    assert json.loads(output.read_text()) == report
+
+
+def test_run_merge_errors(tmp_path):
+    (tmp_path / 'invalid.json').write_text('[1, 2]')
+    with pytest.raises(SystemExit):
+        rd.Reducto().run(['merge', str(tmp_path / 'missing.json')])
+    with pytest.raises(SystemExit):
+        rd.Reducto().run(['merge', str(tmp_path / 'invalid.json')])
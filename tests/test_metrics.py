@@ -0,0 +1,119 @@
+"""
+Contains tests related to reducto/metrics.py
+"""
+
+import pickle
+
+import pytest
+
+import reducto.metrics as mt
+
+
+def sample_metrics() -> mt.FileMetrics:
+    functions = (
+        mt.FunctionMetrics('foo', 1, 5, 1, 0, 1, 2),
+        mt.FunctionMetrics('bar', 7, 12, 0, 1, 0, 3),
+    )
+    return mt.FileMetrics('/pkg/module.py', 14, 2, 1, 3, 8, functions)
+
+
+class TestFileMetrics:
+    def test_name(self):
+        assert sample_metrics().name == 'module.py'
+
+    def test_number_of_functions(self):
+        assert sample_metrics().number_of_functions == 2
+
+    def test_function_source_lines(self):
+        assert sample_metrics().function_source_lines == 5
+
+    def test_average_function_length(self):
+        assert sample_metrics().average_function_length == 2
+        assert sample_metrics()._replace(functions=()).average_function_length == 0
+
+    def test_pickle(self):
+        metrics = sample_metrics()
+        assert pickle.loads(pickle.dumps(metrics)) == metrics
+
+
+class TestPackageTotals:
+    def test_from_metrics(self):
+        totals = mt.PackageTotals.from_metrics([sample_metrics()] * 2)
+        assert totals.source_files == 2
+        assert totals.lines == 28
+        assert totals.number_of_functions == 4
+        assert totals.function_source_lines == 10
+        assert totals.average_function_length == 2
+
+    def test_add_subtract(self):
+        metrics = sample_metrics()
+        totals = mt.PackageTotals().add(metrics).add(metrics)
+        assert totals.subtract(metrics) == mt.PackageTotals.from_metrics([metrics])
+        assert totals.subtract(metrics).subtract(metrics) == mt.PackageTotals()
+
+    def test_merge(self):
+        metrics = sample_metrics()
+        totals = mt.PackageTotals.from_metrics([metrics])
+        assert totals.merge(totals) == mt.PackageTotals.from_metrics([metrics] * 2)
+        assert totals.merge(mt.PackageTotals()) == totals
+
+    def test_average_function_length_empty(self):
+        assert mt.PackageTotals().average_function_length == 0
+
+    def test_average_function_length_exact(self):
+        # Averages the functions of every file, not the averages of the files.
+        long_function = (mt.FunctionMetrics('foo', 1, 10, 0, 0, 0, 10),)
+        short_functions = tuple(
+            mt.FunctionMetrics(f'bar{i}', i, i, 0, 0, 0, 1) for i in range(9)
+        )
+        totals = mt.PackageTotals.from_metrics([
+            mt.FileMetrics('/pkg/a.py', 100, 0, 0, 90, 10, long_function),
+            mt.FileMetrics('/pkg/b.py', 10, 0, 0, 1, 9, short_functions),
+        ])
+        assert totals.average_function_length == 2
+
+
+class TestMetricsStore:
+    def sample_store(self) -> mt.MetricsStore:
+        other = mt.FileMetrics('/pkg/empty.py', 3, 0, 1, 2, 0, ())
+        return mt.MetricsStore.from_metrics([sample_metrics(), other, sample_metrics()])
+
+    def test_len(self):
+        assert len(self.sample_store()) == 3
+        assert len(mt.MetricsStore()) == 0
+
+    def test_roundtrip(self):
+        store = self.sample_store()
+        assert list(store) == [
+            sample_metrics(),
+            mt.FileMetrics('/pkg/empty.py', 3, 0, 1, 2, 0, ()),
+            sample_metrics(),
+        ]
+
+    def test_interned_paths(self):
+        store = self.sample_store()
+        assert store.paths[0] is store.paths[2]
+        assert store.function_names == ['foo', 'bar', 'foo', 'bar']
+
+    def test_columns(self):
+        store = self.sample_store()
+        assert store.file_column('lines').tolist() == [14, 3, 14]
+        assert store.file_column('first_function').tolist() == [0, 2, 2]
+        assert store.file_column('average_function_length').tolist() == [2, 0, 2]
+        assert store.function_column('file').tolist() == [0, 0, 2, 2]
+        assert store.function_column('source_lines').tolist() == [2, 3, 2, 3]
+        # The columns are stored, not copied.
+        assert store.file_column('lines') is store.file_column('lines')
+
+    def test_totals(self):
+        store = self.sample_store()
+        assert store.totals() == mt.PackageTotals.from_metrics(store)
+        assert mt.MetricsStore().totals() == mt.PackageTotals()
+
+    def test_to_numpy(self):
+        np = pytest.importorskip('numpy')
+        store = self.sample_store()
+        files, functions = store.to_numpy()
+        assert files['lines'].tolist() == [14, 3, 14]
+        assert functions['end'].tolist() == [5, 12, 5, 12]
+        assert np.shares_memory(files['lines'], np.frombuffer(store.file_column('lines'), dtype='=i8'))
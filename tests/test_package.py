@@ -3,6 +3,7 @@ Contains tests related to reducto/package.py
 """
 
 from typing import List
+from unittest import mock
 import pytest
 import pathlib
 
@@ -10,6 +11,9 @@ import reducto.package as pkg
 import reducto.src as src
 import reducto.items as it
 import reducto.reports as rp
+import reducto.metrics as mt
+import reducto.exclude as ex
+import reducto.analyzer as an
 
 
 def listdir_recursive(folder: pathlib.Path) -> List[pathlib.Path]:
@@ -73,7 +77,7 @@ class TestPackage:
 
     def test_package_docstrings(self, package):
         assert isinstance(package.docstrings, list)
-        assert all(a == b for a, b in zip(sorted(package.docstrings), [0, 0, 0, 29, 29, 29, 29]))
+        assert all(a == b for a, b in zip(sorted(package.docstrings), [0, 0, 0, 32, 32, 32, 32]))
 
     def test_package_comments(self, package):
         assert isinstance(package.blank_lines, list)
@@ -85,16 +89,16 @@ class TestPackage:
 
     def test_package_source_lines(self, package):
         assert isinstance(package.source_lines, list)
-        assert all(a == b for a, b in zip(sorted(package.source_lines), [0, 0, 0, 36, 36, 36, 36]))
+        assert all(a == b for a, b in zip(sorted(package.source_lines), [0, 0, 0, 35, 35, 35, 35]))
 
     def test_package_functions(self, package):
         assert isinstance(package.functions, list)
         assert all([isinstance(f, it.FunctionDef) or f is None for func_list in package.functions for f in func_list])
-        assert sorted(package.number_of_functions) == [0, 0, 0, 11, 11, 11, 11]
+        assert sorted(package.number_of_functions) == [0, 0, 0, 12, 12, 12, 12]
 
     def test_package_number_of_functions(self, package):
         assert isinstance(package.number_of_functions, list)
-        assert sorted(package.number_of_functions) == [0, 0, 0, 11, 11, 11, 11]
+        assert sorted(package.number_of_functions) == [0, 0, 0, 12, 12, 12, 12]
 
     def test_package_average_function_length(self, package):
         assert package.average_function_length == 3
@@ -105,3 +109,65 @@ class TestPackage:
     def test_package_report(self, package):
         report = package.report()
         assert isinstance(report, rp.PackageReport)
+
+    def test_package_metrics(self, package):
+        assert isinstance(package.metrics, list)
+        assert [m.path for m in package.metrics] == [str(f) for f in package.source_files]
+
+    def test_package_workers(self, sample_package, package):
+        parallel = pkg.Package(sample_package, workers=2)
+        assert parallel.workers == 2
+        assert parallel.metrics == package.metrics
+        assert parallel.report().report() == package.report().report()
+
+    def test_package_walks_once(self, sample_package):
+        package = pkg.Package(sample_package)
+        walk = mock.patch.object(pkg.Package, '_walk', autospec=True, side_effect=pkg.Package._walk)
+        measure = mock.patch.object(src.SourceFile, '_measure', autospec=True, side_effect=src.SourceFile._measure)
+        with walk as walked, measure as measured:
+            package.report().report(grouped=True)
+            package.report().report(grouped=False)
+            len(package), package.lines, package.blank_lines, package.docstrings
+            package.comment_lines, package.source_lines, package.number_of_functions
+            package.average_function_length, package.average_function_lengths
+        assert walked.call_count == 1
+        # The copies of the sample file and the empty files are analyzed once.
+        assert measured.call_count == 3
+
+    def test_package_paths(self, package, sample_package):
+        assert package.paths == sorted(package.paths)
+        assert package.paths == [str(f) for f in package.source_files]
+        (sample_package / '__pycache__').mkdir()
+        (sample_package / '__pycache__' / 'cached.py').write_text('\n')
+        assert len(pkg.Package(sample_package).paths) == 7
+
+    def test_package_exclude(self, sample_package, package):
+        exclude = ex.Exclude(['subproj'], dunder=True)
+        excluded = pkg.Package(sample_package, exclude=exclude)
+        assert len(excluded.paths) == 4
+        assert excluded.totals.number_of_functions == 2 * 10
+        assert package.totals.number_of_functions == 4 * 12
+
+    def test_package_shared_analyzer(self, sample_package, package):
+        with an.Analyzer(workers=2) as analyzer:
+            first = pkg.Package(sample_package, analyzer=analyzer)
+            second = pkg.Package(sample_package / 'subproj', analyzer=analyzer)
+            assert first.workers == 2
+            assert first.metrics == package.metrics
+            assert second.totals.source_files == 3
+            executor = analyzer._executor
+        assert executor is not None
+        assert first.stats['files'] == 7
+        assert second.stats['files'] == 3
+        assert analyzer.stats['files'] == 10
+
+    def test_package_store(self, package):
+        assert isinstance(package.store, mt.MetricsStore)
+        assert package.store is package.store
+        assert package.store.paths == [str(f) for f in package.source_files]
+        assert list(package.store) == package.metrics
+
+    def test_package_columns_cached(self, package):
+        assert package.blank_lines is package.blank_lines
+        assert package.totals is package.totals
+        assert len(package) == sum(package.lines)
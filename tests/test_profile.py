@@ -0,0 +1,73 @@
+"""
+Contains tests related to reducto/profile.py
+"""
+
+import json
+import os
+import pathlib
+from unittest import mock
+
+import reducto.profile as pf
+import reducto.src as src
+
+PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_DATA = os.path.join(PARENT_DIR, 'data')
+
+
+def get_sample_file(name: str) -> str:
+    return os.path.join(SAMPLE_DATA, name)
+
+
+class TestProfile:
+    def test_add(self):
+        profile = pf.Profile()
+        profile.add('parse', 1.0, 0.5, path='a.py')
+        profile.add('parse', 1.0, 0.5, path='a.py')
+        profile.add('report', 0.25, 0.25)
+        assert profile.files == {'a.py': {'parse': (2.0, 1.0)}}
+        assert profile.totals() == {'parse': (2.0, 1.0), 'report': (0.25, 0.25)}
+        assert repr(profile) == 'Profile(1 files)'
+
+    def test_phase(self):
+        profile = pf.Profile()
+        with profile.phase('read', path='a.py'):
+            pass
+        assert profile.call('parse', 'a.py', sum, [1, 2]) == 3
+        assert list(profile.files['a.py']) == ['read', 'parse']
+
+    def test_slowest(self):
+        profile = pf.Profile()
+        profile.update('fast.py', {'read': (0.1, 0.1)})
+        profile.update('slow.py', {'read': (0.5, 0.1), 'parse': (1.0, 1.0)})
+        assert profile.slowest(1) == [('slow.py', 1.5, 1.1)]
+
+    def test_table(self):
+        profile = pf.Profile()
+        profile.update('slow.py', {'read': (0.5, 0.1), 'parse': (1.0, 1.0)})
+        table = profile.table()
+        assert table.splitlines()[0].split() == ['phase', 'wall', '(s)', 'cpu', '(s)']
+        assert 'slow.py' in table
+        assert 'total' in table
+
+    def test_dump(self, tmp_path):
+        profile = pf.Profile()
+        profile.update('a.py', {'read': (0.5, 0.1)})
+        profile.dump(tmp_path / 'profile.json')
+        data = json.loads((tmp_path / 'profile.json').read_text())
+        assert data['files']['a.py']['read'] == {'wall': 0.5, 'cpu': 0.1}
+        assert data['totals']['read'] == {'wall': 0.5, 'cpu': 0.1}
+
+
+def test_source_file_profile():
+    path = pathlib.Path(get_sample_file('example.py'))
+    profile = pf.Profile()
+    metrics = src.SourceFile(path, profile=profile).metrics
+    assert metrics == src.SourceFile(path).metrics
+    assert set(profile.files[str(path)]) == set(pf.FILE_PHASES)
+
+
+def test_source_file_not_profiled():
+    path = pathlib.Path(get_sample_file('example.py'))
+    with mock.patch('reducto.profile.time') as timer:
+        src.SourceFile(path).metrics
+    timer.perf_counter.assert_not_called()
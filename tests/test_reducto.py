@@ -3,11 +3,20 @@
 Includes functional tests for Reducto app.
 """
 
+import gzip
+import io
+import json
+import pathlib
+import subprocess
+import sys
 from unittest import mock
 
 import pytest
 
 import reducto.reducto as rd
+import reducto.state as st
+import reducto.reports as rp
+from tests.conftest import TABULATE_MISSING
 
 
 class TestReducto:
@@ -20,19 +29,19 @@ class TestReducto:
         report = app._report_source_file(source_file_one_function)
         assert isinstance(report, dict)
 
-    @pytest.mark.skipif(rd.rp.tabulate is None, reason='Tabulate is not installed.')
+    @pytest.mark.skipif(TABULATE_MISSING, reason='Tabulate is not installed.')
     def test_report_source_file_report_tabulate(self, app, source_file_one_function):
         app._parse_args(['--format', 'plain'])
         report = app._report_source_file(source_file_one_function)
         assert isinstance(report, str)
 
-    @pytest.mark.skipif(rd.rp.tabulate is None, reason='Tabulate is not installed.')
+    @pytest.mark.skipif(TABULATE_MISSING, reason='Tabulate is not installed.')
     def test_report_package_report_json(self, app, sample_package):
         app._parse_args(['--format', 'json'])
         report = app._report_package(sample_package)
         assert isinstance(report, dict)
 
-    @pytest.mark.skipif(rd.rp.tabulate is None, reason='Tabulate is not installed.')
+    @pytest.mark.skipif(TABULATE_MISSING, reason='Tabulate is not installed.')
     def test_report_package_report_tabulate(self, app, sample_package):
         app._parse_args(['--format', 'plain'])
         report = app._report_package(sample_package)
@@ -48,9 +57,159 @@ class TestReducto:
         report = app.report()
         assert isinstance(report, dict)
 
-    @pytest.mark.skipif(rd.rp.tabulate is None, reason='Tabulate is not installed.')
+    @pytest.mark.skipif(TABULATE_MISSING, reason='Tabulate is not installed.')
     def test_run(self, app, sample_package):
         app.run([str(sample_package), '--format', 'json'])
         app.run([str(sample_package), '--format', 'plain'])
         with pytest.raises(SystemExit):
             app.run([str(sample_package), '--format', 'undefined_format'])
+
+    def test_report_package_incremental(self, app, sample_package, tmp_path):
+        previous = tmp_path / 'reducto_report.json'
+        app._parse_args([str(sample_package), '--incremental', str(previous)])
+        report = app.report()
+        assert report[st.STATE_KEY]['package'] == sample_package.name
+        with open(previous, 'w') as f:
+            json.dump(report, f)
+
+        app._parse_args([str(sample_package), '--incremental', str(previous)])
+        assert app.report() == report
+
+    def test_run_incremental_format(self, app, sample_package, tmp_path):
+        with pytest.raises(SystemExit):
+            app.run([str(sample_package), '--format', 'plain', '--incremental', str(tmp_path)])
+
+    def test_run_ndjson(self, app, sample_package, tmp_path):
+        output = tmp_path / 'report.ndjson.gz'
+        app.run([str(sample_package), '--format', 'ndjson', '-o', str(output)])
+        with gzip.open(output, 'rt') as f:
+            records = [json.loads(line) for line in f]
+        assert len(records) == 8
+        assert records[-1]['type'] == 'summary'
+
+    def test_run_compress_format(self, app, sample_package):
+        with pytest.raises(SystemExit):
+            app.run([str(sample_package), '--compress', 'gzip'])
+
+    def test_report_package_exclude(self, app, sample_package):
+        app._parse_args([str(sample_package), '--exclude', 'subproj', '-e', 'ext.py', '--exclude-dunder'])
+        report = app.report()[sample_package.name]
+        assert report['source_files'] == 3
+        assert report['number_of_functions'] == 10
+
+    def test_report_source_exclude(self, app):
+        source = str(pathlib.Path(__file__).parent / 'data' / 'example.py')
+        app._parse_args([source, '--exclude-private', '--exclude-dunder'])
+        assert app.report()['example.py']['number_of_functions'] == 9
+
+    def test_report_targets(self, app, sample_package):
+        source = str(pathlib.Path(__file__).parent / 'data' / 'example.py')
+        app._parse_args([str(sample_package), str(sample_package / 'subproj'), source])
+        report = app.report()
+        assert list(report) == [sample_package.name, 'subproj', 'example.py', rp.SUMMARY_KEY]
+        summary = report[rp.SUMMARY_KEY]
+        assert summary['source_files'] == 7 + 3 + 1
+        assert summary['lines'] == sum(r['lines'] for r in list(report.values())[:-1])
+
+    def test_report_targets_repeated_name(self, app, sample_package):
+        app._parse_args([str(sample_package), str(sample_package)])
+        report = app.report()
+        assert list(report) == [sample_package.name, str(sample_package), rp.SUMMARY_KEY]
+
+    @pytest.mark.skipif(TABULATE_MISSING, reason='Tabulate is not installed.')
+    def test_report_targets_tabulate(self, app, sample_package):
+        app._parse_args([str(sample_package), str(sample_package / 'subproj'), '--format', 'plain'])
+        assert rp.SUMMARY_KEY in app.report()
+
+    def test_report_manifest(self, app, sample_package, tmp_path):
+        manifest = tmp_path / 'targets.txt'
+        manifest.write_text(f'# packages\n\n{sample_package}\n{sample_package / "subproj"}\n')
+        assert rd.read_manifest(manifest) == [sample_package, sample_package / 'subproj']
+        app._parse_args(['--manifest', str(manifest)])
+        assert app.report()[rp.SUMMARY_KEY]['source_files'] == 10
+
+    def test_run_manifest_read_once(self, app, sample_package, tmp_path, capsys):
+        manifest = tmp_path / 'targets.txt'
+        manifest.write_text(f'{sample_package}\n{sample_package / "subproj"}\n')
+        with mock.patch.object(rd, 'read_manifest', wraps=rd.read_manifest) as read:
+            app.run(['--manifest', str(manifest), '-f', 'ndjson'])
+        read.assert_called_once_with(manifest)
+        assert rp.SUMMARY_KEY in capsys.readouterr().out
+
+    def test_run_ndjson_targets(self, app, sample_package, tmp_path):
+        output = tmp_path / 'report.ndjson'
+        app.run([str(sample_package), str(sample_package / 'subproj'), '-f', 'ndjson', '-o', str(output)])
+        records = [json.loads(line) for line in output.read_text().splitlines()]
+        assert len(records) == 8 + 4 + 1
+        assert records[-1]['name'] == rp.SUMMARY_KEY
+        assert records[-1]['source_files'] == 10
+
+    def test_run_incremental_targets(self, app, sample_package, tmp_path):
+        with pytest.raises(SystemExit):
+            app.run([str(sample_package), str(sample_package), '--incremental', str(tmp_path / 'r.json')])
+
+    def test_run_profile(self, app, sample_package, tmp_path, capsys):
+        output = tmp_path / 'profile.json'
+        app.run([str(sample_package), '--profile', '--profile-output', str(output)])
+        assert 'slowest files' in capsys.readouterr().err
+        data = json.loads(output.read_text())
+        # Only the distinct contents are analyzed.
+        assert len(data['files']) == 3
+        assert 'report' in data['totals']
+        app._parse_args([str(sample_package)])
+        assert app.profile is None
+
+
+def test_startup_imports(tmp_path):
+    # The modules of other formats and modes are not imported by a plain run.
+    sample = tmp_path / 'sample.py'
+    sample.write_text('def foo():\n    return\n')
+    code = (
+        'import sys, reducto; reducto.main(sys.argv[1:]); '
+        'print([m for m in ("tabulate", "asyncio", "multiprocessing", "socket", "gzip", "tempfile")'
+        ' if m in sys.modules])'
+    )
+    output = subprocess.check_output(
+        [sys.executable, '-c', code, str(sample), '-f', 'json'], text=True
+    )
+    assert output.splitlines()[-1] == '[]'
+
+
+def test_main_version(capsys):
+    import reducto
+    reducto.main(['--version'])
+    assert capsys.readouterr().out == f'reducto {reducto.__version__}\n'
+    reducto.main(['-v'])
+    assert capsys.readouterr().out == f'reducto {reducto.__version__}\n'
+    assert reducto.analyze_async is reducto.aio.analyze_async
+    with pytest.raises(AttributeError):
+        reducto.missing
+
+
+def test_run_stdin(monkeypatch, capsys):
+    def stdin(content):
+        monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BytesIO(content)))
+
+    stdin(b'def foo():\n    # Comment.\n    return 1\n')
+    rd.Reducto().run(['-', '--stdin-name', 'buffer.py'])
+    report = eval(capsys.readouterr().out)
+    assert report['buffer.py']['lines'] == 3
+    assert report['buffer.py']['comment_lines'] == 1
+
+    # Same report through a shared analyzer (like the daemon).
+    stdin(b'x = 1\n')
+    with rd.an.Analyzer() as analyzer:
+        rd.Reducto(analyzer=analyzer).run(['-', '-f', 'ndjson'])
+        assert analyzer.stats['analyzed'] == 1
+    record = json.loads(capsys.readouterr().out.splitlines()[-1])
+    assert record['name'] == 'stdin.py'
+
+
+@pytest.mark.parametrize('args', [
+    ['.'],
+    ['--watch'],
+    ['--shard', '1/2'],
+])
+def test_run_stdin_errors(args):
+    with pytest.raises(SystemExit):
+        rd.Reducto().run(['-'] + args)
@@ -3,6 +3,10 @@ Contains the tests for reports module.
 """
 
 import pytest
+import gzip
+import io
+import json
+import lzma
 import os
 import pathlib
 from unittest import mock
@@ -11,6 +15,7 @@ from unittest.mock import PropertyMock
 import reducto.reports as rp
 import reducto.src as src
 import reducto.package as pkg
+from tests.conftest import TABULATE_MISSING
 
 
 PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -52,24 +57,24 @@ class TestModuleReport:
         assert isinstance(report_dict, dict)
         assert isinstance(report_dict['example.py'], dict)
         assert report_dict['example.py']['lines'] == 128
-        assert report_dict['example.py']['number_of_functions'] == 11
+        assert report_dict['example.py']['number_of_functions'] == 12
         assert report_dict['example.py']['average_function_length'] == 3
-        assert report_dict['example.py']['docstring_lines'] == 29
+        assert report_dict['example.py']['docstring_lines'] == 32
         assert report_dict['example.py']['blank_lines'] == 32
         assert report_dict['example.py']['comment_lines'] == 3
-        assert report_dict['example.py']['source_lines'] == 64
+        assert report_dict['example.py']['source_lines'] == 61
 
     def test_as_dict_percentage(self, reporter):
         report_dict = reporter._as_dict(percentage=True)
         assert isinstance(report_dict, dict)
         assert isinstance(report_dict['example.py'], dict)
         assert report_dict['example.py']['lines'] == 128
-        assert report_dict['example.py']['number_of_functions'] == 11
+        assert report_dict['example.py']['number_of_functions'] == 12
         assert report_dict['example.py']['average_function_length'] == 3
-        assert report_dict['example.py']['docstring_lines'] == '23%'
+        assert report_dict['example.py']['docstring_lines'] == '25%'
         assert report_dict['example.py']['blank_lines'] == '25%'
         assert report_dict['example.py']['comment_lines'] == '2%'
-        assert report_dict['example.py']['source_lines'] == '50%'
+        assert report_dict['example.py']['source_lines'] == '48%'
 
 
 class TestPackageReport:
@@ -100,13 +105,13 @@ class TestPackageReport:
         assert name == reporter.package.name
         info = report[name]
         assert info['lines'] == 514
-        assert info['docstring_lines'] == 116
+        assert info['docstring_lines'] == 128
         assert info['comment_lines'] == 12
         assert info['blank_lines'] == 130
         # info['source_lines'] == 513
         assert info['source_files'] == 7
-        assert info['source_lines'] == 256
-        assert info['number_of_functions'] == 44
+        assert info['source_lines'] == 244
+        assert info['number_of_functions'] == 48
         assert info['average_function_length'] == 3
 
     def test_report_grouped_percentage(self, reporter):
@@ -118,12 +123,12 @@ class TestPackageReport:
         info = report[name]
         print(info)
         assert info['lines'] == 514
-        assert info['docstring_lines'] == '23%'
+        assert info['docstring_lines'] == '25%'
         assert info['comment_lines'] == '2%'
         assert info['blank_lines'] == '25%'
         assert info['source_files'] == 7
-        assert info['source_lines'] == '50%'
-        assert info['number_of_functions'] == 44
+        assert info['source_lines'] == '47%'
+        assert info['number_of_functions'] == 48
         assert info['average_function_length'] == 3
 
     def test_report_ungrouped(self, reporter):
@@ -137,12 +142,12 @@ class TestPackageReport:
         # Only tested one source file
         assert example
         assert example['lines'] == 128
-        assert example['number_of_functions'] == 11
+        assert example['number_of_functions'] == 12
         assert example['average_function_length'] == 3
-        assert example['docstring_lines'] == 29
+        assert example['docstring_lines'] == 32
         assert example['blank_lines'] == 32
         assert example['comment_lines'] == 3
-        assert example['source_lines'] == 64
+        assert example['source_lines'] == 61
 
     def test_report_relpaths(self, reporter):
         report = reporter.report(grouped=False)
@@ -163,7 +168,7 @@ class TestPackageReport:
     def test_columns(self, reporter):
         assert len(reporter.columns) == 8
 
-    @pytest.mark.skipif(rp.tabulate is None, reason='Tabulate is not installed.')
+    @pytest.mark.skipif(TABULATE_MISSING, reason='Tabulate is not installed.')
     def test_table_grouped(self, reporter):
         report = {
             "reducto": {
@@ -192,7 +197,7 @@ class TestPackageReport:
             ])
             assert table == expected
 
-    @pytest.mark.skipif(rp.tabulate is None, reason='Tabulate is not installed.')
+    @pytest.mark.skipif(TABULATE_MISSING, reason='Tabulate is not installed.')
     def test_table_ungrouped(self, reporter):
         report = {'reducto': {'reducto/__init__.py': {'average_function_length': 0,
                                      'blank_lines': 2,
@@ -272,7 +277,7 @@ class TestPackageReport:
             ])
             assert table == expected
 
-    @pytest.mark.skipif(rp.tabulate is None, reason='Tabulate is not installed.')
+    @pytest.mark.skipif(TABULATE_MISSING, reason='Tabulate is not installed.')
     def test_report_table(self, reporter):
         # Test in this point is only done for a str and one of the column names in
         # the table.
@@ -280,6 +285,25 @@ class TestPackageReport:
         assert isinstance(table, str)
         assert 'lines' in table
 
+    def test_report_ndjson(self, reporter):
+        lines = reporter.report(fmt=rp.ReportFormat.NDJSON).splitlines()
+        records = [json.loads(line) for line in lines]
+        assert len(records) == 8
+        ungrouped = reporter.report(grouped=False)[reporter.name]
+        for record in records[:-1]:
+            assert record.pop('type') == 'file'
+            assert record == ungrouped[record.pop('name')]
+        summary = records[-1]
+        assert summary.pop('type') == 'summary'
+        assert summary.pop('name') == reporter.name
+        assert summary == reporter.report(grouped=True)[reporter.name]
+
+    def test_stream_percentage(self, reporter):
+        stream = io.StringIO()
+        reporter.stream(stream, percentage=True)
+        summary = json.loads(stream.getvalue().splitlines()[-1])
+        assert summary['docstring_lines'] == '25%'
+
     @pytest.mark.skip('NOT IMPLEMENTED')
     def test_report_package_void(self, reporter):
         # Test a package without content
@@ -291,6 +315,43 @@ class TestPackageReport:
         assert 1 == 0
 
 
+class TestSourceReportStream:
+    def test_report_ndjson(self):
+        src_file = src.SourceFile(pathlib.Path(get_sample_file('example.py')))
+        lines = src_file.report().report(fmt=rp.ReportFormat.NDJSON).splitlines()
+        record, summary = [json.loads(line) for line in lines]
+        assert record['name'] == 'example.py'
+        assert record['lines'] == 128
+        assert summary['type'] == 'summary'
+        assert summary['source_files'] == 1
+
+
+@pytest.mark.parametrize('suffix, opener', [('.ndjson', open), ('.ndjson.gz', gzip.open), ('.ndjson.xz', lzma.open)])
+def test_open_report_stream(tmp_path, suffix, opener):
+    output = tmp_path / ('report' + suffix)
+    with rp.open_report_stream(output) as fp:
+        fp.write('{}\n')
+    with opener(output, 'rt') as f:
+        assert f.read() == '{}\n'
+
+
+def test_open_report_stream_compression(tmp_path):
+    output = tmp_path / 'report.ndjson'
+    with rp.open_report_stream(output, compression='gzip') as fp:
+        fp.write('{}\n')
+    with gzip.open(output, 'rt') as f:
+        assert f.read() == '{}\n'
+    with pytest.raises(ValueError):
+        with rp.open_report_stream(output, compression='zip'):
+            pass
+
+
+def test_open_report_stream_stdout(capsys):
+    with rp.open_report_stream() as fp:
+        fp.write('{}\n')
+    assert capsys.readouterr().out == '{}\n'
+
+
 def test_column_split():
     columns = [
         "lines",
@@ -313,3 +374,8 @@ def test_column_split():
     splitted = rp.column_split(columns)
 
     assert expected == splitted
+
+
+def test_as_percentage():
+    assert rp.as_percentage(29, 128) == '23%'
+    assert rp.as_percentage(0, 0) == '0%'
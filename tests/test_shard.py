@@ -0,0 +1,143 @@
+"""
+Contains tests related to reducto/shard.py
+"""
+
+import shutil
+
+import pytest
+
+import reducto.merge as mg
+import reducto.package as pkg
+import reducto.reducto as rd
+import reducto.shard as sh
+
+
+@pytest.mark.parametrize('text, shard', [
+    ('1/1', sh.Shard(1, 1)),
+    ('3/16', sh.Shard(3, 16)),
+])
+def test_shard_parse(text, shard):
+    assert sh.Shard.parse(text) == shard
+    assert str(shard) == text
+    assert text == f'{shard.number}/{shard.total}'
+
+
+@pytest.mark.parametrize('text', ['1', '0/2', '3/2', 'a/2', '1/'])
+def test_shard_parse_invalid(text):
+    with pytest.raises(ValueError):
+        sh.Shard.parse(text)
+
+
+def test_partition():
+    sizes = [100] * 4 + [10] * 8 + [1] * 3
+    files = [(f'pkg/file_{i}.py', size) for i, size in enumerate(sizes)]
+    shards = sh.partition(files, 4)
+    assert shards == sh.partition(files, 4)
+    loads = [0] * 4
+    for (_, size), shard in zip(files, shards):
+        loads[shard] += size
+    assert max(loads) - min(loads) <= 1
+    # The order of the files doesn't change the shards.
+    reordered = sh.partition(files[::-1], 4)
+    assert reordered[::-1] == shards
+
+
+def test_partition_more_shards_than_files():
+    assert sorted(sh.partition([('a.py', 1), ('b.py', 2)], 4)) == [0, 1]
+    assert sh.partition([], 3) == []
+
+
+def test_select(sample_package, tmp_path):
+    package = pkg.Package(sample_package)
+    selected = [
+        sh.select(package.paths, str(sample_package), sh.Shard(i, 3))
+        for i in range(1, 4)
+    ]
+    assert sorted(sum(selected, [])) == sorted(package.paths)
+    assert all(len(paths) > 0 for paths in selected)
+
+    # The shards don't depend on the location of the package.
+    copy = shutil.copytree(sample_package, tmp_path / 'copy')
+    copy_package = pkg.Package(copy)
+    relnames = [
+        [package.relname(p).partition('/')[2] for p in paths] for paths in selected
+    ]
+    for i, names in enumerate(relnames, 1):
+        paths = sh.select(copy_package.paths, str(copy), sh.Shard(i, 3))
+        assert [copy_package.relname(p).partition('/')[2] for p in paths] == names
+
+
+def test_package_shard(sample_package):
+    shards = [pkg.Package(sample_package, shard=sh.Shard(i, 2)) for i in (1, 2)]
+    assert shards[0].shard == sh.Shard(1, 2)
+    totals = shards[0].totals.merge(shards[1].totals)
+    assert totals == pkg.Package(sample_package).totals
+
+
+def shard_report(package, grouped=False):
+    report = package.report().report(grouped=grouped)
+    report[sh.SHARD_KEY] = sh.shard_as_dict(package.shard, package.name)
+    report[mg.ACCUMULATORS_KEY] = mg.accumulators_as_dict(
+        {package.name: package.totals}, grouped=grouped
+    )
+    return report
+
+
+@pytest.mark.parametrize('grouped', [False, True])
+def test_combine(sample_package, grouped):
+    reports = [
+        shard_report(pkg.Package(sample_package, shard=sh.Shard(i, 3)), grouped)
+        for i in (1, 2, 3)
+    ]
+    package = pkg.Package(sample_package)
+    expected = package.report().report(grouped=grouped)
+    combined = sh.combine(reports)
+    assert mg.ACCUMULATORS_KEY in combined
+    del combined[mg.ACCUMULATORS_KEY]
+    assert combined == expected
+    assert sh.combine(reports[::-1])[package.name] == expected[package.name]
+
+
+def test_combine_errors(sample_package):
+    def report(shard, grouped=False):
+        package = pkg.Package(sample_package, shard=sh.Shard.parse(shard))
+        return shard_report(package, grouped)
+
+    with pytest.raises(sh.ShardError, match='No reports'):
+        sh.combine([])
+    with pytest.raises(sh.ShardError, match='--shard'):
+        sh.combine([{'package': {}}])
+    with pytest.raises(sh.ShardError, match='Missing shards: 2/3'):
+        sh.combine([report('1/3'), report('3/3')])
+    with pytest.raises(sh.ShardError, match='repeated'):
+        sh.combine([report('1/2'), report('1/2')])
+    with pytest.raises(sh.ShardError, match='different runs'):
+        sh.combine([report('1/2'), report('2/3')])
+    with pytest.raises(sh.ShardError, match='different options'):
+        sh.combine([report('1/2'), report('2/2', grouped=True)])
+
+
+def test_run_shard(sample_package, capsys):
+    reports = []
+    for i in (1, 2):
+        rd.Reducto().run(
+            [str(sample_package), '--shard', f'{i}/2', '--ungrouped', '-j', '1']
+        )
+        reports.append(eval(capsys.readouterr().out))
+    assert reports[0][sh.SHARD_KEY]['shard'] == '1/2'
+    rd.Reducto().run([str(sample_package), '--mergeable', '--ungrouped', '-j', '1'])
+    assert sh.combine(reports) == eval(capsys.readouterr().out)
+
+
+@pytest.mark.parametrize('args', [
+    ['--format', 'ndjson'],
+    ['--incremental', 'report.json'],
+    ['--watch'],
+    ['--shard', '3/2'],
+])
+def test_run_shard_errors(sample_package, args):
+    argv = [str(sample_package), '--shard', '1/2'] + args
+    with pytest.raises(SystemExit):
+        rd.Reducto().run(argv)
+    with pytest.raises(SystemExit):
+        rd.Reducto().run([str(sample_package / 'pyfile.py'), '--shard', '1/2'])
@@ -7,9 +7,11 @@ import pathlib
 import pytest
 import ast
 import tokenize
+from unittest import mock
 
 import reducto.src as src
 import reducto.items as it
+import reducto.metrics as mt
 import reducto.reports as rp
 
 PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -45,7 +47,7 @@ class TestSourceVisitor:
         assert repr(visitor) == 'SourceVisitor'
 
     def test_len_items(self, visitor):
-        assert len(visitor.items) == 11
+        assert len(visitor.items) == 13
 
     def test_visit_FunctionDef(self, visitor):
         ast_tree = ast_parsed()
@@ -65,6 +67,27 @@ class TestSourceVisitor:
     def test_functions(self, visitor):
         assert all((isinstance(item, it.FunctionDef) for item in visitor.functions))
 
+    def test_hierarchy(self):
+        visitor = src.SourceVisitor()
+        visitor.visit(ast_parsed())
+        assert [item.qualname for item in visitor.items[2:6]] == [
+            'nested_func', 'nested_func.<locals>._inner_func', 'SampleClass',
+            'SampleClass.__init__',
+        ]
+        nested, inner, sample_class = visitor.items[2:5]
+        assert inner.parent is nested and nested.children == [inner]
+        assert isinstance(sample_class, it.ClassDef)
+        assert len(sample_class.children) == 8
+        assert visitor.classes == [sample_class]
+
+    def test_index(self):
+        visitor = src.SourceVisitor()
+        visitor.visit(ast_parsed())
+        assert visitor.index.find(31).qualname == 'nested_func.<locals>._inner_func'
+        assert visitor.index.find(32).qualname == 'nested_func'
+        assert visitor.index.find(44).qualname == 'SampleClass'
+        assert visitor.index.find(36) is visitor.module
+
     def test_register_elements(self, visitor):
         content = {'comments': [1, 4, 5, 6, 22], 'blank_lines': [12, 46]}
 
@@ -215,22 +238,151 @@ class TestSourceFile:
 
     def test_functions(self, src_):
         funcs = src_.functions
-        assert len(funcs) == 11
+        assert len(funcs) == 12
         assert all(isinstance(f, it.FunctionDef) for f in funcs)
 
+    def test_module(self, src_):
+        module = src_.module
+        assert isinstance(module, it.ModuleDef)
+        assert module.docstrings == 3
+        assert module.comments == 2
+        assert module.blank_lines == 16
+        lines = [*src_.functions, *src_.classes, module]
+        assert sum(item.comments for item in lines) == src_.comment_lines
+        assert sum(item.blank_lines for item in lines) == src_.blank_lines
+
+    def test_nested_functions(self, src_):
+        functions = {f.name: f for f in src_.metrics.functions}
+        nested = functions['nested_func']
+        inner = functions['nested_func.<locals>._inner_func']
+        assert (nested.blank_lines, nested.source_lines) == (2, 2)
+        assert (inner.blank_lines, inner.source_lines) == (0, 1)
+
     def test_module_docstrings(self, src_):
         assert src_.module_docstrings == 3
 
     def test_total_docstrings(self, src_):
         func_docs = sum([f.docstrings for f in src_.functions])
-        assert src_.total_docstrings == src_.module_docstrings + func_docs
-        assert src_.total_docstrings == 29
+        class_docs = sum([c.docstrings for c in src_.classes])
+        assert src_.total_docstrings == src_.module_docstrings + func_docs + class_docs
+        assert src_.total_docstrings == 32
 
     def test_source_lines(self, src_):
         source_lines = len(src_) - src_.total_docstrings \
                        - src_.comment_lines - src_.blank_lines
         assert src_.source_lines == source_lines
 
+    def test_metrics(self, src_):
+        metrics = src_.metrics
+        assert isinstance(metrics, mt.FileMetrics)
+        assert metrics.path == str(src_)
+        assert metrics.lines == 128
+        assert metrics.docstrings == 32
+        assert metrics.comment_lines == 3
+        assert metrics.blank_lines == 32
+        assert metrics.source_lines == 61
+        assert metrics.functions == tuple(f.metrics for f in src_.functions)
+
+    def test_metrics_computed_once(self):
+        source = src.SourceFile(pathlib.Path(get_sample_file('example.py')))
+        with mock.patch('ast.get_docstring', wraps=ast.get_docstring) as get_docstring:
+            source.report().report()
+            calls = get_docstring.call_count
+            assert calls == 14  # Module, functions and classes, once each.
+            len(source), source.total_docstrings, source.source_lines
+            source.module_docstrings, source.report().report()
+            assert get_docstring.call_count == calls
+
+    def test_lean(self, src_):
+        source = src.SourceFile(pathlib.Path(get_sample_file('example.py')), lean=True)
+        with mock.patch.object(
+            src.SourceFile, 'tokens', new_callable=mock.PropertyMock
+        ) as tokens:
+            assert source.metrics == src_.metrics
+            tokens.assert_not_called()  # Never materialized.
+        assert source._lines is None
+        assert source._ast is None
+        assert source._source_visitor is None
+        # The content is read again if required.
+        assert len(source.functions) == len(src_.functions)
+
+    def test_release(self, src_):
+        source = src.SourceFile(pathlib.Path(get_sample_file('example.py')))
+        metrics = source.metrics
+        assert source._ast is not None
+        source.release()
+        assert source._ast is None and source._lines is None
+        assert source.metrics is metrics
+        assert source.comment_lines_positions == src_.comment_lines_positions
+
+    def test_source(self, src_):
+        source = src.SourceFile(pathlib.Path(get_sample_file('example.py')), lean=True)
+        assert isinstance(source.source, bytes)
+        assert source.encoding == 'utf-8'
+        source.metrics
+        assert source._source is None
+
+    def test_source_content(self, src_):
+        content = pathlib.Path(get_sample_file('example.py')).read_bytes()
+        source = src.SourceFile(pathlib.Path('missing/example.py'), source=content)
+        assert source.metrics[1:] == src_.metrics[1:]
+        assert source.lines == src_.lines
+        with pytest.raises(src.SourceFileError):
+            src.SourceFile(pathlib.Path('example.txt'), source=content)
+
+    def test_from_source(self, src_):
+        text = ''.join(src_.lines)
+        for source in (text, text.encode()):
+            source_file = src.SourceFile.from_source(source, name='buffer.py')
+            assert source_file.name == 'buffer.py'
+            assert source_file.metrics[1:] == src_.metrics[1:]
+        assert src.SourceFile.from_source(text).name == src.SOURCE_NAME
+        with pytest.raises(src.SourceFileError):
+            src.SourceFile.from_source(text, name='buffer')
+
+    def test_mmap(self, src_):
+        with mock.patch.object(src, 'MMAP_THRESHOLD', 0):
+            source = src.SourceFile(pathlib.Path(get_sample_file('example.py')))
+            assert isinstance(source.source, src.mmap.mmap)
+            assert source.metrics == src_.metrics
+            assert source.lines == src_.lines
+            mapped = source.source
+            source.release()
+            assert mapped.closed
+
+    @pytest.mark.parametrize('newline', ['\r\n', '\r'])
+    @pytest.mark.parametrize('mmap_threshold', [src.MMAP_THRESHOLD, 0])
+    def test_line_endings(self, src_, tmp_path, newline, mmap_threshold):
+        # Same metrics with windows and old Mac line endings.
+        content = ''.join(src_.lines)
+        path = tmp_path / 'example.py'
+        path.write_bytes(content.replace('\n', newline).encode())
+        with mock.patch.object(src, 'MMAP_THRESHOLD', mmap_threshold):
+            metrics = src.SourceFile(path).metrics
+        assert metrics._replace(path='', functions=()) == \
+            src_.metrics._replace(path='', functions=())
+        assert [f[1:] for f in metrics.functions] == [f[1:] for f in src_.metrics.functions]
+
+    def test_line_endings_mixed(self):
+        source = b'def foo():\r    """Doc."""\r\n    # Comment.\n\r    return 1\r'
+        metrics = src.SourceFile.from_source(source).metrics
+        assert metrics[1:5] == (5, 1, 1, 1)
+        assert metrics.functions[0][1:3] == (1, 5)
+
+    @pytest.mark.parametrize('header', [b'# -*- coding: latin-1 -*-\n', src.UTF8_BOM])
+    def test_encodings(self, src_, tmp_path, header):
+        content = ''.join(src_.lines).replace('Module level', 'M\u00f3dulo level')
+        path = tmp_path / 'example.py'
+        encoding = 'latin-1' if header.startswith(b'#') else 'utf-8'
+        path.write_bytes(header + content.encode(encoding))
+        source = src.SourceFile(path)
+        assert source.encoding == ('iso-8859-1' if encoding == 'latin-1' else 'utf-8-sig')
+        assert 'M\u00f3dulo' in ''.join(source.lines)
+        offset = 1 if header.startswith(b'#') else 0
+        assert source.metrics.lines == src_.metrics.lines + offset
+        assert source.metrics.comment_lines == src_.metrics.comment_lines + offset
+        assert len(source.tokens) == len(src_.tokens) + 2 * offset
+
     def test_report_dict(self, src_):
         report = src_.report()
         assert isinstance(report, rp.SourceReport)
@@ -257,3 +409,48 @@ class TestSourceFile:
         assert report['one_function.py']['average_function_length'] == 1
         assert report['one_function.py']['docstring_lines'] == 0
         assert report['one_function.py']['blank_lines'] == 1
+
+
+@pytest.mark.parametrize('source, expected', [
+    (b'import os\n', True),
+    (b'', True),
+    (b'#!/usr/bin/env python\n# -*- coding: utf-8 -*-\n', False),
+    (b'# vim: set fileencoding=latin-1 :\n', False),
+    (b'import os\n\n# coding: latin-1\n', True),  # Only the first two lines.
+    (src.UTF8_BOM + b'import os\n', False),
+])
+def test_is_plain_utf8(source, expected):
+    assert src.is_plain_utf8(source) is expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('x = "\u00f1"\n', 'x = "\u00f1"\n'.encode()),
+    ('# -*- coding: latin-1 -*-\nx = "\u00f1"\n', b'# -*- coding: latin-1 -*-\nx = "\xf1"\n'),
+    ('\ufeffx = 1\n', src.UTF8_BOM + b'x = 1\n'),
+])
+def test_encode_source(text, expected):
+    assert src.encode_source(text) == expected
+    # Decoded back to the same text.
+    assert ''.join(src.SourceFile.from_source(text).lines) == text.lstrip('\ufeff')
+
+
+@pytest.mark.parametrize('source, expected', [
+    (b'x = 1\n', b'x = 1\n'),
+    (b'x = 1\r\ny = 2\r\n', b'x = 1\r\ny = 2\r\n'),
+    (b'x = 1\ry = 2\r', b'x = 1\ny = 2\n'),
+    (b'x = 1\r\ny = 2\r', b'x = 1\ny = 2\n'),
+])
+def test_normalize_newlines(source, expected):
+    assert src.normalize_newlines(source) == expected
+
+
+def test_read_source(tmp_path):
+    path = tmp_path / 'file.py'
+    path.write_bytes(b'x = 1\n')
+    assert src.read_source(path) == b'x = 1\n'
+    with mock.patch.object(src, 'MMAP_THRESHOLD', 1):
+        mapped = src.read_source(path)
+        assert isinstance(mapped, src.mmap.mmap)
+        assert mapped[:] == b'x = 1\n'
+        mapped.close()
+
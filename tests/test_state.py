@@ -0,0 +1,94 @@
+"""
+Contains tests related to reducto/state.py
+"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+import reducto as rd
+import reducto.metrics as mt
+import reducto.package as pkg
+import reducto.state as st
+
+
+def write_state(package: pkg.Package, report_path) -> None:
+    report = package.report().report()
+    report[st.STATE_KEY] = package.state().as_dict()
+    with open(report_path, 'w') as f:
+        json.dump(report, f)
+
+
+@pytest.fixture()
+def report_path(sample_package, tmp_path):
+    path = tmp_path / 'reducto_report.json'
+    write_state(pkg.Package(sample_package), path)
+    return path
+
+
+class TestPackageState:
+    def test_empty(self):
+        state = st.PackageState('name')
+        assert state.files == {}
+        assert state.totals == mt.PackageTotals()
+        assert repr(state) == 'PackageState(name)'
+
+    def test_load(self, report_path, sample_package):
+        state = st.PackageState.load(report_path, sample_package.name)
+        assert state.name == sample_package.name
+        assert len(state.files) == 7
+        assert state.totals == pkg.Package(sample_package).totals
+        name = sample_package.name
+        metrics = state.files[os.path.join(name, 'pyfile.py')]['metrics']
+        assert isinstance(metrics, mt.FileMetrics)
+        assert metrics.path == os.path.join(name, 'pyfile.py')
+
+    def test_load_other_package(self, report_path):
+        assert st.PackageState.load(report_path, 'other') is None
+
+    def test_load_missing(self, tmp_path):
+        assert st.PackageState.load(tmp_path / 'missing.json', 'name') is None
+
+    def test_from_dict_version(self, report_path, sample_package):
+        state = st.PackageState.load(report_path, sample_package.name)
+        data = json.loads(json.dumps(state.as_dict()))
+        assert st.PackageState.from_dict(data).totals == state.totals
+        data['version'] = rd.__version__ + '.dev'
+        assert st.PackageState.from_dict(data) is None
+
+    def test_cache(self, report_path, sample_package):
+        state = st.PackageState.load(report_path, sample_package.name)
+        cache = state.cache(sample_package.parent)
+        path = str(sample_package / 'pyfile.py')
+        assert cache.entries[path]['metrics'].path == path
+
+
+class TestIncremental:
+    def test_unchanged(self, report_path, sample_package):
+        previous = st.PackageState.load(report_path, sample_package.name)
+        package = pkg.Package(sample_package, previous=previous)
+        assert package.totals == previous.totals
+        assert package.stats['analyzed'] == 0
+        assert package.stats['cache_hits'] == 7
+
+    def test_changed(self, report_path, sample_package):
+        previous = st.PackageState.load(report_path, sample_package.name)
+        (sample_package / 'subproj' / 'help.py').unlink()
+        (sample_package / 'pyfile.py').write_text('def foo():\n    # comment\n    return\n')
+        shutil.copy(sample_package / 'subproj' / 'main.py', sample_package / 'new.py')
+
+        package = pkg.Package(sample_package, previous=previous)
+        assert package.totals == pkg.Package(sample_package).totals
+        assert package.stats['analyzed'] == 2
+        assert package.report().report(grouped=True) == \
+            pkg.Package(sample_package).report().report(grouped=True)
+
+        # The new state can be used on the next run.
+        write_state(package, report_path)
+        state = st.PackageState.load(report_path, sample_package.name)
+        assert len(state.files) == 7
+        again = pkg.Package(sample_package, previous=state)
+        assert again.totals == package.totals
+        assert again.stats['analyzed'] == 0
@@ -0,0 +1,109 @@
+"""
+Contains tests related to reducto/walker.py
+"""
+
+import os
+import pathlib
+from unittest import mock
+
+import pytest
+
+import reducto.walker as wk
+import reducto.exclude as ex
+
+
+def relnames(root: pathlib.Path, **kwargs):
+    return [os.path.relpath(path, root) for path in wk.walk(root, **kwargs)]
+
+
+def test_walk(sample_package):
+    assert relnames(sample_package) == [
+        '__init__.py',
+        'pyfile.py',
+        os.path.join('src', 'ext', '__init__.py'),
+        os.path.join('src', 'ext', 'ext.py'),
+        os.path.join('subproj', '__init__.py'),
+        os.path.join('subproj', 'help.py'),
+        os.path.join('subproj', 'main.py'),
+    ]
+
+
+def test_walk_lazy(sample_package):
+    paths = wk.walk(sample_package)
+    assert next(paths) == str(sample_package / '__init__.py')
+
+
+@pytest.mark.parametrize('name', ['.git', '.venv', 'node_modules', '__pycache__', '.tox', 'pkg.egg-info'])
+def test_walk_pruned(sample_package, name):
+    (sample_package / name).mkdir()
+    (sample_package / name / 'module.py').write_text('\n')
+    assert len(relnames(sample_package)) == 7
+
+
+@pytest.mark.parametrize('name', ['build', 'dist'])
+def test_walk_generic_names(sample_package, name):
+    # Subpackages with generic names are analyzed, unless ignored by git.
+    (sample_package / name).mkdir()
+    (sample_package / name / '__init__.py').write_text('\n')
+    assert len(relnames(sample_package)) == 8
+    (sample_package / '.gitignore').write_text(f'{name}/\n')
+    assert len(relnames(sample_package)) == 7
+
+
+def test_walk_no_follow_symlinks(sample_package):
+    (sample_package / 'link').symlink_to(sample_package / 'subproj', target_is_directory=True)
+    assert len(relnames(sample_package)) == 7
+
+
+def test_walk_gitignore(sample_package):
+    (sample_package / '.gitignore').write_text('# comment\nsubproj/\n*.py\n!__init__.py\n')
+    assert relnames(sample_package) == [
+        '__init__.py',
+        os.path.join('src', 'ext', '__init__.py'),
+    ]
+    assert len(relnames(sample_package, gitignore=False)) == 7
+
+
+def test_walk_repository_gitignore(sample_package):
+    (sample_package / '.git').mkdir()
+    (sample_package / '.gitignore').write_text('/src/ext/ext.py\n')
+    assert len(relnames(sample_package / 'src')) == 1
+    assert wk.repository_rules(sample_package / 'src')[0].base == str(sample_package)
+    # Outside of a repository there are no rules.
+    assert wk.repository_rules(sample_package.parent) == []
+
+
+class TestIgnoreRules:
+    def test_match(self):
+        rules = wk.IgnoreRules('/repo', ['', '# comment', 'build/', '/docs/*.py', 'gen_*.py', '!gen_keep.py'])
+        assert len(rules) == 4
+        assert rules.match('/repo/pkg/build', True) is True
+        assert rules.match('/repo/pkg/build', False) is None
+        assert rules.match('/repo/docs/conf.py', False) is True
+        assert rules.match('/repo/pkg/docs/conf.py', False) is None
+        assert rules.match('/repo/pkg/gen_pb2.py', False) is True
+        assert rules.match('/repo/pkg/gen_keep.py', False) is False
+
+    def test_is_ignored(self):
+        outer = wk.IgnoreRules('/repo', ['*.py'])
+        inner = wk.IgnoreRules('/repo/pkg', ['!main.py'])
+        assert wk.is_ignored([outer, inner], '/repo/pkg/main.py', False) is False
+        assert wk.is_ignored([outer, inner], '/repo/pkg/other.py', False) is True
+        assert wk.is_ignored([], '/repo/pkg/other.py', False) is False
+
+
+def test_walk_exclude(sample_package):
+    exclude = ex.Exclude(['subproj', 'src/ext/ext.py'])
+    assert relnames(sample_package, exclude=exclude) == [
+        '__init__.py',
+        'pyfile.py',
+        os.path.join('src', 'ext', '__init__.py'),
+    ]
+
+
+def test_walk_exclude_never_opens(sample_package):
+    exclude = ex.Exclude(['subproj'])
+    scandir = os.scandir
+    with mock.patch('os.scandir', side_effect=scandir) as scanned:
+        list(wk.walk(sample_package, exclude=exclude))
+    assert str(sample_package / 'subproj') not in [str(call.args[0]) for call in scanned.call_args_list]
@@ -0,0 +1,182 @@
+"""
+Contains tests related to reducto/watch.py
+"""
+
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+import reducto.exclude as ex
+import reducto.package as pkg
+import reducto.reducto as rd
+import reducto.watch as wt
+
+from tests.conftest import get_sample_file
+
+
+class ScriptedWatcher:
+    """Answers the waits with the values given, interrupts when exhausted."""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.closed = False
+
+    def wait(self, timeout=None):
+        if len(self.answers) == 0:
+            raise KeyboardInterrupt
+        return self.answers.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+def test_snapshot(sample_package):
+    snapshot = wt.snapshot(sample_package, exclude=ex.Exclude(['src']))
+    assert len(snapshot) == 5
+    path = str(sample_package / 'pyfile.py')
+    assert snapshot[path][0] == os.stat(path).st_size
+
+
+def test_watch_updates_changed_files(sample_package):
+    watcher = ScriptedWatcher([True, False, True, False])
+    watch = wt.Watch(sample_package, watcher=watcher)
+    packages = iter(watch)
+    first = next(packages)
+    assert first.totals == pkg.Package(sample_package).totals
+
+    (sample_package / 'pyfile.py').write_text('def foo():\n    return\n')
+    second = next(packages)
+    assert second.stats['analyzed'] == 1
+    assert second.totals == pkg.Package(sample_package).totals
+
+    (sample_package / 'subproj' / 'help.py').unlink()
+    (sample_package / 'new.py').write_text('x = 1\n')
+    third = next(packages)
+    assert third.stats['analyzed'] == 1
+    assert third.totals == pkg.Package(sample_package).totals
+    assert watch.stats['updates'] == 3
+
+    with pytest.raises(KeyboardInterrupt):
+        next(packages)
+    watch.close()
+    assert watcher.closed
+
+
+def test_watch_file_changed_while_analyzed(sample_package, monkeypatch):
+    # A file saved during the first analysis is analyzed again on the next one.
+    state = pkg.Package.state
+    path = sample_package / 'pyfile.py'
+
+    def edit_then_state(package):
+        if not path.read_text().startswith('def edited'):
+            path.write_text('def edited():\n    # Comment.\n    return\n')
+        return state(package)
+
+    monkeypatch.setattr(pkg.Package, 'state', edit_then_state)
+    watch = wt.Watch(sample_package, watcher=ScriptedWatcher([True, False]))
+    packages = iter(watch)
+    next(packages)
+    second = next(packages)
+    assert second.stats['analyzed'] == 1
+    assert second.totals == pkg.Package(sample_package).totals
+
+
+def test_watch_debounce(sample_package):
+    # The changes received before a pause are reported once.
+    watcher = ScriptedWatcher([True, True, True, False])
+    watch = wt.Watch(sample_package, watcher=watcher)
+    packages = iter(watch)
+    next(packages)
+    next(packages)
+    assert watch.stats['updates'] == 2
+    assert watch.stats['coalesced'] == 2
+
+
+def test_watch_exclude_functions(sample_package):
+    exclude = ex.Exclude([], private=True)
+    watcher = ScriptedWatcher([True, False, True, False])
+    watch = wt.Watch(sample_package, exclude=exclude, watcher=watcher)
+    packages = iter(watch)
+    next(packages)
+    (sample_package / 'other.py').write_text('def _foo():\n    return\n')
+    assert next(packages).stats['analyzed'] == 1
+    third = next(packages)
+    # Nothing changed, the metrics without the private functions are reused.
+    assert third.stats['analyzed'] == 0
+    assert third.totals == pkg.Package(sample_package, exclude=exclude).totals
+
+
+def test_watch_missing_package(tmp_path):
+    with pytest.raises(pkg.PackageError):
+        wt.Watch(tmp_path / 'missing', watcher=ScriptedWatcher([]))
+
+
+def _assert_detects_changes(watcher, package):
+    assert not watcher.wait(0.05)
+
+    def modify():
+        time.sleep(0.05)
+        (package / 'pyfile.py').write_text('x = 1\n')
+
+    thread = threading.Thread(target=modify)
+    thread.start()
+    assert watcher.wait(5)
+    thread.join()
+    while watcher.wait(0.05):  # A write may produce several events.
+        pass
+
+    # Other files than the source files are ignored.
+    (package / 'data' / 'sample_data.csv').write_text('a,b\n')
+    assert not watcher.wait(0.05)
+
+
+def test_poll_watcher(sample_package):
+    with wt.PollWatcher(sample_package, interval=0.01) as watcher:
+        _assert_detects_changes(watcher, sample_package)
+        (sample_package / 'subproj' / 'main.py').unlink()
+        assert watcher.wait(1)
+
+
+@pytest.mark.skipif(wt._inotify() is None, reason='inotify is not available.')
+def test_inotify_watcher(sample_package):
+    with wt.InotifyWatcher(sample_package) as watcher:
+        _assert_detects_changes(watcher, sample_package)
+        # The new directories are watched too.
+        (sample_package / 'other').mkdir()
+        assert watcher.wait(1)
+        shutil.copy(get_sample_file('example.py'), sample_package / 'other' / 'a.py')
+        assert watcher.wait(1)
+        while watcher.wait(0.05):
+            pass
+        # Pruned directories are not watched.
+        (sample_package / '.tox').mkdir()
+        (sample_package / '.tox' / 'a.py').write_text('\n')
+        assert not watcher.wait(0.05)
+
+
+def test_default_watcher(sample_package, monkeypatch):
+    monkeypatch.setattr(wt, '_inotify', lambda: None)
+    watcher = wt.default_watcher(sample_package)
+    assert isinstance(watcher, wt.PollWatcher)
+
+
+def test_run_watch(sample_package, monkeypatch, capsys):
+    monkeypatch.setattr(
+        wt, 'default_watcher', lambda path, exclude: ScriptedWatcher([True, False])
+    )
+    rd.Reducto().run([str(sample_package), '--watch', '-j', '1'])
+    captured = capsys.readouterr()
+    name = sample_package.name
+    # Reported at the start and after the change.
+    assert captured.out.count(f"'{name}'") == 2
+    assert 'Watching' in captured.err
+
+
+def test_run_watch_errors(sample_package):
+    with pytest.raises(SystemExit):
+        rd.Reducto().run([str(sample_package / 'pyfile.py'), '--watch'])
+    with pytest.raises(SystemExit):
+        rd.Reducto().run([str(sample_package), '--watch', '--format', 'ndjson'])